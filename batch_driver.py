@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from typing import Iterable, Iterator
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft import MY_UNIT, Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_journal import DraftJournal
+from clutch_libs.miluim.draft_metrics import DraftMetrics
+from clutch_libs.miluim.draft_result import DraftResult
+from clutch_libs.miluim.malshab import Malshab
+from clutch_libs.miluim.pick_probability_model import PickProbabilityModel
+
+SKIP_VALUE = 'skip'
+
+
+class PickRecord:
+    """
+    A single scripted pick: another unit's pick, a skip, or an override of my unit's suggestion.
+    """
+    def __init__(self, unit: Unit, malshab_id: str | None, course: Course | None, line_number: int):
+        """
+        Initializes a PickRecord instance.
+
+        Args:
+            unit (Unit): The unit picking.
+            malshab_id (str | None): The ID of the chosen Malshab, None for a skipped pick.
+            course (Course | None): The course of the chosen Malshab, only relevant for my unit.
+            line_number (int): The line of the record in its file, for error messages.
+        """
+        self.unit = unit
+        self.malshab_id = malshab_id
+        self.course = course
+        self.line_number = line_number
+
+
+class PickTiming:
+    """
+    The timing of a single draft pick, as measured by the batch driver.
+    """
+    def __init__(self, pick: int, unit: Unit, malshab_id: str | None, suggestion_seconds: float | None, total_seconds: float):
+        self.pick = pick
+        self.unit = unit
+        self.malshab_id = malshab_id
+        self.suggestion_seconds = suggestion_seconds
+        self.total_seconds = total_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'pick': self.pick,
+            'unit': self.unit.value,
+            'malshab_id': self.malshab_id,
+            'suggestion_seconds': self.suggestion_seconds,
+            'total_seconds': self.total_seconds,
+        }
+
+
+def _parse_pick_record(unit: str, malshab_id: str | None, course: str | None, line_number: int) -> PickRecord:
+    try:
+        malshab_id = (malshab_id or '').strip()
+        return PickRecord(
+            unit=Unit(unit.strip()),
+            malshab_id=None if malshab_id.lower() in ('', SKIP_VALUE) else malshab_id,
+            course=Course(course.strip()) if course and course.strip() else None,
+            line_number=line_number,
+        )
+    except ValueError as e:
+        raise ValueError(f'Invalid pick record in line {line_number}: {e}') from e
+
+
+def load_pick_records(picks_path: str) -> Iterator[PickRecord]:
+    """
+    Stream the scripted picks from a JSONL or CSV file (by extension).
+    JSONL lines look like {"unit": "7170", "malshab_id": "123"}, with an optional "course" for my unit's overrides.
+    CSV files have a header with the columns unit, malshab_id and an optional course column.
+    A missing Malshab ID, or "skip", skips the pick.
+    Args:
+        picks_path (str): Path to the picks file.
+    Returns:
+        Iterator[PickRecord]: The picks, in order.
+    """
+    with open(picks_path, 'r', newline='') as file:
+        if picks_path.endswith('.csv'):
+            reader = csv.DictReader(file)
+            for raw_record in reader:
+                yield _parse_pick_record(raw_record['unit'], raw_record.get('malshab_id'), raw_record.get('course'), reader.line_num)
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                raw_record = json.loads(line)
+                yield _parse_pick_record(raw_record['unit'], raw_record.get('malshab_id'), raw_record.get('course'), line_number)
+
+
+class HeadlessDraft(Draft):
+    """
+    A draft that takes its picks from a stream of scripted picks instead of prompting the draft manager.
+    Other units' picks are taken from the stream in order. My unit accepts the suggestion,
+    unless the next record in the stream is a pick of my unit, which overrides it.
+    """
+
+    def __init__(self, pick_records: Iterable[PickRecord], my_unit: Unit = MY_UNIT):
+        """
+        Initialize the HeadlessDraft object.
+        Args:
+            pick_records (Iterable[PickRecord]): The scripted picks.
+            my_unit (Unit): The unit the draft picks for.
+        """
+        super().__init__(my_unit)
+        self.pick_records: Iterator[PickRecord] = iter(pick_records)
+        self._next_pick_record: PickRecord | None = None
+        self.last_suggestion_seconds: float | None = None
+
+    @staticmethod
+    def _get_input(message: str) -> str:
+        raise RuntimeError(f'A headless draft cannot prompt for input: {message}')
+
+    def _peek_pick_record(self) -> PickRecord | None:
+        if self._next_pick_record is None:
+            self._next_pick_record = next(self.pick_records, None)
+        return self._next_pick_record
+
+    def _pop_pick_record(self) -> PickRecord | None:
+        pick_record = self._peek_pick_record()
+        self._next_pick_record = None
+        return pick_record
+
+    def _get_external_pick(self, unit: Unit) -> str | None:
+        pick_record = self._pop_pick_record()
+        if pick_record is None:
+            print('No more scripted picks. Ending draft.')
+            self.is_active = False
+            return None
+        if pick_record.unit != unit:
+            raise ValueError(
+                f'Pick record in line {pick_record.line_number} is for unit {pick_record.unit.name}, '
+                f'but pick no. {self.current_draft_pick + 1} belongs to unit {unit.name}.'
+            )
+        if pick_record.malshab_id is not None and not self.eligibility_index.can_pick(unit, pick_record.malshab_id):
+            raise ValueError(
+                f'Pick record in line {pick_record.line_number}: Malshab ID {pick_record.malshab_id} '
+                f'is not allowed for unit {unit.name}.'
+            )
+        return pick_record.malshab_id
+
+    def skip_current_pick(self):
+        # Running out of scripted picks ends the draft, it doesn't skip the pick
+        if self.is_active:
+            super().skip_current_pick()
+
+    def _get_suggestion_for_internal_pick(self) -> tuple[Malshab, Course]:
+        start_time = time.perf_counter()
+        suggestion, next_course = super()._get_suggestion_for_internal_pick()
+        self.last_suggestion_seconds = time.perf_counter() - start_time
+        return suggestion, next_course
+
+    def _handle_suggestion(self, suggestion: Malshab, course: Course) -> tuple[str, Course]:
+        pick_record = self._peek_pick_record()
+        if pick_record is None or pick_record.unit != self.my_unit:
+            return suggestion.id, course
+
+        # The next record is my unit's pick, which overrides the suggestion
+        self._pop_pick_record()
+        if pick_record.malshab_id is None or not self.eligibility_index.can_pick(self.my_unit, pick_record.malshab_id):
+            raise ValueError(
+                f'Pick record in line {pick_record.line_number}: Malshab ID {pick_record.malshab_id} '
+                f'is not allowed for unit {self.my_unit.name}.'
+            )
+        overridden_course = pick_record.course or course
+        if self.journal is not None:
+            self.journal.record_override(self.current_draft_pick, suggestion.id, pick_record.malshab_id, overridden_course)
+        return pick_record.malshab_id, overridden_course
+
+    def run_to_completion(self) -> list[PickTiming]:
+        """
+        Run the draft until it ends, at full speed.
+        Returns:
+            list[PickTiming]: The timing of each pick.
+        """
+        pick_timings = []
+        while self.is_active:
+            pick = self.current_draft_pick
+            unit = self.general_picking_order[pick] if pick < len(self.general_picking_order) else None
+            results_count = len(self.draft_results)
+            self.last_suggestion_seconds = None
+
+            start_time = time.perf_counter()
+            self.act()
+            total_seconds = time.perf_counter() - start_time
+
+            if self.current_draft_pick == pick:
+                # The draft ended without making this pick
+                break
+            malshab_id = self.draft_results[-1].malshab_id if len(self.draft_results) > results_count else None
+            pick_timings.append(PickTiming(pick, unit, malshab_id, self.last_suggestion_seconds, total_seconds))
+        return pick_timings
+
+
+def write_draft_results_csv(draft_results: list[DraftResult], csv_path: str):
+    """
+    Write the draft results to a CSV file.
+    Args:
+        draft_results (list[DraftResult]): The results of the draft.
+        csv_path (str): Path to the CSV file.
+    """
+    with open(csv_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('pick', 'unit', 'course', 'malshab_id'))
+        for draft_result in draft_results:
+            writer.writerow((draft_result.pick + 1, draft_result.unit.value, draft_result.course.value, draft_result.malshab_id))
+
+
+def run_batch_draft(
+    config_path: str,
+    picks_path: str,
+    results_path: str = None,
+    timings_path: str = None,
+    journal_directory: str = None,
+    metrics: DraftMetrics = None,
+    pick_probability_model: PickProbabilityModel = None,
+    max_pick_risk: float = 0.0,
+) -> HeadlessDraft:
+    """
+    Set up a draft from a config file, and run it to completion using the scripted picks.
+    Args:
+        config_path (str): Path to the draft config JSON file.
+        picks_path (str): Path to the JSONL or CSV file of scripted picks.
+        results_path (str): Path to write the draft results CSV to.
+        timings_path (str): Path to write the per-pick timings JSONL to.
+        journal_directory (str): Directory to journal the draft to.
+        metrics (DraftMetrics): Metrics to measure the draft with.
+        pick_probability_model (PickProbabilityModel): The model of other units' picks, used when deferring suggestions.
+        max_pick_risk (float): The highest chance of losing a deferred Malshab accepted, with the model.
+    Returns:
+        HeadlessDraft: The finished draft.
+    """
+    draft = HeadlessDraft(load_pick_records(picks_path))
+    draft.setup(DraftConfig.load_from_json(config_path))
+    draft.metrics = metrics
+    draft.pick_probability_model = pick_probability_model
+    draft.max_pick_risk = max_pick_risk
+    if journal_directory is not None:
+        draft.journal = DraftJournal(journal_directory)
+        draft.journal.open()
+
+    try:
+        pick_timings = draft.run_to_completion()
+    finally:
+        if draft.journal is not None:
+            draft.journal.close()
+
+    if results_path is not None:
+        write_draft_results_csv(draft.draft_results, results_path)
+    if timings_path is not None:
+        with open(timings_path, 'w') as file:
+            for pick_timing in pick_timings:
+                file.write(json.dumps(pick_timing.to_dict()) + '\n')
+    return draft
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a full draft non-interactively from scripted picks.')
+    parser.add_argument('config', help='Path to the draft config JSON file.')
+    parser.add_argument('picks', help='Path to the scripted picks, as JSONL or CSV.')
+    parser.add_argument('--results', help='Path to write the draft results CSV to.')
+    parser.add_argument('--timings', help='Path to write the per-pick timings JSONL to.')
+    parser.add_argument('--journal', help='Directory to journal the draft to.')
+    parser.add_argument('--quiet', action='store_true', help='Do not print the draft progress.')
+    parser.add_argument('--metrics', help='Path to write the hot path metrics JSONL to.')
+    parser.add_argument('--prometheus', help='Path to write the aggregated metrics to, in the Prometheus text format.')
+    parser.add_argument('--profile', help='Directory to write a cProfile dump of every suggestion to.')
+    parser.add_argument('--trace-memory', action='store_true', help='Trace the peak memory of every suggestion.')
+    parser.add_argument('--pick-model', help="Path of a fitted model of other units' picks, used when deferring suggestions.")
+    parser.add_argument('--max-pick-risk', type=float, default=0.1, help='The highest chance of losing a deferred Malshab, with the model.')
+    args = parser.parse_args()
+
+    # The scheduler's reasoning is logged, and only shown with the rest of the draft progress
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format='%(message)s', stream=sys.stdout)
+    metrics = None
+    if args.metrics or args.prometheus or args.profile or args.trace_memory:
+        metrics = DraftMetrics(profile_directory=args.profile, trace_memory=args.trace_memory)
+
+    pick_probability_model = PickProbabilityModel.load(args.pick_model) if args.pick_model else None
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+        draft = run_batch_draft(args.config, args.picks, args.results, args.timings, args.journal, metrics, pick_probability_model, args.max_pick_risk)
+    if args.metrics:
+        metrics.write_json_lines(args.metrics)
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+    print(f'Draft finished after {draft.current_draft_pick} picks, {len(draft.draft_results)} Malshabs chosen.')
+
+
+if __name__ == '__main__':
+    main()
@@ -36,3 +36,19 @@ class Course(str, Enum):
 
 # The minimal medical profile for combat soldiers, everything equal or above is considered combat
 MINIMAL_COMBAT_MEDICAL_PROFILE = 72
+# The valid values of the medical profiles and the psych scores, both are scores out of 100
+MEDICAL_PROFILE_RANGE = range(0, 101)
+PSYCH_SCORE_RANGE = range(0, 101)
+
+class QuotaAttribute(str, Enum):
+    """
+    A class with the Malshab attributes that can be limited by quotas, per course or per unit
+    """
+    COMBAT = 'combat'
+    SCHAKIM = 'schakim'
+    MALE = 'male'
+    FEMALE = 'female'
+
+
+# The last draft pick (0-based) in which schakim can still be picked, by default
+DEFAULT_SCHAKIM_LATEST_DRAFT_PICK = 100
@@ -0,0 +1,112 @@
+from functools import lru_cache
+from typing import Sequence
+
+from clutch_libs.miluim.consts import Unit
+from clutch_libs.miluim.eligibility_index import EligibilityIndex
+from clutch_libs.miluim.picking_order import PickingOrder
+
+# The number of (units, pick) pairs whose next pick is kept, Malshabs only have a handful of distinct units
+NEXT_PICKS_CACHE_SIZE = 4096
+
+
+class ContestedPickIndex:
+    """
+    Index over the general picking order, used to find when a Malshab stops being safe to defer.
+    The compressed picking order answers "when is the next pick of a unit" and "how many picks does a unit have
+    in a range" with a bisect over its runs, so the index only adds the eligibility of the Malshabs on top of it.
+    The next contested pick of a Malshab only depends on which other units can take it, so it is cached
+    by their bitmask and the pick, shared by all the Malshabs with the same units.
+    It holds no state of the draft, so forks of a draft share it.
+    """
+
+    def __init__(self, my_unit: Unit, eligibility_index: EligibilityIndex):
+        """
+        Initialize the ContestedPickIndex object.
+        Args:
+            my_unit (Unit): The unit we are picking for.
+            eligibility_index (EligibilityIndex): The index of which units can pick which Malshab.
+        """
+        self.my_unit: Unit = my_unit
+        self.eligibility_index: EligibilityIndex = eligibility_index
+        self.picking_order: PickingOrder = PickingOrder.from_units([])
+        self._get_next_pick_of_units = lru_cache(maxsize=NEXT_PICKS_CACHE_SIZE)(self._find_next_pick_of_units)
+
+    @property
+    def total_picks(self) -> int:
+        return self.picking_order.total_picks
+
+    def build(self, general_picking_order: Sequence[Unit]):
+        """
+        Build the index from the general picking order.
+        Args:
+            general_picking_order (Sequence[Unit]): The order in which the units pick, compressed if it isn't a PickingOrder.
+        """
+        self.picking_order = general_picking_order if isinstance(general_picking_order, PickingOrder) \
+            else PickingOrder.from_units(general_picking_order)
+        self._get_next_pick_of_units = lru_cache(maxsize=NEXT_PICKS_CACHE_SIZE)(self._find_next_pick_of_units)
+
+    def get_next_unit_pick(self, unit: Unit, pick_index: int) -> int:
+        """
+        Get the first pick owned by the unit, starting from the given pick (inclusive).
+        Args:
+            unit (Unit): The unit to check.
+            pick_index (int): The pick to start from.
+        Returns:
+            int: The pick number, or the total number of picks if the unit has no more picks.
+        """
+        return self.picking_order.get_next_unit_pick(unit, pick_index)
+
+    def get_next_contested_pick(self, malshab_id: str, pick_index: int) -> int:
+        """
+        Get the first pick, starting from the given pick (inclusive), in which another unit can pick the Malshab.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+            pick_index (int): The pick to start from.
+        Returns:
+            int: The pick number, or the total number of picks if no other unit can pick the Malshab.
+        """
+        malshab_mask = self.eligibility_index.get_mask(malshab_id) & ~EligibilityIndex.UNIT_TO_BIT[self.my_unit]
+        if not malshab_mask:
+            return self.total_picks
+        return self._get_next_pick_of_units(malshab_mask, max(pick_index, 0))
+
+    def _find_next_pick_of_units(self, units_mask: int, pick_index: int) -> int:
+        next_pick = self.total_picks
+        for unit, unit_bit in EligibilityIndex.UNIT_TO_BIT.items():
+            if units_mask & unit_bit:
+                next_pick = min(next_pick, self.picking_order.get_next_unit_pick(unit, pick_index))
+        return next_pick
+
+    def count_my_unit_picks(self, start_pick: int, end_pick: int) -> int:
+        """
+        Count our picks in the range [start_pick, end_pick).
+        Args:
+            start_pick (int): The first pick of the range.
+            end_pick (int): The pick after the last pick of the range.
+        Returns:
+            int: The number of picks we own in the range.
+        """
+        return self.picking_order.count_unit_picks(self.my_unit, start_pick, end_pick)
+
+    def count_unit_picks(self, unit: Unit, start_pick: int, end_pick: int) -> int:
+        """
+        Count the unit's picks in the range [start_pick, end_pick).
+        Args:
+            unit (Unit): The unit to count the picks of.
+            start_pick (int): The first pick of the range.
+            end_pick (int): The pick after the last pick of the range.
+        Returns:
+            int: The number of picks the unit owns in the range.
+        """
+        return self.picking_order.count_unit_picks(unit, start_pick, end_pick)
+
+    def get_my_unit_pick(self, relative_pick_number: int, start_pick: int) -> int:
+        """
+        Get the draft pick of our n-th pick, counting from the given pick.
+        Args:
+            relative_pick_number (int): The 0-based number of our pick, relative to the start pick.
+            start_pick (int): The pick to count from.
+        Returns:
+            int: The draft pick number.
+        """
+        return self.picking_order.get_nth_unit_pick(self.my_unit, relative_pick_number, start_pick)
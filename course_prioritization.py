@@ -1,62 +1,457 @@
+import csv
+import logging
+from array import array
+from functools import cached_property
+from typing import Iterator
+
+from clutch_libs.miluim.consts import MEDICAL_PROFILE_RANGE, PSYCH_SCORE_RANGE, Gender
+from clutch_libs.miluim.draft_validation import ValidationReport
 from clutch_libs.miluim.malshab import Malshab
+from clutch_libs.miluim.malshab_table import CODE_TO_GENDER, GENDER_TO_CODE, MalshabTable
+
+# The columns expected in a prioritization CSV file, in addition to the header names
+PRIORITIZATION_CSV_COLUMNS = ('id', 'first_name', 'last_name', 'gender', 'medical_profile', 'psych_score', 'is_schakim')
+TRUE_VALUES = ('true', 'yes', 'y', '1')
+FALSE_VALUES = ('false', 'no', 'n', '0', '')
+
+logger = logging.getLogger(__name__)
 
 
 class CoursePrioritization:
     """
     Class to prioritize courses based on input.
+    The Malshabs themselves live in a (possibly shared) MalshabTable, the course only holds their rows, by priority.
+    Chosen Malshabs are never removed from the list itself, they are marked as removed (tombstoned),
+    and unlinked from a doubly linked list of the remaining positions, so removing a Malshab is O(1)
+    regardless of the list length, and the suggestion cursor jumps over removed Malshabs instead of scanning them.
     """
 
-    def __init__(self, course_name: str = None):
+    def __init__(self, course_name: str = None, malshab_table: MalshabTable = None):
         """
         Initialize the CoursePrioritization object.
+        Args:
+            course_name (str): The name of the course, used for printing.
+            malshab_table (MalshabTable): The table holding the Malshabs, shared between courses.
         """
-        self.priorized_draft_picks: list[Malshab] = None
+        self.malshab_table: MalshabTable = malshab_table if malshab_table is not None else MalshabTable()
+        self.priorized_rows: array = array('I')
         self.current_suggestion_index: int = 0
         self.course_name: str | None = course_name
 
+        # Removal bookkeeping, indexed by the position in priorized_rows
+        self.removed_positions: bytearray = bytearray()
+        self.remaining_count: int = 0
+        # The first position that was not removed
+        self.head_position: int = 0
+        # The next and previous remaining position of every position, linked in a ring through the sentinel
+        # position len(priorized_rows), built on first use. Removed positions keep the links from when they were removed
+        self.next_positions: array | None = None
+        self.previous_positions: array | None = None
+        # Quiet prioritizations don't log, for computations running in the background
+        self.is_quiet: bool = False
+
+
+    @cached_property
+    def row_to_position(self) -> dict[int, int]:
+        # Built on first use, so a prioritization mapped from an image is usable before its rows are indexed
+        row_to_position = {}
+        for position, row in enumerate(self.priorized_rows):
+            # Rows are expected to be unique in a course, keep the first one if not
+            row_to_position.setdefault(row, position)
+        return row_to_position
+
 
     def _get_course_doc_string(self) -> str:
         return f' for course {self.course_name}' if self.course_name else ''
 
 
+    def set_priorized_rows(self, priorized_rows: array):
+        """
+        Set the prioritized draft picks, as rows in the Malshab table, and index them for removal.
+        Args:
+            priorized_rows (array): The rows of the draft picks, ordered by priority.
+        """
+        self.priorized_rows = priorized_rows
+        self.removed_positions = bytearray(len(priorized_rows))
+        # Index the new rows on next use
+        self.__dict__.pop('row_to_position', None)
+        self.next_positions = None
+        self.previous_positions = None
+        self.remaining_count = len(priorized_rows)
+        self.head_position = 0
+        self.current_suggestion_index = 0
+
+
+    def fork(self, with_removals: bool = False) -> 'CoursePrioritization':
+        """
+        Create a new prioritization sharing the (read-only) rows and their index.
+        Args:
+            with_removals (bool): Copy the Malshabs removed so far, instead of starting with nothing removed.
+        Returns:
+            CoursePrioritization: The forked prioritization.
+        """
+        forked_prioritization = CoursePrioritization(self.course_name, self.malshab_table)
+        forked_prioritization.priorized_rows = self.priorized_rows
+        forked_prioritization.row_to_position = self.row_to_position
+        if with_removals:
+            if self.next_positions is None:
+                self._link_positions()
+            forked_prioritization.removed_positions = bytearray(self.removed_positions)
+            forked_prioritization.next_positions = array('I', self.next_positions)
+            forked_prioritization.previous_positions = array('I', self.previous_positions)
+            forked_prioritization.remaining_count = self.remaining_count
+            forked_prioritization.head_position = self.head_position
+            forked_prioritization.current_suggestion_index = self.head_position
+        else:
+            forked_prioritization.removed_positions = bytearray(len(self.priorized_rows))
+            forked_prioritization.remaining_count = len(self.priorized_rows)
+        return forked_prioritization
+
+
+    def set_draft_picks(self, priorized_draft_picks: list[Malshab]):
+        """
+        Set the prioritized draft picks from Malshab objects, adding them to the Malshab table.
+        Args:
+            priorized_draft_picks (list[Malshab]): The draft picks, ordered by priority.
+        """
+        self.set_priorized_rows(array('I', (
+            self.malshab_table.add_malshab(
+                draft_pick.id,
+                draft_pick.first_name,
+                draft_pick.last_name,
+                draft_pick.gender,
+                draft_pick.medical_profile,
+                draft_pick.psych_score,
+                draft_pick.is_schakim,
+            )
+            for draft_pick in priorized_draft_picks
+        )))
+
+
+    def _link_positions(self):
+        """
+        Link the remaining positions to each other, from the removed positions.
+        A removed position keeps pointing at the next position that remained when it was removed.
+        """
+        end_position = len(self.priorized_rows)
+        removed_positions = self.removed_positions
+        next_positions = array('I', [end_position]) * (end_position + 1)
+        previous_positions = array('I', [end_position]) * (end_position + 1)
+        next_position = end_position
+        for position in range(end_position - 1, -1, -1):
+            next_positions[position] = next_position
+            if not removed_positions[position]:
+                previous_positions[next_position] = position
+                next_position = position
+        next_positions[end_position] = next_position
+        previous_positions[next_position] = end_position
+        self.next_positions = next_positions
+        self.previous_positions = previous_positions
+
+
+    def _skip_removed(self, position: int) -> int:
+        """
+        Get the first position, starting from the given one, which was not removed.
+        """
+        if self.next_positions is None:
+            self._link_positions()
+        end_position = len(self.priorized_rows)
+        removed_positions = self.removed_positions
+        next_positions = self.next_positions
+        # Removed positions point forward, at positions that remained when they were removed
+        while position < end_position and removed_positions[position]:
+            position = next_positions[position]
+        return min(position, end_position)
+
+
+    def reset_suggestions(self):
+        """
+        Restart the suggestions from the highest prioritized Malshab that was not chosen yet.
+        """
+        self.current_suggestion_index = self.head_position
+
+
     def get_next_suggestion(self) -> Malshab:
         """
         Get the next suggestion for a draft pick.
         Returns:
             Malshab: The next suggested draft pick.
         """
-        if self.current_suggestion_index >= len(self.priorized_draft_picks):
-            print(f'No more suggestions available{self._get_course_doc_string()}.')
+        self.current_suggestion_index = self._skip_removed(self.current_suggestion_index)
+        if self.current_suggestion_index >= len(self.priorized_rows):
+            if not self.is_quiet:
+                logger.info('No more suggestions available%s.', self._get_course_doc_string())
             return None
-        suggestion = self.priorized_draft_picks[self.current_suggestion_index]
-        self.current_suggestion_index += 1
+        suggestion = self.malshab_table.get_malshab(self.priorized_rows[self.current_suggestion_index])
+        self.current_suggestion_index = self.next_positions[self.current_suggestion_index]
         return suggestion
 
 
-    def handle_malshab_chosen(self, malshab_id: str):
+    def iter_remaining_malshabs(self, limit: int = None) -> Iterator[Malshab]:
+        """
+        Iterate the Malshabs that were not chosen yet, by priority, without moving the suggestion cursor.
+        Args:
+            limit (int): The maximal number of Malshabs to iterate, all of them if not given.
+        Returns:
+            Iterator[Malshab]: The remaining Malshabs.
+        """
+        position = self.head_position
+        remaining_limit = limit if limit is not None else len(self.priorized_rows)
+        while remaining_limit > 0:
+            position = self._skip_removed(position)
+            if position >= len(self.priorized_rows):
+                return
+            yield self.malshab_table.get_malshab(self.priorized_rows[position])
+            position = self.next_positions[position]
+            remaining_limit -= 1
+
+
+    def handle_malshab_chosen(self, malshab_id: str) -> int | None:
         """
         Handle the case when a Malshab is chosen.
         Args:
             malshab_id (str): The ID of the chosen Malshab.
+        Returns:
+            int | None: The position the Malshab was removed from, None if it was not in the suggestions.
         """
-        previous_length = len(self.priorized_draft_picks)
-        self.priorized_draft_picks = [
-            draft_pick
-            for draft_pick in self.priorized_draft_picks
-            if draft_pick.malshab.id != malshab_id
-        ]
+        return self.handle_row_chosen(self.malshab_table.get_row(malshab_id))
 
-        # Compare the lengths to check if any Malshab was removed
-        if previous_length != len(self.priorized_draft_picks):
-            print(f'Malshab {malshab_id} has been removed from the suggestions{self._get_course_doc_string()}.')
+    def handle_row_chosen(self, row: int | None) -> int | None:
+        """
+        Handle the case when a Malshab is chosen, by its row in the Malshab table,
+        for callers that looked up the row already.
+        Args:
+            row (int | None): The row of the chosen Malshab, None if it is not in the table.
+        Returns:
+            int | None: The position the Malshab was removed from, None if it was not in the suggestions.
+        """
+        position = self.row_to_position.get(row) if row is not None else None
+
+        # Check if the Malshab is in the list and was not removed already
+        removed_position = None
+        if position is not None and not self.removed_positions[position]:
+            if self.next_positions is None:
+                self._link_positions()
+            next_positions = self.next_positions
+            previous_positions = self.previous_positions
+            next_position = next_positions[position]
+            previous_position = previous_positions[position]
+            next_positions[previous_position] = next_position
+            previous_positions[next_position] = previous_position
+            self.removed_positions[position] = 1
+            self.remaining_count -= 1
+            self.head_position = next_positions[len(self.priorized_rows)]
+            removed_position = position
+            if not self.is_quiet:
+                logger.info('Malshab %s has been removed from the suggestions%s.', self.malshab_table.ids[row], self._get_course_doc_string())
 
         # Reset the suggestion index for the next round
-        self.current_suggestion_index = 0
+        self.reset_suggestions()
+        return removed_position
 
-    def load_from_csv(self, csv_path: str):
+    def restore_malshab(self, position: int, head_position: int):
+        """
+        Undo the removal of a Malshab, restoring the head position from before it.
+        Removals must be undone in the reverse order they were made, so the removed position still points
+        at its neighbours from when it was removed, and is linked back between them.
+        Args:
+            position (int): The position the Malshab was removed from.
+            head_position (int): The head position before the removal.
+        """
+        if self.next_positions is None:
+            self._link_positions()
+        self.next_positions[self.previous_positions[position]] = position
+        self.previous_positions[self.next_positions[position]] = position
+        self.removed_positions[position] = 0
+        self.remaining_count += 1
+        self.head_position = head_position
+        self.current_suggestion_index = head_position
+
+    @staticmethod
+    def _fail_loading(csv_path: str, report: ValidationReport | None, message: str):
+        if report is None:
+            raise ValueError(message)
+        report.add_error(csv_path, None, message)
+
+    def load_from_csv(self, csv_path: str, report: ValidationReport = None, source=None):
         """
         Read the prioritized draft picks from a CSV file.
+        The file must have a header with the columns: id, first_name, last_name, gender, medical_profile,
+        psych_score, is_schakim (in any order), and the rows are ordered by priority.
+        All malformed rows are reported together, with their line numbers.
         Args:
             csv_path (str): Path to the CSV file.
+            report (ValidationReport): Report to add the malformed rows to, instead of raising, skipping them.
+                The line of every kept row is recorded in it too.
+            source: The key to record the file under in the report.
+        """
+        self.load_parsed(ParsedPrioritization.parse(csv_path), report, source)
+
+    def load_parsed(self, parsed: 'ParsedPrioritization', report: ValidationReport = None, source=None):
+        """
+        Load parsed prioritized draft picks (see load_from_csv) into the Malshab table,
+        checking them against the Malshabs other courses loaded already.
+        Args:
+            parsed (ParsedPrioritization): The parsed CSV file.
+            report (ValidationReport): Report to add the malformed rows to, instead of raising, skipping them.
+                The line of every kept row is recorded in it too.
+            source: The key to record the file under in the report.
         """
-        raise NotImplementedError('This method is not implemented yet.')
+        csv_path = parsed.csv_path
+        priorized_rows = array('I')
+        priorized_lines = array('I')
+        # The line of every row kept from this file
+        row_to_line: dict[int, int] = {}
+        if report is not None:
+            report.set_source(source, csv_path)
+        if parsed.error is not None:
+            return self._fail_loading(csv_path, report, parsed.error)
+
+        errors = list(parsed.errors)
+        for index, malshab_id in enumerate(parsed.ids):
+            line = parsed.lines[index]
+            gender = CODE_TO_GENDER[parsed.genders[index]]
+            medical_profile = parsed.medical_profiles[index]
+            psych_score = parsed.psych_scores[index]
+            is_schakim = bool(parsed.is_schakim_flags[index])
+
+            # This file or other courses may have loaded this Malshab already, make sure they agree on who it is
+            existing_row = self.malshab_table.get_row(malshab_id)
+            if existing_row is not None:
+                existing_malshab = self.malshab_table.get_malshab(existing_row)
+                first_line = row_to_line.get(existing_row)
+                if (existing_malshab.gender, existing_malshab.medical_profile, existing_malshab.psych_score,
+                        existing_malshab.is_schakim) != (gender, medical_profile, psych_score, is_schakim):
+                    if first_line is not None:
+                        errors.append((line, f'Malshab {malshab_id} conflicts with its earlier row on line {first_line} of this file'))
+                    else:
+                        errors.append((line, f'Malshab {malshab_id} does not match its details in another file'))
+                    continue
+                if first_line is not None:
+                    errors.append((line, f'Malshab {malshab_id} appears more than once (first on line {first_line})'))
+                    continue
+
+            row = self.malshab_table.add_malshab(
+                malshab_id,
+                parsed.first_names[index],
+                parsed.last_names[index],
+                gender,
+                medical_profile,
+                psych_score,
+                is_schakim,
+            )
+            row_to_line[row] = line
+            priorized_rows.append(row)
+            priorized_lines.append(line)
+        # The rows that failed parsing and the ones that failed loading, by line
+        errors.sort(key=lambda error: error[0])
+
+        if report is not None:
+            report.set_source(source, csv_path, priorized_lines)
+            for line, message in errors:
+                report.add_error(csv_path, line, message)
+        elif errors:
+            raise ValueError(
+                f'Found {len(errors)} malformed rows in prioritization CSV file {csv_path}{self._get_course_doc_string()}:\n'
+                + '\n'.join(f'line {line}: {message}' for line, message in errors)
+            )
+
+        self.set_priorized_rows(priorized_rows)
+
+
+class ParsedPrioritization:
+    """
+    The rows of a prioritization CSV file, parsed but not loaded into a Malshab table yet.
+    Parsing touches nothing shared, so files can be parsed concurrently, and the result can be cached (see input_cache).
+    """
+
+    def __init__(self, csv_path: str):
+        """
+        Initialize the ParsedPrioritization object.
+        Args:
+            csv_path (str): Path to the CSV file.
+        """
+        self.csv_path: str = csv_path
+        # The problem with the whole file (empty, missing columns), None if its rows could be parsed
+        self.error: str | None = None
+        # Columns of the well-formed rows, by priority
+        self.ids: list[str] = []
+        self.first_names: list[str] = []
+        self.last_names: list[str] = []
+        self.genders: array = array('B')
+        self.medical_profiles: array = array('i')
+        self.psych_scores: array = array('i')
+        self.is_schakim_flags: bytearray = bytearray()
+        self.lines: array = array('I')
+        # The line and the problem of every malformed row
+        self.errors: list[tuple[int, str]] = []
+
+    @staticmethod
+    def _parse_bool(value: str) -> bool:
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError(f'invalid boolean value {value!r}')
+
+    @staticmethod
+    def _parse_score(value: str, column: str, valid_range: range) -> int:
+        score = int(value)
+        if score not in valid_range:
+            raise ValueError(f'{column} {score} is not between {valid_range.start} and {valid_range.stop - 1}')
+        return score
+
+    @classmethod
+    def parse(cls, csv_path: str) -> 'ParsedPrioritization':
+        """
+        Parse a prioritization CSV file, streaming it row by row.
+        Args:
+            csv_path (str): Path to the CSV file.
+        Returns:
+            ParsedPrioritization: The parsed rows, and the problems found in them.
+        """
+        parsed = cls(csv_path)
+        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                parsed.error = f'Prioritization CSV file {csv_path} is empty.'
+                return parsed
+            header = [column.strip().lower() for column in header]
+            missing_columns = [column for column in PRIORITIZATION_CSV_COLUMNS if column not in header]
+            if missing_columns:
+                parsed.error = f'Prioritization CSV file {csv_path} is missing the columns: {", ".join(missing_columns)}.'
+                return parsed
+            id_index, first_name_index, last_name_index, gender_index, medical_profile_index, psych_score_index, \
+                is_schakim_index = (header.index(column) for column in PRIORITIZATION_CSV_COLUMNS)
+            columns_count = len(header)
+
+            for row_values in reader:
+                # Skip empty lines
+                if not any(value.strip() for value in row_values):
+                    continue
+                if len(row_values) != columns_count:
+                    parsed.errors.append((reader.line_num, f'expected {columns_count} columns, found {len(row_values)}'))
+                    continue
+                try:
+                    malshab_id = row_values[id_index].strip()
+                    if not malshab_id:
+                        raise ValueError('missing id')
+                    gender = Gender(row_values[gender_index].strip().lower())
+                    medical_profile = cls._parse_score(row_values[medical_profile_index], 'medical_profile', MEDICAL_PROFILE_RANGE)
+                    psych_score = cls._parse_score(row_values[psych_score_index], 'psych_score', PSYCH_SCORE_RANGE)
+                    is_schakim = cls._parse_bool(row_values[is_schakim_index])
+                except ValueError as e:
+                    parsed.errors.append((reader.line_num, str(e)))
+                    continue
+
+                parsed.ids.append(malshab_id)
+                parsed.first_names.append(row_values[first_name_index].strip())
+                parsed.last_names.append(row_values[last_name_index].strip())
+                parsed.genders.append(GENDER_TO_CODE[gender])
+                parsed.medical_profiles.append(medical_profile)
+                parsed.psych_scores.append(psych_score)
+                parsed.is_schakim_flags.append(is_schakim)
+                parsed.lines.append(reader.line_num)
+        return parsed
@@ -1,26 +1,65 @@
-from copy import deepcopy
-
-from clutch_libs.miluim.consts import Course, Unit
-from clutch_libs.miluim.course_prioritization import CoursePrioritization
+import logging
+import math
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+
+from clutch_libs.miluim.consts import Course, QuotaAttribute, Unit
+from clutch_libs.miluim.contested_pick_index import ContestedPickIndex
+from clutch_libs.miluim.course_prioritization import CoursePrioritization, ParsedPrioritization
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_history import DraftHistory, DraftStep
+from clutch_libs.miluim.draft_image import DraftImage
+from clutch_libs.miluim.draft_journal import DraftJournal, JournalRecordType
+from clutch_libs.miluim.draft_metrics import DraftMetrics
 from clutch_libs.miluim.draft_result import DraftResult
+from clutch_libs.miluim.draft_validation import (
+    GENERAL_PICKING_ORDER_SOURCE,
+    INTERNAL_PICKING_ORDER_SOURCE,
+    ValidationReport,
+)
+from clutch_libs.miluim.eligibility_index import EligibilityIndex
+from clutch_libs.miluim.input_cache import PRIORITIZATION_KIND, SINGLE_COLUMN_KIND, InputCache, ParsedColumn
+from clutch_libs.miluim.lookahead_search import LookaheadSearch
 from clutch_libs.miluim.malshab import Malshab
-
+from clutch_libs.miluim.malshab_table import MalshabTable
+from clutch_libs.miluim.pick_probability_model import PickProbabilityModel
+from clutch_libs.miluim.pick_scheduler import GreedySlotScheduler, PickScheduler
+from clutch_libs.miluim.picking_order import PickingOrder
+from clutch_libs.miluim.quota_tracker import QuotaTracker
+from clutch_libs.miluim.speculative_recommender import SpeculativeRecommender
+
+# The default unit a draft picks for
 MY_UNIT = Unit.TISHIM
+# Commands the draft manager can enter instead of another unit's pick
+SKIP_COMMAND = 'skip'
+UNDO_COMMAND = 'undo'
+REDO_COMMAND = 'redo'
+# The number of input warnings printed during setup, all of them are kept in the validation report
+MAX_PRINTED_WARNINGS = 20
 
 class Draft:
     """
     Class representing a draft
     """
 
-    def __init__(self):
+    def __init__(self, my_unit: Unit = MY_UNIT):
         """
         Initialize the Draft object.
+        Args:
+            my_unit (Unit): The unit the draft picks for, whose suggestions it makes.
         """
+        self.my_unit: Unit = my_unit
+        # All courses share a single table of Malshabs, and only hold rows in it
+        self.malshab_table: MalshabTable = MalshabTable()
         self.course_to_prioritization: dict[Course, CoursePrioritization] = {
-            Course.SHEFA: CoursePrioritization(),
-            Course.APOLLO: CoursePrioritization(),
-            Course.MIVZAR: CoursePrioritization(),
-            Course.HERMON: CoursePrioritization(),
+            Course.SHEFA: CoursePrioritization(Course.SHEFA.name, self.malshab_table),
+            Course.APOLLO: CoursePrioritization(Course.APOLLO.name, self.malshab_table),
+            Course.MIVZAR: CoursePrioritization(Course.MIVZAR.name, self.malshab_table),
+            Course.HERMON: CoursePrioritization(Course.HERMON.name, self.malshab_table),
         }
         self.unit_to_malshab_ids: dict[Unit, list[str]] = {
             Unit.TISHIM: [],
@@ -30,12 +69,39 @@ class Draft:
             Unit.YAMAL_1014: [],
             Unit.MAZOV: [],
         }
-        self.general_picking_order: list[Unit] = []
+        self.eligibility_index: EligibilityIndex = EligibilityIndex()
+        self.general_picking_order: PickingOrder = PickingOrder.from_units([])
+        self.contested_pick_index: ContestedPickIndex = ContestedPickIndex(self.my_unit, self.eligibility_index)
         self.internal_picking_order: list[Course] = []
         self.remaining_internal_picks_order: list[Course] = []
 
         self.draft_results: list[DraftResult] = []
         self.is_active: bool = True
+        # The problems found in the input files during setup, with their files and lines
+        self.validation_report: ValidationReport = ValidationReport()
+        # Parses the input files, caching them on disk if the config has a cache directory
+        self.input_cache: InputCache = InputCache()
+        # The input files being parsed in the background during setup, by their path and kind
+        self.pending_inputs: dict[tuple[str, str], Future] = {}
+        # Combat, gender and schakim limits, with running counts of the picked and planned Malshabs
+        self.quota_tracker: QuotaTracker = QuotaTracker(self.malshab_table)
+        # The strategy deciding who to suggest for my unit's picks
+        self.pick_scheduler: PickScheduler = GreedySlotScheduler()
+        # The learned chance of other units to pick each Malshab. Without it, a Malshab is deferred
+        # only until the first pick of another unit that can take it
+        self.pick_probability_model: PickProbabilityModel | None = None
+        # The highest chance of losing a Malshab to other units that is accepted when deferring it, with the model
+        self.max_pick_risk: float = 0.0
+        # Write-ahead journal of all actions, used to recover the draft after a crash
+        self.journal: DraftJournal | None = None
+        # Log of the changes of every pick, used to undo and redo picks
+        self.history: DraftHistory = DraftHistory()
+        # Computes my unit's next suggestion in the background, while other units pick
+        self.speculative_recommender: SpeculativeRecommender | None = None
+        # Shows how the candidates for my unit's pick play out over its next picks, if set
+        self.lookahead_search: LookaheadSearch | None = None
+        # Instrumentation of the hot path, only measured when attached
+        self.metrics: DraftMetrics | None = None
 
         # These are 0-based indexes, but when printed, they are 1-based
         # so we need to add 1 to them when printing
@@ -53,48 +119,182 @@ class Draft:
         """
         return input(message)
 
-    def validate_input_data(self):
+    def fork_setup(self, draft: 'Draft' = None) -> 'Draft':
+        """
+        Create a draft at its first pick, sharing all the read-only input data of this draft after setup:
+        the Malshab table, the prioritized rows, the unit lists, the indexes and the picking orders.
+        The new draft may pick for another unit, in which case only the contested pick index is rebuilt for it.
+        Args:
+            draft (Draft): A new draft to fill, a new Draft for the same unit is created if not given.
+        Returns:
+            Draft: The forked draft.
+        """
+        draft = draft if draft is not None else Draft(self.my_unit)
+        draft.malshab_table = self.malshab_table
+        draft.course_to_prioritization = {
+            course: prioritization.fork() for course, prioritization in self.course_to_prioritization.items()
+        }
+        draft.unit_to_malshab_ids = self.unit_to_malshab_ids
+        draft.eligibility_index = self.eligibility_index
+        draft.general_picking_order = self.general_picking_order
+        if draft.my_unit == self.my_unit:
+            draft.contested_pick_index = self.contested_pick_index
+        else:
+            draft.contested_pick_index = ContestedPickIndex(draft.my_unit, self.eligibility_index)
+            draft.contested_pick_index.build(self.general_picking_order)
+        draft.internal_picking_order = self.internal_picking_order
+        draft.remaining_internal_picks_order = list(self.internal_picking_order)
+        draft.pick_scheduler = self.pick_scheduler.fork()
+        draft.pick_probability_model = self.pick_probability_model
+        draft.max_pick_risk = self.max_pick_risk
+        draft.quota_tracker = self.quota_tracker.fork()
+        return draft
+
+    def fork_state(self, draft: 'Draft' = None) -> 'Draft':
         """
-        Validate the input data for the draft.
-        This includes checking that all the necessary data is present and in the correct format.
+        Create a draft at the current pick of this draft, sharing its read-only input data,
+        with its own copy of everything that changes during the draft.
+        Used to compute suggestions without touching this draft.
+        Args:
+            draft (Draft): A new draft to fill, a new Draft is created if not given.
+        Returns:
+            Draft: The forked draft.
         """
-        # Check that all units have Malshab IDs
+        draft = self.fork_setup(draft)
+        draft.course_to_prioritization = {
+            course: prioritization.fork(with_removals=True) for course, prioritization in self.course_to_prioritization.items()
+        }
+        draft.remaining_internal_picks_order = list(self.remaining_internal_picks_order)
+        draft.pick_scheduler = self.pick_scheduler.fork_state()
+        draft.quota_tracker = self.quota_tracker.fork(with_picked_counts=True)
+        draft.draft_results = list(self.draft_results)
+        draft.current_draft_pick = self.current_draft_pick
+        draft.current_internal_pick = self.current_internal_pick
+        draft.is_active = self.is_active
+        return draft
+
+    def validate_input_data(self, check_shared_inputs: bool = True):
+        """
+        Validate the input data for the draft, checking the inputs against each other in a single pass over them.
+        Every problem is added to the validation report, with the ones found while loading the files,
+        so all of them are reported at once: the warnings are printed, and the errors are raised together.
+        Args:
+            check_shared_inputs (bool): Also check the inputs that don't depend on my unit (the unit lists and the
+                general picking order), False for a draft sharing them with a draft that checked them already.
+        """
+        report = self.validation_report
+        table = self.malshab_table
+
+        # Every unit needs a list without duplicates, and my unit's Malshabs should be prioritized by some course
         for unit, malshab_ids in self.unit_to_malshab_ids.items():
+            is_my_unit = unit == self.my_unit
+            if not check_shared_inputs and not is_my_unit:
+                continue
             if not malshab_ids:
-                raise ValueError(f'No Malshab IDs found for unit {unit.name}. Please check your input.')
+                if check_shared_inputs:
+                    report.add_source_error(unit, None, f'No Malshab IDs found for unit {unit.name}.')
+                continue
+            malshab_id_to_index: dict[str, int] = {}
+            for index, malshab_id in enumerate(malshab_ids):
+                first_index = malshab_id_to_index.setdefault(malshab_id, index)
+                if first_index != index:
+                    if check_shared_inputs:
+                        first_line = report.get_line(unit, first_index)
+                        report.add_source_warning(
+                            unit, index, f'Malshab {malshab_id} appears more than once in the list of unit {unit.name}'
+                            + (f' (first on line {first_line}).' if first_line is not None else '.'),
+                        )
+                elif is_my_unit and table.get_row(malshab_id) is None:
+                    report.add_source_warning(unit, index, f'Malshab {malshab_id} of unit {unit.name} is not prioritized by any course.')
 
         # Check that all courses have prioritization
         for course, prioritization in self.course_to_prioritization.items():
-            if not prioritization.priorized_draft_picks:
-                raise ValueError(f'No prioritization found for course {course.name}. Please check your input.')
+            if not prioritization.priorized_rows:
+                report.add_source_error(course, None, f'No prioritization found for course {course.name}.')
 
-        # Check that the general picking order is not empty
-        if not self.general_picking_order:
-            raise ValueError('No general picking order found. Please check your input.')
-
-        # Check that the internal picking order is not empty
+        if check_shared_inputs and not self.general_picking_order:
+            report.add_source_error(GENERAL_PICKING_ORDER_SOURCE, None, 'No general picking order found.')
         if not self.internal_picking_order:
-            raise ValueError('No internal picking order found. Please check your input.')
+            report.add_source_error(INTERNAL_PICKING_ORDER_SOURCE, None, 'No internal picking order found.')
+        for index, course in enumerate(self.internal_picking_order):
+            if course == Course.EXTERNAL:
+                report.add_source_error(INTERNAL_PICKING_ORDER_SOURCE, index, f'Course {course.value} cannot be picked for internally.')
+
+        # Every internal pick needs a pick of my unit in the general picking order
+        my_unit_picks_count = self.general_picking_order.count(self.my_unit)
+        if self.general_picking_order and len(self.internal_picking_order) > my_unit_picks_count:
+            report.add_source_error(
+                INTERNAL_PICKING_ORDER_SOURCE, my_unit_picks_count,
+                f'The internal picking order has {len(self.internal_picking_order)} picks, but the general picking order '
+                f'only has {my_unit_picks_count} picks of unit {self.my_unit.name}.',
+            )
 
         # Check that after setup, remaining internal picks order is equal to internal picking order
-        if len(self.remaining_internal_picks_order) != len(self.internal_picking_order) or \
-                any(self.remaining_internal_picks_order[i] != self.internal_picking_order[i] for i in range(len(self.remaining_internal_picks_order))):
-            raise ValueError('Remaining internal picks order is not equal to internal picking order. Please check your input.')
+        if self.remaining_internal_picks_order != self.internal_picking_order:
+            report.add_error(None, None, 'Remaining internal picks order is not equal to internal picking order.')
+
+        self._print_warnings()
+        report.raise_for_errors()
 
-    def setup_course_prioritization(self):
+    def _print_warnings(self):
+        warnings = self.validation_report.warnings
+        for warning in warnings[:MAX_PRINTED_WARNINGS]:
+            print(warning)
+        if len(warnings) > MAX_PRINTED_WARNINGS:
+            print(f'... and {len(warnings) - MAX_PRINTED_WARNINGS} more warnings in the validation report.')
+
+    def setup_course_prioritization(self, course_to_csv_path: dict[Course, str] = None):
         """
         Setup the course prioritization for the draft.
+        Args:
+            course_to_csv_path (dict[Course, str]): The CSV file of each course, prompted for if not given.
         """
-        # For each course, load the prioritization from a CSV file
+        # For each course, load the prioritization from a CSV file, reporting malformed rows instead of failing on them
         for course in self.course_to_prioritization.keys():
-            self.course_to_prioritization[course].load_from_csv(
-                self._get_input(f'Enter the path to the {course.name} prioritization CSV file: ')
+            self.course_to_prioritization[course].load_parsed(
+                self._get_parsed_prioritization(
+                    course_to_csv_path[course] if course_to_csv_path is not None else
+                    self._get_input(f'Enter the path to the {course.name} prioritization CSV file: ')
+                ),
+                report=self.validation_report,
+                source=course,
             )
             print(f'Loaded {course.name} prioritization from CSV file successfully.')
 
         print('All course prioritizations loaded successfully.')
 
 
+    def _prefetch_inputs(self, config: DraftConfig, executor: ThreadPoolExecutor):
+        """
+        Start parsing all the input files of the config in the background (or loading them from the cache),
+        so the setup only waits for them when it loads them, in order.
+        """
+        path_and_kinds = {(csv_path, PRIORITIZATION_KIND) for csv_path in config.course_to_prioritization_path.values()}
+        path_and_kinds.update((csv_path, SINGLE_COLUMN_KIND) for csv_path in config.unit_to_malshab_ids_path.values())
+        path_and_kinds.add((config.internal_picking_order_path, SINGLE_COLUMN_KIND))
+        if config.general_picking_order is None:
+            path_and_kinds.add((config.general_picking_order_path, SINGLE_COLUMN_KIND))
+
+        def get_size(path_and_kind: tuple[str, str]) -> int:
+            try:
+                return os.path.getsize(path_and_kind[0])
+            except OSError:
+                # Missing files fail when they are loaded
+                return 0
+
+        # Start with the largest files, so the setup takes about as long as the largest one
+        for csv_path, kind in sorted(path_and_kinds, key=get_size, reverse=True):
+            load = self.input_cache.load_prioritization if kind == PRIORITIZATION_KIND else self.input_cache.load_single_column
+            self.pending_inputs[(csv_path, kind)] = executor.submit(load, csv_path)
+
+    def _get_parsed_prioritization(self, csv_path: str) -> ParsedPrioritization:
+        pending_input = self.pending_inputs.get((csv_path, PRIORITIZATION_KIND))
+        return pending_input.result() if pending_input is not None else self.input_cache.load_prioritization(csv_path)
+
+    def _get_parsed_column(self, csv_path: str) -> ParsedColumn:
+        pending_input = self.pending_inputs.get((csv_path, SINGLE_COLUMN_KIND))
+        return pending_input.result() if pending_input is not None else self.input_cache.load_single_column(csv_path)
+
     def load_single_column_csv(self, csv_path: str) -> list[str]:
         """
         Load a single column CSV file and return the values as a list.
@@ -102,65 +302,160 @@ class Draft:
             csv_path (str): Path to the CSV file.
         Returns:
             list[str]: List of values from the CSV file."""
-        with open(csv_path, 'r') as file:
-            values = [line.strip() for line in file.readlines() if line.strip()]
+        return ParsedColumn.parse(csv_path).values
+
+    def _load_single_column_csv_source(self, csv_path: str, source, value_type: type[Enum] = None) -> list:
+        """
+        Load a single column CSV file, recording the line of each value in the validation report.
+        Args:
+            csv_path (str): Path to the CSV file.
+            source: The key to record the file under in the report.
+            value_type (type[Enum]): The enum to parse the values as, unknown values are reported and skipped.
+        Returns:
+            list: The values, parsed if a value type is given.
+        """
+        parsed_column = self._get_parsed_column(csv_path)
+        if value_type is None:
+            self.validation_report.set_source(source, csv_path, parsed_column.lines)
+            return list(parsed_column.values)
+
+        values = []
+        lines = array('I')
+        for line_number, value in zip(parsed_column.lines, parsed_column.values):
+            try:
+                value = value_type(value)
+            except ValueError:
+                self.validation_report.add_error(csv_path, line_number, f'Unknown {value_type.__name__.lower()} {value!r}.')
+                continue
+            values.append(value)
+            lines.append(line_number)
+        self.validation_report.set_source(source, csv_path, lines)
         return values
 
 
-    def setup_unit_to_malshab_ids(self):
+    def setup_unit_to_malshab_ids(self, unit_to_csv_path: dict[Unit, str] = None):
         """
         Setup the mapping of units to Malshab IDs, based on CSV files.
         Each unit has a CSV file with the Malshab IDs that are relevant to it, in a single column.
+        Args:
+            unit_to_csv_path (dict[Unit, str]): The CSV file of each unit, prompted for if not given.
         """
         # For each unit, load the Malshab IDs from a CSV file
         for unit in self.unit_to_malshab_ids.keys():
-            self.unit_to_malshab_ids[unit] = self.load_single_column_csv(
-                self._get_input(f'Enter the path to the {unit.name} Malshab IDs CSV file: ')
+            self.unit_to_malshab_ids[unit] = self._load_single_column_csv_source(
+                unit_to_csv_path[unit] if unit_to_csv_path is not None else
+                self._get_input(f'Enter the path to the {unit.name} Malshab IDs CSV file: '),
+                unit,
             )
             print(f'Loaded {unit.name} Malshab IDs from CSV file successfully.')
 
+        # Index the lists once, so eligibility checks during the draft don't scan them
+        self.eligibility_index.build(self.unit_to_malshab_ids)
         print('All unit to Malshab ID mappings loaded successfully.')
 
-    def setup_general_picking_order(self):
+    def setup_general_picking_order(self, csv_path: str = None):
         """
-        Setup the general picking order for the draft from a csv.
+        Setup the general picking order for the draft from a csv, compressing it.
+        Args:
+            csv_path (str): Path to the CSV file, prompted for if not given.
         """
-        self.general_picking_order = [
-            Unit(unit) for unit in
-            self.load_single_column_csv(
-                self._get_input('Enter the path to the general picking order CSV file: ')
-            )
-        ]
+        self.set_general_picking_order(PickingOrder.from_units(self._load_single_column_csv_source(
+            csv_path if csv_path is not None else
+            self._get_input('Enter the path to the general picking order CSV file: '),
+            GENERAL_PICKING_ORDER_SOURCE,
+            Unit,
+        )))
         print('General picking order loaded successfully.')
 
-    def setup_internal_picking_order(self):
+    def set_general_picking_order(self, general_picking_order: PickingOrder):
+        """
+        Set the general picking order for the draft, e.g. one made from a pattern.
+        Args:
+            general_picking_order (PickingOrder): The order in which the units pick.
+        """
+        self.general_picking_order = general_picking_order
+        self.contested_pick_index.build(self.general_picking_order)
+
+    def setup_internal_picking_order(self, csv_path: str = None):
         """
         Setup the internal picking order for the draft from a csv.
+        Args:
+            csv_path (str): Path to the CSV file, prompted for if not given.
         """
-        self.internal_picking_order = [
-            Course(course) for course in
-            self.load_single_column_csv(
-                self._get_input('Enter the path to the internal picking order CSV file: ')
-            )
-        ]
-        self.remaining_internal_picks_order = deepcopy(self.internal_picking_order)
+        self.internal_picking_order = self._load_single_column_csv_source(
+            csv_path if csv_path is not None else
+            self._get_input('Enter the path to the internal picking order CSV file: '),
+            INTERNAL_PICKING_ORDER_SOURCE,
+            Course,
+        )
+        self.remaining_internal_picks_order = list(self.internal_picking_order)
         print('Internal picking order loaded successfully.')
 
-    def setup(self):
+    def setup_quotas(
+        self,
+        course_to_limits: dict[Course, dict[QuotaAttribute, int]],
+        unit_to_limits: dict[Unit, dict[QuotaAttribute, int]],
+        schakim_latest_draft_pick: int | None,
+    ):
+        """
+        Setup the combat, gender and schakim quotas of the courses and the units.
+        Args:
+            course_to_limits (dict[Course, dict[QuotaAttribute, int]]): The maximal count of each attribute per course.
+            unit_to_limits (dict[Unit, dict[QuotaAttribute, int]]): The maximal count of each attribute per unit.
+            schakim_latest_draft_pick (int | None): The last draft pick in which schakim can be picked, None for no limit.
+        """
+        self.quota_tracker.set_limits(course_to_limits, unit_to_limits)
+        self.quota_tracker.schakim_latest_draft_pick = schakim_latest_draft_pick
+        print('Quotas loaded successfully.')
+
+    def setup(self, config: DraftConfig = None):
         """
         Setup the draft by loading all necessary data from CSV files.
+        Args:
+            config (DraftConfig): The paths of all the CSV files. If not given, each path is prompted for.
         """
-        # Load all the data from CSV files
+        # Load all the data from CSV files, collecting the problems in them to validate them all together
         print('Starting draft setup...')
-        self.setup_course_prioritization()
-        self.setup_unit_to_malshab_ids()
-        self.setup_general_picking_order()
-        self.setup_internal_picking_order()
+        self.validation_report = ValidationReport()
+        if config is None:
+            self.setup_course_prioritization()
+            self.setup_unit_to_malshab_ids()
+            self.setup_general_picking_order()
+            self.setup_internal_picking_order()
+        else:
+            # An unchanged setup is mapped from its cached image, which was validated when it was cached
+            self.input_cache = InputCache(config.cache_directory)
+            setup_image_path = self.input_cache.get_setup_image_path(config, self.my_unit)
+            cached_setup = self.input_cache.load_setup_image(setup_image_path)
+            if cached_setup is not None:
+                setup_image, self.validation_report.issues = cached_setup
+                setup_image.restore(self)
+                print('Draft setup loaded from the cache, none of the input files changed.')
+                self._print_warnings()
+                print('Draft setup completed successfully.')
+                return
+
+            # All the files are parsed concurrently, but loaded in order, so the Malshab table is the same every time
+            with ThreadPoolExecutor(thread_name_prefix='draft-setup') as executor:
+                self._prefetch_inputs(config, executor)
+                try:
+                    self.setup_course_prioritization(config.course_to_prioritization_path)
+                    self.setup_unit_to_malshab_ids(config.unit_to_malshab_ids_path)
+                    if config.general_picking_order is not None:
+                        self.set_general_picking_order(config.general_picking_order)
+                    else:
+                        self.setup_general_picking_order(config.general_picking_order_path)
+                    self.setup_internal_picking_order(config.internal_picking_order_path)
+                    self.setup_quotas(config.course_to_quota_limits, config.unit_to_quota_limits, config.schakim_latest_draft_pick)
+                finally:
+                    self.pending_inputs = {}
         print('Draft data loaded successfully.')
 
         # Validate data makes sense
         self.validate_input_data()
         print('Draft input data validated successfully.')
+        if config is not None:
+            self.input_cache.write_setup_image(setup_image_path, self)
 
         print('Draft setup completed successfully.')
 
@@ -176,8 +471,8 @@ class Draft:
             while True:
                 try:
                     overridden_malshab_id = self._get_input('Enter the chosen Malshab ID: ').strip()
-                    if overridden_malshab_id not in self.unit_to_malshab_ids[MY_UNIT]:
-                        print(f'Malshab ID {overridden_malshab_id} is not allowed for unit {MY_UNIT.name}. Let them choose again.')
+                    if not self.eligibility_index.can_pick(self.my_unit, overridden_malshab_id):
+                        print(f'Malshab ID {overridden_malshab_id} is not allowed for unit {self.my_unit.name}. Let them choose again.')
                         continue
                     overridden_course = Course(
                         self._get_input(
@@ -189,24 +484,28 @@ class Draft:
                     print(f'Error: {e}')
                     continue
             print(f'Chosen Malshab ID: {overridden_malshab_id} for course {overridden_course.name}')
+            if self.journal is not None:
+                self.journal.record_override(self.current_draft_pick, suggestion.id, overridden_malshab_id, overridden_course)
             return overridden_malshab_id, overridden_course
 
-    def _can_be_picked_now(self, suggestion: Malshab, current_draft_pick_index: int) -> bool:
+    def _can_be_picked_now(self, suggestion: Malshab, current_draft_pick_index: int, course: Course = None) -> bool:
         """
         Check if the suggestion can be picked now.
         This is used to determine if the suggestion is still valid for the current draft pick.
         Args:
             suggestion (Malshab): The suggestion to check.
             current_draft_pick_index (int): The index of the current draft pick.
+            course (Course): The course the suggestion is for. If not given, the quotas are not checked.
         Returns:
             bool: True if the suggestion can be picked now, False otherwise.
         """
-        # Enforce combat limitations
-        # TODO: count the number of combat already picked,
-        #  and somehow handle the theoretical malshabs you pushed to call later, to see the number of combat is not being exceeded
+        # Enforce combat and gender limitations, counting both the Malshabs already picked,
+        # and the ones the scheduler reserved for later picks
+        if course is not None and not self.quota_tracker.can_add(suggestion.row, self.my_unit, course):
+            return False
 
         # Enforce Shakim limitations
-        if suggestion.is_schakim and current_draft_pick_index > 100:
+        if suggestion.is_schakim and not self.quota_tracker.can_pick_schakim_at(current_draft_pick_index):
             return False
 
         return True
@@ -214,98 +513,128 @@ class Draft:
     def get_lateset_pick_for_suggestion(
         self,
         suggestion: Malshab,
+        course: Course = None,
     ) -> int | None:
-        # Perform a mock check to see how far we can go without calling the suggestion
-        mock_draft_pick_index = self.current_draft_pick
-        relative_pick_number_for_unit = 0
-        latest_pick_for_suggestion = None
-        while True:
-            current_unit = self.general_picking_order[mock_draft_pick_index]
-            # Check if another unit is picking now
-            if current_unit != MY_UNIT:
-                # Check if suggestion can theoretically be picked by this unit
-                if suggestion.id in self.unit_to_malshab_ids[current_unit]:
-                    # Can be picked by another unit, hence the last found latest pick is the latest possible
-                    return latest_pick_for_suggestion
-                # If not, we can continue to the next pick of another unit
-                mock_draft_pick_index += 1
-                continue
+        """
+        Get the latest pick of my unit, relative to the current one, in which the suggestion can still be called.
+        The suggestion is safe until the next pick of another unit that has it on its list,
+        and as long as it can be picked by us (_can_be_picked_now is expected to stay False once it turns False).
+        With a pick probability model, it is safe until the chance other units took it passes the max pick risk.
+        Args:
+            suggestion (Malshab): The suggestion to check.
+            course (Course): The course the suggestion is for. If given, it must also fit the quotas.
+        Returns:
+            int | None: The latest relative pick number, or None if the suggestion cannot be picked at all.
+        """
+        # Find the next pick in which another unit can (or is too likely to) take the suggestion
+        if self.pick_probability_model is not None:
+            contested_pick = self._get_risky_pick(suggestion.id)
+        else:
+            contested_pick = self.contested_pick_index.get_next_contested_pick(suggestion.id, self.current_draft_pick)
+        # All of my unit's picks until then are candidates for calling the suggestion
+        available_picks_count = self.contested_pick_index.count_my_unit_picks(self.current_draft_pick, contested_pick)
+
+        # Binary search for the number of picks in which the suggestion can still be picked
+        low, high = 0, available_picks_count
+        lookahead_steps = 0
+        # Usually nothing stops it from being picked until then, which the last of the picks shows at once
+        if high > 0:
+            lookahead_steps += 1
+            if self._can_be_picked_now(suggestion, self.contested_pick_index.get_my_unit_pick(high - 1, self.current_draft_pick), course):
+                low = high
+            else:
+                high -= 1
+        while low < high:
+            lookahead_steps += 1
+            middle = (low + high) // 2
+            mock_draft_pick_index = self.contested_pick_index.get_my_unit_pick(middle, self.current_draft_pick)
+            if self._can_be_picked_now(suggestion, mock_draft_pick_index, course):
+                low = middle + 1
+            else:
+                high = middle
+        if self.metrics is not None and self.metrics.current_pick is not None:
+            self.metrics.current_pick.lookahead_steps += lookahead_steps
 
-            # My unit is picking now
-            # Check if the suggestion is can be picked now
-            if self._can_be_picked_now(suggestion, mock_draft_pick_index):
-                # If so, set latest possible, and assume we are picking someone else, so we'll try to pick the suggestion again
-                latest_pick_for_suggestion = relative_pick_number_for_unit
-                relative_pick_number_for_unit += 1
-                mock_draft_pick_index += 1
-                continue
+        # The last pick in which it was possible to pick is the latest possible
+        return low - 1 if low > 0 else None
 
-            # If the suggestion cannot be picked now, we need to return the latest pick in which it was possible to pick
-            return latest_pick_for_suggestion
 
+    def _get_risky_pick(self, malshab_id: str) -> int:
+        """
+        Get the first pick, from the current one, by which the chance that other units took the Malshab
+        passes the max pick risk, by the pick probability model.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+        Returns:
+            int: The pick number, or the total number of picks if the risk stays acceptable until the end.
+        """
+        contested_pick_index = self.contested_pick_index
+        total_picks = contested_pick_index.total_picks
+        current_draft_pick = self.current_draft_pick
+        first_contested_pick = contested_pick_index.get_next_contested_pick(malshab_id, current_draft_pick)
+        if first_contested_pick >= total_picks:
+            return first_contested_pick
+
+        # The Malshab is scored once for every other unit that can take it, and its chance to survive all of a unit's picks
+        # until a given pick has a closed form, so the risky pick is binary searched instead of walking the picks
+        model = self.pick_probability_model
+        units_mask = self.eligibility_index.get_mask(malshab_id) & ~EligibilityIndex.UNIT_TO_BIT[self.my_unit]
+        unit_parameters = [
+            (unit, model.get_relative_weights(self, unit, [malshab_id])[0], model.get_available_count(self, unit))
+            for unit, unit_bit in EligibilityIndex.UNIT_TO_BIT.items() if units_mask & unit_bit
+        ]
+        get_survival_log_probability = model.get_survival_log_probability
+        count_unit_picks = contested_pick_index.count_unit_picks
+        min_survival_log_probability = math.log1p(-self.max_pick_risk) if self.max_pick_risk < 1 else -math.inf
+
+        def is_risky(pick_index: int) -> bool:
+            # The chance the Malshab survives the picks until this one, including it
+            survival_log_probability = sum(
+                get_survival_log_probability(relative_weight, available_count, count_unit_picks(unit, current_draft_pick, pick_index + 1))
+                for unit, relative_weight, available_count in unit_parameters
+            )
+            return survival_log_probability < min_survival_log_probability
+
+        # The survival only drops in picks of the units that can take it, so the first risky pick is one of them
+        low, high = first_contested_pick, total_picks
+        while low < high:
+            middle = (low + high) // 2
+            if is_risky(middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
 
     def _get_suggestion_for_internal_pick(self) -> tuple[Malshab, Course]:
         """
         Get the next suggestion for an internal pick.
         This includes checking if the Malshab is contested and returning the suggestion.
+        The decision itself is made by the draft's pick scheduler, ahead of time if speculating.
         Returns:
             tuple[Malshab, Course]: The next suggested draft pick and the course.
         """
-        next_course = self.remaining_internal_picks_order[0]
-        chosen_malshab_id = None
-        current_pick_index = 0
-        optimized_pick_number_to_malshab_id: dict[int, str] = {}
-        while not chosen_malshab_id:
-            # Get the next course from the internal picking order
-            print(f'-- Testing next call for course {next_course.name}')
-
-            # Get the next suggestion for the draft pick
-            suggestion: Malshab = self.course_to_prioritization[next_course].get_next_suggestion()
-
-            # Check if the suggestion is None (no more suggestions available)
-            if suggestion is None:
-                print(f'-- No more suggestions available for course {next_course.name}. Moving to the next course.')
-                self.remaining_internal_picks_order.pop(current_pick_index)
-                if len(self.remaining_internal_picks_order) <= current_pick_index:
-                    print('-- No more picks available. Ending draft.')
-                    self.is_active = False
-                    return None, None
-                next_course = self.remaining_internal_picks_order[current_pick_index]
-                continue
-
-            # Check if the suggestion can be delayed
-            latest_pick_for_current_suggestion = self.get_lateset_pick_for_suggestion(suggestion, current_pick_index)
-
-            # Skip this suggestion if he cannot be picked
-            if latest_pick_for_current_suggestion is None:
-                print(f'-- Suggestion {suggestion.malshab.id} cannot be picked. Skipping and choosing again for same course.')
-                continue
-
-            # Try to fit this pick into the optimized pick number (queue)
-            while latest_pick_for_current_suggestion > 0:
-                if latest_pick_for_current_suggestion not in optimized_pick_number_to_malshab_id:
-                    optimized_pick_number_to_malshab_id[latest_pick_for_current_suggestion] = suggestion.malshab.id
-                    break
-                else:
-                    latest_pick_for_current_suggestion -= 1
-
-            # If suggestion should be immidiately picked, or if the queue is overflowing
-            if latest_pick_for_current_suggestion == 0:
-                print(f'-- Suggestion {suggestion.malshab.id} is contested. Picking it now.')
-                chosen_malshab_id = suggestion.malshab.id
-                break
-            else:
-                print(f'-- Suggestion {suggestion.malshab.id} is not contested, and predicted to be called in {latest_pick_for_current_suggestion} picks.')
-                print('--Checking next suggestion.')
-
-            current_pick_index += 1
-            if len(self.remaining_internal_picks_order) <= current_pick_index:
-                print('-- No more picks available. Ending draft.')
-                self.is_active = False
-                return None, None
-            next_course = self.remaining_internal_picks_order[current_pick_index]
-
-        return suggestion, next_course
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.start_pick(self.current_draft_pick, self.current_internal_pick)
+        try:
+            if self.speculative_recommender is not None:
+                return self.speculative_recommender.get_suggestion(self)
+            return self.pick_scheduler.get_suggestion(self)
+        finally:
+            if metrics is not None:
+                metrics.end_pick()
+
+    def remove_internal_pick(self, index: int) -> Course:
+        """
+        Remove a pick from the remaining internal picking order, recording it so it can be undone.
+        Args:
+            index (int): The index of the pick in the remaining internal picking order.
+        Returns:
+            Course: The course of the removed pick.
+        """
+        course = self.remaining_internal_picks_order.pop(index)
+        self.history.pending_removed_internal_picks.append((index, course))
+        return course
 
     def handle_chosen_malshab(
         self,
@@ -318,48 +647,262 @@ class Draft:
         This includes updating the prioritization for each course and marking the Malshab as chosen.
         Args:
             malshab_id (str): The ID of the chosen Malshab.
+            unit (Unit): The unit that chose the Malshab.
+            course (Course): The course the Malshab was chosen for, external for other units.
         """
+        step = self.history.start_step(self.current_draft_pick, unit)
+
+        # Let the scheduler update its plan before the draft moves on
+        self.pick_scheduler.handle_malshab_chosen(self, malshab_id, unit, course)
+        if self.speculative_recommender is not None:
+            self.speculative_recommender.handle_malshab_chosen(self, malshab_id, unit)
+
         # Update the prioritization for each course
-        for course in self.course_to_prioritization.keys():
-            self.course_to_prioritization[course].handle_malshab_chosen(malshab_id)
+        metrics = self.metrics
+        if metrics is not None:
+            removal_start_time = time.perf_counter()
+        for prioritization_course, prioritization in self.course_to_prioritization.items():
+            head_position = prioritization.head_position
+            removed_position = prioritization.handle_malshab_chosen(malshab_id)
+            if removed_position is not None:
+                step.prioritization_removals.append((prioritization_course, removed_position, head_position))
+        if metrics is not None:
+            metrics.record_removal(self.current_draft_pick, unit, time.perf_counter() - removal_start_time, len(step.prioritization_removals))
+
+        # Count the Malshab towards the quotas, if we know its details
+        row = self.malshab_table.get_row(malshab_id)
+        if row is not None:
+            self.quota_tracker.commit(row, unit, course)
+            step.quota_row = row
 
         # Mark the Malshab as chosen in the draft results
-        self.draft_results.append(
-            DraftResult(
-                malshab_id=malshab_id,
-                unit=unit,
-                course=course,
-                pick=self.current_draft_pick,
-            )
+        draft_result = DraftResult(
+            malshab_id=malshab_id,
+            unit=unit,
+            course=course,
+            pick=self.current_draft_pick,
         )
+        self.draft_results.append(draft_result)
+        step.draft_result = draft_result
+        if self.journal is not None:
+            self.journal.record_pick(draft_result)
 
-        if unit == MY_UNIT:
+        if unit == self.my_unit:
             # If it's our unit's turn, we need to update the internal picking order
-            self.remaining_internal_picks_order.remove(course)
+            index = self.remaining_internal_picks_order.index(course)
+            self.remaining_internal_picks_order.pop(index)
+            step.removed_internal_picks.append((index, course))
             self.current_internal_pick += 1
 
+        self.history.complete_step(step)
+        self._advance_draft_pick()
+
+    def _advance_draft_pick(self):
+        """
+        Move on to the next draft pick, snapshotting the draft state every few picks if journaling.
+        """
         self.current_draft_pick += 1
+        if self.journal is not None and self.journal.should_snapshot(self.current_draft_pick):
+            self.journal.write_snapshot(self)
 
+    def skip_current_pick(self):
+        """
+        Skip the current draft pick, without assigning any Malshab.
+        """
+        skipped_unit = self.general_picking_order[self.current_draft_pick]
+        if self.journal is not None:
+            self.journal.record_skip(self.current_draft_pick, skipped_unit)
+        print(f'Pick no. {self.current_draft_pick + 1} of unit {skipped_unit.name} was skipped.')
+        self.history.complete_step(self.history.start_step(self.current_draft_pick, skipped_unit))
+        self._advance_draft_pick()
+
+    def _revert_removed_internal_picks(self, removed_internal_picks: list[tuple[int, Course]]):
+        for index, course in reversed(removed_internal_picks):
+            self.remaining_internal_picks_order.insert(index, course)
+
+    def undo(self):
+        """
+        Undo the last pick (or skip), restoring the draft state from before it.
+        Only the changes the pick made are reverted, so this doesn't depend on the size of the draft.
+        """
+        if not self.history.steps:
+            raise ValueError('There are no picks to undo.')
+
+        # Changes made while suggesting the current pick are reverted too
+        self._revert_removed_internal_picks(self.history.pending_removed_internal_picks)
+        self.history.pending_removed_internal_picks = []
+
+        step = self.history.steps.pop()
+        if step.draft_result is not None:
+            self.draft_results.pop()
+            if step.quota_row is not None:
+                self.quota_tracker.uncommit(step.quota_row, step.draft_result.unit, step.draft_result.course)
+            for course, position, head_position in reversed(step.prioritization_removals):
+                self.course_to_prioritization[course].restore_malshab(position, head_position)
+            if step.unit == self.my_unit:
+                self.current_internal_pick -= 1
+        self._revert_removed_internal_picks(step.removed_internal_picks)
+        self.history.undone_steps.append(step)
+
+        self.current_draft_pick = step.draft_pick
+        self.is_active = True
+
+        # The plans for the next picks were made for a state that no longer exists
+        self.pick_scheduler = self.pick_scheduler.fork()
+        self.quota_tracker.clear_reservations()
+        if self.speculative_recommender is not None:
+            self.speculative_recommender.invalidate()
+
+        if self.journal is not None:
+            # Snapshot right away, so resuming the draft doesn't replay the undone picks
+            self.journal.record_undo(self.current_draft_pick)
+            self.journal.write_snapshot(self)
+        print(f'Undid pick no. {self.current_draft_pick + 1} of unit {step.unit.name}.')
+
+    def redo(self):
+        """
+        Redo the last undone pick (or skip).
+        """
+        if not self.history.undone_steps:
+            raise ValueError('There are no undone picks to redo.')
+
+        step: DraftStep = self.history.undone_steps.pop()
+        self.history.is_redoing = True
+        try:
+            if step.draft_result is None:
+                self.skip_current_pick()
+            else:
+                self.handle_chosen_malshab(
+                    malshab_id=step.draft_result.malshab_id,
+                    unit=step.draft_result.unit,
+                    course=step.draft_result.course,
+                )
+        finally:
+            self.history.is_redoing = False
+
+    def rewind_to(self, draft_pick: int):
+        """
+        Undo or redo picks until the given draft pick is the current one.
+        Costs O(k) for moving k picks, regardless of the size of the draft.
+        Args:
+            draft_pick (int): The 0-based draft pick to move to.
+        """
+        while self.current_draft_pick > draft_pick and self.history.steps:
+            self.undo()
+        while self.current_draft_pick < draft_pick and self.history.undone_steps:
+            self.redo()
+        if self.current_draft_pick != draft_pick:
+            raise ValueError(f'Cannot move to pick no. {draft_pick + 1}, the draft is at pick no. {self.current_draft_pick + 1}.')
+
+    def resume_from_journal(self, journal: DraftJournal, snapshot: DraftImage = None):
+        """
+        Resume the draft from its journal, by loading the latest snapshot and replaying the records written after it.
+        A draft that was set up only takes the state from the snapshot. A draft that was not set up
+        takes the input data from the snapshot too, mapped from the file, so a restart doesn't need the CSV files.
+        Attaches the journal to the draft for the rest of it.
+        Args:
+            journal (DraftJournal): The journal of the draft.
+            snapshot (DraftImage): The latest snapshot, if it was loaded already.
+        Raises:
+            ValueError: If the snapshot was taken for another unit, or the journal undoes a pick the draft cannot undo.
+        """
+        journal_offset = 0
+        snapshot = snapshot if snapshot is not None else journal.load_snapshot()
+        if snapshot is not None:
+            journal_offset = snapshot.journal_offset
+            if self.internal_picking_order:
+                snapshot.restore_state(self)
+            else:
+                snapshot.restore(self)
+
+        # Replay only the tail of the journal, without recording it again
+        self.journal = None
+        replayed_records_count = 0
+        for record_type, record, _ in journal.read_records(journal_offset):
+            if record_type == JournalRecordType.PICK:
+                self.handle_chosen_malshab(malshab_id=record.malshab_id, unit=record.unit, course=record.course)
+            elif record_type == JournalRecordType.SKIP:
+                self.skip_current_pick()
+            elif record_type == JournalRecordType.UNDO:
+                (undone_pick,) = record
+                if not self.history.steps or self.history.steps[-1].draft_pick != undone_pick:
+                    raise ValueError(f'Journal undoes pick no. {undone_pick + 1}, which is not the last pick of the draft.')
+                self.undo()
+            replayed_records_count += 1
+        self.journal = journal
+        print(f'Resumed draft at pick no. {self.current_draft_pick + 1}, replayed {replayed_records_count} journal records.')
+
+
+    def _get_external_pick(self, unit: Unit) -> str | None:
+        """
+        Get the Malshab chosen by another unit from the draft manager.
+        Args:
+            unit (Unit): The unit picking now.
+        Returns:
+            str | None: The ID of the chosen Malshab, an undo or redo command, or None if the pick is skipped.
+        """
+        while True:
+            # Wait for the next unit to pick
+            chosen_malshab_id = self._get_input(
+                f'Enter {unit.name} the chosen Malshab ID (or "{SKIP_COMMAND}" / "{UNDO_COMMAND}" / "{REDO_COMMAND}"): '
+            ).strip()
+            if chosen_malshab_id.lower() == SKIP_COMMAND:
+                return None
+            if chosen_malshab_id.lower() in (UNDO_COMMAND, REDO_COMMAND):
+                return chosen_malshab_id.lower()
+            # Check if the chosen Malshab ID is valid
+            if not self.eligibility_index.can_pick(unit, chosen_malshab_id):
+                print(f'Malshab ID {chosen_malshab_id} is not allowed for unit {unit.name}. Let them choose again.')
+                continue
+            return chosen_malshab_id
+
+    def _print_lookahead(self, recommendations_count: int = 5):
+        """
+        Print the best candidates for the current pick by the lookahead search, with the plans they lead to.
+        """
+        recommendations = self.lookahead_search.search(self)
+        if not recommendations:
+            return
+        print(f'-- Lookahead over the next {len(recommendations[0].plan)} picks:')
+        for number, recommendation in enumerate(recommendations[:recommendations_count], start=1):
+            plan_description = ', '.join(f'{malshab_id} for {course.name}' for malshab_id, course in recommendation.plan[1:])
+            print(
+                f'--   {number}. {recommendation.malshab_id} for course {recommendation.course.name}, '
+                f'expected value {recommendation.expected_value:.3f}' + (f' (then {plan_description})' if plan_description else '')
+            )
 
     def act(self):
         """
         Perform the draft action.
         This is where the main logic of the draft will be implemented.
         """
+        if self.current_draft_pick >= len(self.general_picking_order):
+            print('No more picks in the general picking order. Ending draft.')
+            self.is_active = False
+            return
+
         # Get input from the draft manager
         next_unit = self.general_picking_order[self.current_draft_pick]
         print(f'Pick no. {self.current_draft_pick + 1} for unit {next_unit.name}')
 
         # Fill in data for when its another unit's turn
-        if next_unit != MY_UNIT:
-            while True:
-                # Wait for the next unit to pick
-                chosen_malshab_id = self._get_input(f'Enter {next_unit.name} the chosen Malshab ID: ').strip()
-                # Check if the chosen Malshab ID is valid
-                if chosen_malshab_id not in self.unit_to_malshab_ids[next_unit]:
-                    print(f'Malshab ID {chosen_malshab_id} is not allowed for unit {next_unit.name}. Let them choose again.')
-                    continue
-                break
+        if next_unit != self.my_unit:
+            # While waiting for the other unit, compute our next suggestion in the background
+            if self.speculative_recommender is not None:
+                self.speculative_recommender.speculate(self)
+            chosen_malshab_id = self._get_external_pick(next_unit)
+            if chosen_malshab_id is None:
+                self.skip_current_pick()
+                return
+            if chosen_malshab_id in (UNDO_COMMAND, REDO_COMMAND):
+                try:
+                    if chosen_malshab_id == UNDO_COMMAND:
+                        self.undo()
+                    else:
+                        self.redo()
+                except ValueError as e:
+                    print(f'Error: {e}')
+                return
 
             self.handle_chosen_malshab(
                 malshab_id=chosen_malshab_id,
@@ -375,28 +918,79 @@ class Draft:
                 print('-- No more picks available. Ending draft.')
                 return
 
+            if self.lookahead_search is not None:
+                self._print_lookahead()
+
             # Handle the chosen Malshab
             chosen_malshab_id, chosen_course = self._handle_suggestion(suggestion, next_course)
             self.handle_chosen_malshab(
                 malshab_id=chosen_malshab_id,
-                unit=MY_UNIT,
+                unit=self.my_unit,
                 course=chosen_course,
             )
 
 
 
 
-    def run(self):
+    def run(
+        self,
+        journal_directory: str = None,
+        config: DraftConfig = None,
+        speculate: bool = False,
+        metrics: DraftMetrics = None,
+        log_level: int = logging.INFO,
+        lookahead_search: LookaheadSearch = None,
+    ):
         """
         Run the draft process.
+        Args:
+            journal_directory (str): Directory to journal the draft to. If it has a journal already, the draft is resumed from it.
+            config (DraftConfig): The paths of the input files. If not given, each path is prompted for.
+            speculate (bool): Compute my unit's next suggestion in the background, while other units pick.
+            metrics (DraftMetrics): Metrics to measure the draft with.
+            log_level (int): The level of the scheduler's reasoning logs, INFO shows every suggestion it tests.
+            lookahead_search (LookaheadSearch): Search to show alongside every suggestion for my unit.
         """
+        # Show the reasoning logs with the rest of the draft output, unless logging was configured already
+        logging.basicConfig(level=log_level, format='%(message)s', stream=sys.stdout)
+        self.metrics = metrics
+        self.lookahead_search = lookahead_search
+
+        journal = None
+        snapshot = None
+        if journal_directory is not None:
+            journal = DraftJournal(journal_directory)
+            snapshot = journal.load_snapshot()
+
         try:
-            self.setup()
+            if snapshot is None:
+                self.setup(config)
+            else:
+                print('Found a snapshot of the draft, loading the draft data from it instead of setting up.')
         except Exception as e:
             print(f'Error during draft setup: {e}')
             return
 
-        while self.is_active:
-            self.act()
+        if journal is not None:
+            journal.open()
+            self.resume_from_journal(journal, snapshot)
+            # Snapshot the set up draft right away, so restarting never needs the input files again
+            if snapshot is None:
+                journal.write_snapshot(self)
+
+        if speculate:
+            self.speculative_recommender = SpeculativeRecommender()
+            self.speculative_recommender.start()
+
+        try:
+            while self.is_active:
+                self.act()
+        finally:
+            if self.speculative_recommender is not None:
+                self.speculative_recommender.stop()
+            if self.lookahead_search is not None:
+                self.lookahead_search.close()
+            if self.journal is not None:
+                self.journal.close()
 
 
@@ -0,0 +1,209 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+from clutch_libs.miluim.batch_driver import HeadlessDraft
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.malshab import Malshab
+from clutch_libs.miluim.pick_scheduler import PICK_SCHEDULERS, GreedySlotScheduler
+from clutch_libs.miluim.synthetic_draft import (
+    SyntheticDraftParameters,
+    choose_random_available_malshab,
+    generate_synthetic_draft,
+)
+
+BASELINE_FORMAT_VERSION = 1
+PERCENTILES = (50, 90, 99)
+
+# Predefined benchmark scenarios, from a small rehearsal to a large, highly contested draft
+SCENARIOS: dict[str, SyntheticDraftParameters] = {
+    'small': SyntheticDraftParameters(malshabs_count=500, picks_count=150),
+    'medium': SyntheticDraftParameters(malshabs_count=5000, picks_count=1200),
+    'large': SyntheticDraftParameters(malshabs_count=20000, picks_count=4000),
+    'high_overlap': SyntheticDraftParameters(malshabs_count=5000, picks_count=1200, eligibility_ratio=0.9),
+    'two_units': SyntheticDraftParameters(malshabs_count=5000, picks_count=1200, units=[Unit.TISHIM, Unit.SHIVIM]),
+    'schakim_heavy': SyntheticDraftParameters(malshabs_count=5000, picks_count=1200, schakim_ratio=0.5, combat_ratio=0.8),
+}
+
+
+class BenchmarkDraft(HeadlessDraft):
+    """
+    A headless draft where other units pick random available Malshabs from their lists,
+    and the time spent in the recommendation path is measured.
+    """
+
+    def __init__(self, seed: int):
+        super().__init__(pick_records=[])
+        self.generator: random.Random = random.Random(seed)
+        self.taken_malshab_ids: set[str] = set()
+        self.suggestion_seconds: list[float] = []
+        self.handle_chosen_seconds: list[float] = []
+        self.latest_pick_seconds: float = 0.0
+        self.latest_pick_calls: int = 0
+
+    def _get_external_pick(self, unit: Unit) -> str | None:
+        return choose_random_available_malshab(self, unit, self.taken_malshab_ids, self.generator)
+
+    def _get_suggestion_for_internal_pick(self) -> tuple[Malshab, Course]:
+        suggestion, next_course = super()._get_suggestion_for_internal_pick()
+        self.suggestion_seconds.append(self.last_suggestion_seconds)
+        return suggestion, next_course
+
+    def get_lateset_pick_for_suggestion(self, suggestion: Malshab, course: Course = None) -> int | None:
+        start_time = time.perf_counter()
+        latest_pick = super().get_lateset_pick_for_suggestion(suggestion, course)
+        self.latest_pick_seconds += time.perf_counter() - start_time
+        self.latest_pick_calls += 1
+        return latest_pick
+
+    def handle_chosen_malshab(self, malshab_id: str, unit: Unit, course: Course = Course.EXTERNAL):
+        start_time = time.perf_counter()
+        super().handle_chosen_malshab(malshab_id, unit, course)
+        self.handle_chosen_seconds.append(time.perf_counter() - start_time)
+        self.taken_malshab_ids.add(malshab_id)
+
+
+def _get_percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {f'p{percentile}': None for percentile in PERCENTILES} | {'max': None, 'mean': None}
+    sorted_values = sorted(values)
+    percentiles = {
+        f'p{percentile}': sorted_values[min(len(sorted_values) - 1, len(sorted_values) * percentile // 100)]
+        for percentile in PERCENTILES
+    }
+    return percentiles | {'max': sorted_values[-1], 'mean': sum(sorted_values) / len(sorted_values)}
+
+
+def _run_draft(parameters: SyntheticDraftParameters, scheduler_name: str) -> tuple[BenchmarkDraft, float, float]:
+    setup_start_time = time.perf_counter()
+    draft = generate_synthetic_draft(parameters, BenchmarkDraft(parameters.seed))
+    draft.pick_scheduler = PICK_SCHEDULERS[scheduler_name]()
+    setup_seconds = time.perf_counter() - setup_start_time
+
+    draft_start_time = time.perf_counter()
+    draft.run_to_completion()
+    draft_seconds = time.perf_counter() - draft_start_time
+    return draft, setup_seconds, draft_seconds
+
+
+def run_benchmark(
+    parameters: SyntheticDraftParameters,
+    measure_memory: bool = True,
+    scheduler_name: str = GreedySlotScheduler.name,
+) -> dict:
+    """
+    Run a full synthetic draft and measure the recommendation path.
+    Memory is measured in a separate run, since tracing allocations slows down the timed run.
+    Args:
+        parameters (SyntheticDraftParameters): The parameters of the synthetic draft.
+        measure_memory (bool): Whether to measure the peak memory of the draft.
+        scheduler_name (str): The name of the pick scheduler making the suggestions.
+    Returns:
+        dict: The benchmark metrics.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        draft, setup_seconds, draft_seconds = _run_draft(parameters, scheduler_name)
+
+        peak_memory_bytes = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                _run_draft(parameters, scheduler_name)
+                _, peak_memory_bytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+    return {
+        'parameters': parameters.to_dict(),
+        'scheduler': scheduler_name,
+        'picks_made': len(draft.draft_results),
+        'internal_picks_made': draft.current_internal_pick,
+        'setup_seconds': setup_seconds,
+        'draft_seconds': draft_seconds,
+        'suggestion_seconds': _get_percentiles(draft.suggestion_seconds),
+        'handle_chosen_malshab_seconds': _get_percentiles(draft.handle_chosen_seconds),
+        'latest_pick_calls': draft.latest_pick_calls,
+        'latest_pick_seconds_total': draft.latest_pick_seconds,
+        'peak_memory_bytes': peak_memory_bytes,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict) -> list[str]:
+    """
+    Compare benchmark results to a saved baseline.
+    Args:
+        results (dict): The results of the current run, by scenario.
+        baseline (dict): The saved baseline, by scenario.
+    Returns:
+        list[str]: A line per compared metric, with the relative change.
+    """
+    comparison_lines = []
+    for scenario, metrics in results.items():
+        baseline_metrics = baseline.get(scenario)
+        if baseline_metrics is None:
+            comparison_lines.append(f'{scenario}: not in baseline')
+            continue
+        compared_metrics = [
+            ('draft_seconds', metrics['draft_seconds'], baseline_metrics['draft_seconds']),
+            ('suggestion p50', metrics['suggestion_seconds']['p50'], baseline_metrics['suggestion_seconds']['p50']),
+            ('suggestion p99', metrics['suggestion_seconds']['p99'], baseline_metrics['suggestion_seconds']['p99']),
+            ('handle_chosen_malshab p99', metrics['handle_chosen_malshab_seconds']['p99'], baseline_metrics['handle_chosen_malshab_seconds']['p99']),
+            ('peak_memory_bytes', metrics['peak_memory_bytes'], baseline_metrics['peak_memory_bytes']),
+        ]
+        for name, value, baseline_value in compared_metrics:
+            if value is None or not baseline_value:
+                continue
+            comparison_lines.append(f'{scenario}: {name} {baseline_value:.6g} -> {value:.6g} ({(value / baseline_value - 1) * 100:+.1f}%)')
+    return comparison_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the draft recommendation path on synthetic drafts.')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='Scenario to run, all if not given.')
+    parser.add_argument('--seed', type=int, help='Override the seed of all scenarios.')
+    parser.add_argument('--scheduler', choices=sorted(PICK_SCHEDULERS), default=GreedySlotScheduler.name, help='The pick scheduler to benchmark.')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory measurement.')
+    parser.add_argument('--save', help='Path to save the results to, as a JSON baseline.')
+    parser.add_argument('--compare', help='Path of a saved JSON baseline to compare the results to.')
+    args = parser.parse_args()
+
+    results = {}
+    for scenario in args.scenario or SCENARIOS:
+        parameters = SCENARIOS[scenario]
+        if args.seed is not None:
+            parameters.seed = args.seed
+        results[scenario] = run_benchmark(parameters, measure_memory=not args.no_memory, scheduler_name=args.scheduler)
+        suggestion_seconds = results[scenario]['suggestion_seconds']
+        print(
+            f'{scenario}: draft {results[scenario]["draft_seconds"]:.3f}s, '
+            f'suggestion p50 {suggestion_seconds["p50"] or 0:.6f}s p99 {suggestion_seconds["p99"] or 0:.6f}s, '
+            f'peak memory {results[scenario]["peak_memory_bytes"]}'
+        )
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        for line in compare_to_baseline(results, baseline['scenarios']):
+            print(line)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(
+                {
+                    'format_version': BASELINE_FORMAT_VERSION,
+                    'created_at': time.time(),
+                    'python_version': platform.python_version(),
+                    'scenarios': results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import json
+import os
+
+from clutch_libs.miluim.consts import DEFAULT_SCHAKIM_LATEST_DRAFT_PICK, Course, QuotaAttribute, Unit
+from clutch_libs.miluim.picking_order import PickingOrder
+
+
+class DraftConfig:
+    """
+    The paths of all the input files of a draft, so it can be set up without prompting for each of them.
+    The general picking order may be given by a pattern of rounds instead of a file.
+    """
+
+    def __init__(
+        self,
+        course_to_prioritization_path: dict[Course, str],
+        unit_to_malshab_ids_path: dict[Unit, str],
+        general_picking_order_path: str | None,
+        internal_picking_order_path: str,
+        course_to_quota_limits: dict[Course, dict[QuotaAttribute, int]] = None,
+        unit_to_quota_limits: dict[Unit, dict[QuotaAttribute, int]] = None,
+        schakim_latest_draft_pick: int | None = DEFAULT_SCHAKIM_LATEST_DRAFT_PICK,
+        general_picking_order: PickingOrder = None,
+        cache_directory: str = None,
+    ):
+        """
+        Initialize the DraftConfig object.
+        Args:
+            course_to_prioritization_path (dict[Course, str]): The prioritization CSV file of each course.
+            unit_to_malshab_ids_path (dict[Unit, str]): The Malshab IDs CSV file of each unit.
+            general_picking_order_path (str | None): The general picking order CSV file, None if the order is given.
+            internal_picking_order_path (str): The internal picking order CSV file.
+            course_to_quota_limits (dict[Course, dict[QuotaAttribute, int]]): The maximal count of each attribute per course.
+            unit_to_quota_limits (dict[Unit, dict[QuotaAttribute, int]]): The maximal count of each attribute per unit.
+            schakim_latest_draft_pick (int | None): The last draft pick in which schakim can be picked, None for no limit.
+            general_picking_order (PickingOrder): The general picking order, used instead of loading it from a file.
+            cache_directory (str): The directory to cache the parsed input files in, so unchanged files aren't parsed again.
+        """
+        if general_picking_order_path is None and general_picking_order is None:
+            raise ValueError('Draft config needs either a general picking order file or a general picking order.')
+        self.course_to_prioritization_path = course_to_prioritization_path
+        self.unit_to_malshab_ids_path = unit_to_malshab_ids_path
+        self.general_picking_order_path = general_picking_order_path
+        self.internal_picking_order_path = internal_picking_order_path
+        self.course_to_quota_limits = course_to_quota_limits if course_to_quota_limits is not None else {}
+        self.unit_to_quota_limits = unit_to_quota_limits if unit_to_quota_limits is not None else {}
+        self.schakim_latest_draft_pick = schakim_latest_draft_pick
+        self.general_picking_order = general_picking_order
+        self.cache_directory = cache_directory
+
+    @classmethod
+    def load_from_json(cls, json_path: str) -> 'DraftConfig':
+        """
+        Load the config from a JSON file, in the following format (relative paths are relative to the JSON file):
+            {
+                "course_prioritizations": {"shefa": "shefa.csv", "apollo": "apollo.csv", ...},
+                "unit_malshab_ids": {"7190": "7190.csv", "7170": "7170.csv", ...},
+                "general_picking_order": "general_order.csv",
+                "internal_picking_order": "internal_order.csv",
+                "quotas": {
+                    "courses": {"shefa": {"combat": 20, "female": 5}, ...},
+                    "units": {"7190": {"schakim": 10}, ...},
+                    "schakim_latest_draft_pick": 100
+                },
+                "cache_directory": ".draft_cache"
+            }
+        The quotas are optional, as is each of their keys.
+        The cache directory is optional too, it keeps the parsed input files between setups, keyed by their content.
+        Instead of a file, the general picking order can be a pattern of rounds, reversed every other round if snake:
+            "general_picking_order": {"pattern": ["7190", "7170", ...], "rounds": 30, "snake": true}
+        Args:
+            json_path (str): Path to the JSON file.
+        Returns:
+            DraftConfig: The loaded config.
+        """
+        with open(json_path, 'r') as file:
+            raw_config = json.load(file)
+
+        base_directory = os.path.dirname(os.path.abspath(json_path))
+
+        def resolve_path(path: str) -> str:
+            return os.path.join(base_directory, path)
+
+        def parse_limits(raw_limits: dict) -> dict[QuotaAttribute, int]:
+            limits = {}
+            for attribute, limit in raw_limits.items():
+                if not isinstance(limit, int) or limit < 0:
+                    raise ValueError(f'Draft config {json_path} has an invalid quota {limit!r} for {attribute}.')
+                limits[QuotaAttribute(attribute)] = limit
+            return limits
+
+        def parse_picking_order_pattern(raw_order: dict) -> PickingOrder:
+            rounds = raw_order.get('rounds')
+            if not isinstance(rounds, int) or rounds < 0 or not raw_order.get('pattern'):
+                raise ValueError(f'Draft config {json_path} has an invalid general picking order pattern {raw_order!r}.')
+            return PickingOrder.from_pattern(
+                [Unit(unit) for unit in raw_order['pattern']], rounds, snake=bool(raw_order.get('snake', False)),
+            )
+
+        raw_quotas = raw_config.get('quotas', {})
+        try:
+            config = cls(
+                course_to_prioritization_path={
+                    Course(course): resolve_path(path) for course, path in raw_config['course_prioritizations'].items()
+                },
+                unit_to_malshab_ids_path={
+                    Unit(unit): resolve_path(path) for unit, path in raw_config['unit_malshab_ids'].items()
+                },
+                general_picking_order_path=resolve_path(raw_config['general_picking_order'])
+                if not isinstance(raw_config['general_picking_order'], dict) else None,
+                internal_picking_order_path=resolve_path(raw_config['internal_picking_order']),
+                course_to_quota_limits={
+                    Course(course): parse_limits(limits) for course, limits in raw_quotas.get('courses', {}).items()
+                },
+                unit_to_quota_limits={
+                    Unit(unit): parse_limits(limits) for unit, limits in raw_quotas.get('units', {}).items()
+                },
+                schakim_latest_draft_pick=raw_quotas.get('schakim_latest_draft_pick', DEFAULT_SCHAKIM_LATEST_DRAFT_PICK),
+                general_picking_order=parse_picking_order_pattern(raw_config['general_picking_order'])
+                if isinstance(raw_config['general_picking_order'], dict) else None,
+                cache_directory=resolve_path(raw_config['cache_directory']) if raw_config.get('cache_directory') else None,
+            )
+        except KeyError as e:
+            raise ValueError(f'Draft config {json_path} is missing the key {e}.') from e
+
+        # Make sure every course and unit has a file
+        missing_courses = [course.name for course in Course if course != Course.EXTERNAL and course not in config.course_to_prioritization_path]
+        missing_units = [unit.name for unit in Unit if unit not in config.unit_to_malshab_ids_path]
+        if missing_courses or missing_units:
+            raise ValueError(
+                f'Draft config {json_path} is missing files for the courses [{", ".join(missing_courses)}] '
+                f'and the units [{", ".join(missing_units)}].'
+            )
+        return config
@@ -0,0 +1,69 @@
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft_result import DraftResult
+
+
+class DraftStep:
+    """
+    The changes a single draft pick (or skip) made to the draft state, recorded so it can be undone.
+    Only the changes are kept, never copies of the state, so undoing a step costs O(1) per change.
+    """
+
+    def __init__(self, draft_pick: int, unit: Unit):
+        """
+        Initialize the DraftStep object.
+        Args:
+            draft_pick (int): The draft pick of the step.
+            unit (Unit): The unit picking in the step.
+        """
+        self.draft_pick: int = draft_pick
+        self.unit: Unit = unit
+        # None for a skipped pick
+        self.draft_result: DraftResult | None = None
+        # The course, the removed position and the head position before the removal, of each prioritization
+        self.prioritization_removals: list[tuple[Course, int, int]] = []
+        # The index and the course of every pick removed from the remaining internal picking order, in order
+        self.removed_internal_picks: list[tuple[int, Course]] = []
+        # The row counted towards the quotas, None if the Malshab's details are unknown
+        self.quota_row: int | None = None
+
+
+class DraftHistory:
+    """
+    Operation log of the draft, with the steps that can be undone, and the undone steps that can be redone.
+    """
+
+    def __init__(self):
+        """
+        Initialize the DraftHistory object.
+        """
+        self.steps: list[DraftStep] = []
+        self.undone_steps: list[DraftStep] = []
+        # Internal picks removed while suggesting the current pick (courses that ran out of suggestions),
+        # which become part of the step once the pick is made
+        self.pending_removed_internal_picks: list[tuple[int, Course]] = []
+        # Set while redoing a step, so the other undone steps are kept
+        self.is_redoing: bool = False
+
+    def start_step(self, draft_pick: int, unit: Unit) -> DraftStep:
+        """
+        Start recording the step of the current pick.
+        Args:
+            draft_pick (int): The current draft pick.
+            unit (Unit): The unit picking.
+        Returns:
+            DraftStep: The new step, with the pending changes made before the pick.
+        """
+        step = DraftStep(draft_pick, unit)
+        step.removed_internal_picks = self.pending_removed_internal_picks
+        self.pending_removed_internal_picks = []
+        return step
+
+    def complete_step(self, step: DraftStep):
+        """
+        Add a completed step to the history. A new step (not a redone one) makes the undone steps unreachable.
+        Args:
+            step (DraftStep): The completed step.
+        """
+        self.steps.append(step)
+        if not self.is_redoing:
+            self.undone_steps = []
@@ -0,0 +1,538 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from enum import IntEnum
+from itertools import accumulate
+from typing import Iterator
+
+from clutch_libs.miluim.consts import Course, QuotaAttribute, Unit
+from clutch_libs.miluim.contested_pick_index import ContestedPickIndex
+from clutch_libs.miluim.course_prioritization import CoursePrioritization
+from clutch_libs.miluim.draft_history import DraftHistory, DraftStep
+from clutch_libs.miluim.draft_result import DraftResult
+from clutch_libs.miluim.eligibility_index import EligibilityIndex
+from clutch_libs.miluim.malshab_table import MalshabTable
+from clutch_libs.miluim.picking_order import PickingOrder
+from clutch_libs.miluim.quota_tracker import QuotaTracker
+
+IMAGE_MAGIC = b'MILDRAFT'
+IMAGE_VERSION = 4
+# Magic, version, byte order, sections count, checksum of everything after the header
+IMAGE_HEADER = struct.Struct('<8sHBxII')
+# Section kind, key (course or unit code, 0 if not keyed), absolute offset and length
+SECTION_ENTRY = struct.Struct('<HHQQ')
+# Journal offset, current draft pick, current internal pick, is active, my unit, schakim latest pick (-1 for no limit)
+STATE = struct.Struct('<QIIBBi')
+# Head position and remaining count of a prioritization
+PRIORITIZATION_CURSORS = struct.Struct('<II')
+# Draft pick, unit, course (SKIPPED_COURSE_CODE for a skip), quota row (-1 for none),
+# and the counts of prioritization removals and removed internal picks of a step in the history
+HISTORY_STEP = struct.Struct('<IBBxxiII')
+SKIPPED_COURSE_CODE = 0xFF
+# The history sections are keyed by the list of steps they hold
+HISTORY_STEPS_KEY = 0
+HISTORY_UNDONE_STEPS_KEY = 1
+# Total picks, block length and runs count of the compressed general picking order, followed by its runs
+PICKING_ORDER_HEADER = struct.Struct('<III')
+# Sections start on 8 byte boundaries, so every column can be cast in place
+SECTION_ALIGNMENT = 8
+# Byte orders are stored as codes, columns are written (and cast) in the native byte order
+BYTE_ORDER_TO_CODE: dict[str, int] = {'little': 0, 'big': 1}
+
+# Units and courses are stored by their position in the enum, like in the journal
+UNITS: list[Unit] = list(Unit)
+COURSES: list[Course] = list(Course)
+UNIT_TO_CODE: dict[Unit, int] = {unit: code for code, unit in enumerate(UNITS)}
+COURSE_TO_CODE: dict[Course, int] = {course: code for code, course in enumerate(COURSES)}
+
+
+class ImageSection(IntEnum):
+    """
+    The sections of a draft image
+    """
+    STATE = 1
+    QUOTA_LIMITS = 2
+    MALSHAB_IDS = 3
+    FIRST_NAMES = 4
+    LAST_NAMES = 5
+    GENDERS = 6
+    MEDICAL_PROFILES = 7
+    PSYCH_SCORES = 8
+    IS_SCHAKIM_FLAGS = 9
+    IS_COMBAT_FLAGS = 10
+    PRIORIZED_ROWS = 11
+    REMOVED_POSITIONS = 12
+    PRIORITIZATION_CURSORS = 13
+    ELIGIBILITY_MALSHAB_IDS = 14
+    ELIGIBILITY_MASKS = 15
+    UNIT_MALSHAB_IDS = 16
+    GENERAL_PICKING_ORDER = 17
+    INTERNAL_PICKING_ORDER = 18
+    REMAINING_INTERNAL_PICKS_ORDER = 19
+    RESULT_PICKS = 20
+    RESULT_UNITS = 21
+    RESULT_COURSES = 22
+    RESULT_MALSHAB_IDS = 23
+    RESULT_ROWS = 24
+    NEXT_POSITIONS = 25
+    PREVIOUS_POSITIONS = 26
+    HISTORY_STEPS = 27
+    HISTORY_MALSHAB_IDS = 28
+    HISTORY_PRIORITIZATION_REMOVALS = 29
+    HISTORY_REMOVED_INTERNAL_PICKS = 30
+
+
+class StringColumn:
+    """
+    A read-only column of strings over a buffer, decoded only when accessed.
+    The buffer holds the strings count, the offsets of the strings, and the strings themselves,
+    each encoded in UTF-8 and followed by a NUL, so the whole column can also be decoded in one go.
+    """
+
+    def __init__(self, buffer: memoryview):
+        """
+        Initialize the StringColumn object.
+        Args:
+            buffer (memoryview): The encoded column.
+        """
+        (count,) = struct.unpack_from('<I', buffer)
+        offsets_end = 4 + (count + 1) * 4
+        self.buffer: memoryview = buffer
+        self.offsets: memoryview = buffer[4:offsets_end].cast('I')
+        self.strings: memoryview = buffer[offsets_end:]
+
+    @staticmethod
+    def encode(values: list[str]) -> bytes:
+        """
+        Encode strings as a column.
+        Args:
+            values (list[str]): The strings.
+        Returns:
+            bytes: The encoded column.
+        """
+        if isinstance(values, StringColumn):
+            return values.buffer.tobytes()
+        encoded_values = [value.encode('utf-8') + b'\0' for value in values]
+        offsets = array('I', [0])
+        offsets.extend(accumulate(map(len, encoded_values)))
+        return struct.pack('<I', len(encoded_values)) + offsets.tobytes() + b''.join(encoded_values)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        return str(self.strings[self.offsets[index]:self.offsets[index + 1] - 1], 'utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        if len(self) == 0:
+            return iter(())
+        return iter(str(self.strings, 'utf-8').split('\0')[:-1])
+
+
+def _encode_quota_limits(quota_tracker: QuotaTracker) -> bytes:
+    # The limits are a handful of numbers, kept as JSON so they can grow new attributes freely
+    return json.dumps({
+        'courses': {course.value: {attribute.value: limit for attribute, limit in limits.items()}
+                    for course, limits in quota_tracker.course_to_limits.items()},
+        'units': {unit.value: {attribute.value: limit for attribute, limit in limits.items()}
+                  for unit, limits in quota_tracker.unit_to_limits.items()},
+    }).encode('utf-8')
+
+
+def _encode_picking_order(picking_order: PickingOrder) -> bytes:
+    # The runs of the order's block, the header keeps the run starts 4 byte aligned so they can be cast in place
+    if not isinstance(picking_order, PickingOrder):
+        picking_order = PickingOrder.from_units(picking_order)
+    return PICKING_ORDER_HEADER.pack(picking_order.total_picks, picking_order.block_length, len(picking_order.run_starts)) \
+        + array('I', picking_order.run_starts).tobytes() + bytes(picking_order.run_unit_codes)
+
+
+def _decode_picking_order(buffer: memoryview) -> PickingOrder:
+    total_picks, block_length, runs_count = PICKING_ORDER_HEADER.unpack_from(buffer)
+    run_starts_end = PICKING_ORDER_HEADER.size + runs_count * 4
+    return PickingOrder(
+        buffer[PICKING_ORDER_HEADER.size:run_starts_end].cast('I'),
+        buffer[run_starts_end:run_starts_end + runs_count],
+        block_length,
+        total_picks,
+    )
+
+
+def _encode_history_steps(steps: list[DraftStep], key: int) -> list[tuple[ImageSection, int, bytes]]:
+    # The steps are fixed size entries, with the variable length changes of all of them in flat columns
+    step_entries = bytearray(HISTORY_STEP.size * len(steps))
+    prioritization_removals = array('I')
+    removed_internal_picks = array('I')
+    for index, step in enumerate(steps):
+        draft_result = step.draft_result
+        HISTORY_STEP.pack_into(
+            step_entries,
+            index * HISTORY_STEP.size,
+            step.draft_pick,
+            UNIT_TO_CODE[step.unit],
+            COURSE_TO_CODE[draft_result.course] if draft_result is not None else SKIPPED_COURSE_CODE,
+            step.quota_row if step.quota_row is not None else -1,
+            len(step.prioritization_removals),
+            len(step.removed_internal_picks),
+        )
+        for course, position, head_position in step.prioritization_removals:
+            prioritization_removals.extend((COURSE_TO_CODE[course], position, head_position))
+        for internal_pick_index, course in step.removed_internal_picks:
+            removed_internal_picks.extend((internal_pick_index, COURSE_TO_CODE[course]))
+    return [
+        (ImageSection.HISTORY_STEPS, key, bytes(step_entries)),
+        (ImageSection.HISTORY_MALSHAB_IDS, key,
+         StringColumn.encode([step.draft_result.malshab_id if step.draft_result is not None else '' for step in steps])),
+        (ImageSection.HISTORY_PRIORITIZATION_REMOVALS, key, prioritization_removals.tobytes()),
+        (ImageSection.HISTORY_REMOVED_INTERNAL_PICKS, key, removed_internal_picks.tobytes()),
+    ]
+
+
+def _decode_limits(key_type: type, key_to_limits: dict) -> dict:
+    return {
+        key_type(key): {QuotaAttribute(attribute): limit for attribute, limit in limits.items()}
+        for key, limits in key_to_limits.items()
+    }
+
+
+class DraftImage:
+    """
+    Versioned binary image of the full draft state: the Malshab table, the course prioritizations,
+    the eligibility index, the picking orders, the cursors, the results and the history of the picks, so they can be undone.
+    Every column is stored as a raw, aligned array, so opening an image maps the file to memory,
+    and the draft uses the columns in place (zero-copy). Only the small parts of the state are decoded,
+    and the ID indexes are built when first used, so opening even a large draft takes milliseconds.
+    The mapping is private (copy-on-write), so the draft can keep marking Malshabs as removed without touching the file.
+    A CRC32 checksum of the whole image catches corrupted files.
+    """
+
+    def __init__(self, buffer: memoryview, sections: dict[tuple[ImageSection, int], memoryview]):
+        """
+        Initialize the DraftImage object. Use DraftImage.open to open an image file.
+        Args:
+            buffer (memoryview): The whole image.
+            sections (dict[tuple[ImageSection, int], memoryview]): The sections of the image, by their kind and key.
+        """
+        self.buffer: memoryview = buffer
+        self.sections: dict[tuple[ImageSection, int], memoryview] = sections
+        self.journal_offset, self.current_draft_pick, self.current_internal_pick, is_active, my_unit_code, schakim_latest_draft_pick = \
+            STATE.unpack_from(self._get_section(ImageSection.STATE))
+        self.is_active: bool = bool(is_active)
+        self.my_unit: Unit = UNITS[my_unit_code]
+        self.schakim_latest_draft_pick: int | None = schakim_latest_draft_pick if schakim_latest_draft_pick >= 0 else None
+
+    @staticmethod
+    def encode_input_sections(draft) -> list[tuple[ImageSection, int, bytes]]:
+        """
+        Encode the sections of the draft's input data, which doesn't change during the draft,
+        so they can be encoded once and written with every image of the draft.
+        Args:
+            draft (Draft): The draft, after setup.
+        Returns:
+            list[tuple[ImageSection, int, bytes]]: The kind, key and data of every section.
+        """
+        table = draft.malshab_table
+        sections: list[tuple[ImageSection, int, bytes]] = [
+            (ImageSection.QUOTA_LIMITS, 0, _encode_quota_limits(draft.quota_tracker)),
+            (ImageSection.MALSHAB_IDS, 0, StringColumn.encode(table.ids)),
+            (ImageSection.FIRST_NAMES, 0, StringColumn.encode(table.first_names)),
+            (ImageSection.LAST_NAMES, 0, StringColumn.encode(table.last_names)),
+            (ImageSection.GENDERS, 0, bytes(table.genders)),
+            (ImageSection.MEDICAL_PROFILES, 0, array('i', table.medical_profiles).tobytes()),
+            (ImageSection.PSYCH_SCORES, 0, array('i', table.psych_scores).tobytes()),
+            (ImageSection.IS_SCHAKIM_FLAGS, 0, bytes(table.is_schakim_flags)),
+            (ImageSection.IS_COMBAT_FLAGS, 0, bytes(table.is_combat_flags)),
+            (ImageSection.ELIGIBILITY_MALSHAB_IDS, 0, StringColumn.encode(draft.eligibility_index.row_to_malshab_id)),
+            (ImageSection.ELIGIBILITY_MASKS, 0, bytes(draft.eligibility_index.row_to_mask)),
+            (ImageSection.GENERAL_PICKING_ORDER, 0, _encode_picking_order(draft.general_picking_order)),
+            (ImageSection.INTERNAL_PICKING_ORDER, 0, bytes(COURSE_TO_CODE[course] for course in draft.internal_picking_order)),
+        ]
+        for course, prioritization in draft.course_to_prioritization.items():
+            sections.append((ImageSection.PRIORIZED_ROWS, COURSE_TO_CODE[course], array('I', prioritization.priorized_rows).tobytes()))
+        for unit, malshab_ids in draft.unit_to_malshab_ids.items():
+            sections.append((ImageSection.UNIT_MALSHAB_IDS, UNIT_TO_CODE[unit], StringColumn.encode(malshab_ids)))
+        return sections
+
+    @staticmethod
+    def write(draft, path: str, journal_offset: int = 0, input_sections: list[tuple[ImageSection, int, bytes]] = None):
+        """
+        Write an image of the draft.
+        The image is written to a temporary file and renamed, so a crash never leaves a partial image,
+        and drafts mapping the previous image keep using it safely.
+        Args:
+            draft (Draft): The draft to write.
+            path (str): The path of the image file.
+            journal_offset (int): The end of the draft's journal when the image is taken.
+            input_sections (list[tuple[ImageSection, int, bytes]]): The encoded input data of the draft
+                (see encode_input_sections), encoded now if not given.
+        """
+        table = draft.malshab_table
+        schakim_latest_draft_pick = draft.quota_tracker.schakim_latest_draft_pick
+        result_rows = (table.get_row(draft_result.malshab_id) for draft_result in draft.draft_results)
+        sections = list(input_sections if input_sections is not None else DraftImage.encode_input_sections(draft))
+        sections += [
+            (ImageSection.STATE, 0, STATE.pack(
+                journal_offset,
+                draft.current_draft_pick,
+                draft.current_internal_pick,
+                draft.is_active,
+                UNIT_TO_CODE[draft.my_unit],
+                schakim_latest_draft_pick if schakim_latest_draft_pick is not None else -1,
+            )),
+            (ImageSection.REMAINING_INTERNAL_PICKS_ORDER, 0,
+             bytes(COURSE_TO_CODE[course] for course in draft.remaining_internal_picks_order)),
+            (ImageSection.RESULT_PICKS, 0, array('I', (draft_result.pick for draft_result in draft.draft_results)).tobytes()),
+            (ImageSection.RESULT_UNITS, 0, bytes(UNIT_TO_CODE[draft_result.unit] for draft_result in draft.draft_results)),
+            (ImageSection.RESULT_COURSES, 0, bytes(COURSE_TO_CODE[draft_result.course] for draft_result in draft.draft_results)),
+            (ImageSection.RESULT_MALSHAB_IDS, 0,
+             StringColumn.encode([draft_result.malshab_id for draft_result in draft.draft_results])),
+            # The rows of the results in the table (-1 for unknown Malshabs), so restoring them needs no ID lookups
+            (ImageSection.RESULT_ROWS, 0, array('i', (row if row is not None else -1 for row in result_rows)).tobytes()),
+        ]
+        for course, prioritization in draft.course_to_prioritization.items():
+            course_code = COURSE_TO_CODE[course]
+            sections += [
+                (ImageSection.REMOVED_POSITIONS, course_code, bytes(prioritization.removed_positions)),
+                (ImageSection.PRIORITIZATION_CURSORS, course_code,
+                 PRIORITIZATION_CURSORS.pack(prioritization.head_position, prioritization.remaining_count)),
+            ]
+            # The links keep where every removed position was removed from, so its removal can be undone
+            if prioritization.next_positions is not None:
+                sections += [
+                    (ImageSection.NEXT_POSITIONS, course_code, prioritization.next_positions.tobytes()),
+                    (ImageSection.PREVIOUS_POSITIONS, course_code, prioritization.previous_positions.tobytes()),
+                ]
+        sections += _encode_history_steps(draft.history.steps, HISTORY_STEPS_KEY)
+        sections += _encode_history_steps(draft.history.undone_steps, HISTORY_UNDONE_STEPS_KEY)
+
+        # Lay the sections out after the section table, each one aligned
+        body = bytearray(SECTION_ENTRY.size * len(sections))
+        offset = IMAGE_HEADER.size + len(body)
+        for index, (kind, key, data) in enumerate(sections):
+            padding = -offset % SECTION_ALIGNMENT
+            body += bytes(padding)
+            offset += padding
+            SECTION_ENTRY.pack_into(body, index * SECTION_ENTRY.size, kind, key, offset, len(data))
+            body += data
+            offset += len(data)
+
+        header = IMAGE_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, BYTE_ORDER_TO_CODE[sys.byteorder], len(sections), zlib.crc32(body))
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(header)
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def open(cls, path: str, verify_checksum: bool = True) -> 'DraftImage':
+        """
+        Map an image file to memory.
+        Args:
+            path (str): The path of the image file.
+            verify_checksum (bool): Whether to verify the checksum of the whole image.
+        Returns:
+            DraftImage: The opened image.
+        Raises:
+            ValueError: If the file is not a valid image, or is corrupted.
+        """
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < IMAGE_HEADER.size:
+                raise ValueError(f'Draft image {path} is truncated.')
+            # The mapping stays valid after the file is closed
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        buffer = memoryview(mapping)
+
+        magic, version, byte_order_code, sections_count, checksum = IMAGE_HEADER.unpack_from(buffer)
+        if magic != IMAGE_MAGIC:
+            raise ValueError(f'{path} is not a draft image.')
+        if version != IMAGE_VERSION:
+            raise ValueError(f'Draft image {path} has version {version}, only version {IMAGE_VERSION} is supported.')
+        if byte_order_code != BYTE_ORDER_TO_CODE[sys.byteorder]:
+            raise ValueError(f'Draft image {path} was written on a machine with a different byte order.')
+        if verify_checksum and zlib.crc32(buffer[IMAGE_HEADER.size:]) != checksum:
+            raise ValueError(f'Draft image {path} is corrupted.')
+
+        sections: dict[tuple[ImageSection, int], memoryview] = {}
+        for kind, key, offset, length in SECTION_ENTRY.iter_unpack(
+            buffer[IMAGE_HEADER.size:IMAGE_HEADER.size + sections_count * SECTION_ENTRY.size]
+        ):
+            if offset + length > len(buffer):
+                raise ValueError(f'Draft image {path} is truncated.')
+            if kind in ImageSection._value2member_map_:
+                sections[ImageSection(kind), key] = buffer[offset:offset + length]
+        return cls(buffer, sections)
+
+    def _get_section(self, kind: ImageSection, key: int = 0) -> memoryview:
+        section = self.sections.get((kind, key))
+        if section is None:
+            raise ValueError(f'Draft image is missing the {kind.name} section.')
+        return section
+
+    def get_draft_results(self) -> list[DraftResult]:
+        """
+        Get the results of the draft when the image was taken.
+        """
+        result_picks = self._get_section(ImageSection.RESULT_PICKS).cast('I')
+        result_units = self._get_section(ImageSection.RESULT_UNITS)
+        result_courses = self._get_section(ImageSection.RESULT_COURSES)
+        result_malshab_ids = StringColumn(self._get_section(ImageSection.RESULT_MALSHAB_IDS))
+        return [
+            DraftResult(malshab_id=malshab_id, unit=UNITS[unit_code], course=COURSES[course_code], pick=pick)
+            for pick, unit_code, course_code, malshab_id in zip(result_picks, result_units, result_courses, result_malshab_ids)
+        ]
+
+    def get_history(self) -> DraftHistory:
+        """
+        Get the history of the draft when the image was taken, with the steps that can be undone and redone.
+        """
+        history = DraftHistory()
+        history.steps = self._get_history_steps(HISTORY_STEPS_KEY)
+        history.undone_steps = self._get_history_steps(HISTORY_UNDONE_STEPS_KEY)
+        return history
+
+    def _get_history_steps(self, key: int) -> list[DraftStep]:
+        step_entries = self._get_section(ImageSection.HISTORY_STEPS, key)
+        malshab_ids = StringColumn(self._get_section(ImageSection.HISTORY_MALSHAB_IDS, key))
+        prioritization_removals = self._get_section(ImageSection.HISTORY_PRIORITIZATION_REMOVALS, key).cast('I')
+        removed_internal_picks = self._get_section(ImageSection.HISTORY_REMOVED_INTERNAL_PICKS, key).cast('I')
+        steps = []
+        removals_offset = 0
+        internal_picks_offset = 0
+        for (draft_pick, unit_code, course_code, quota_row, removals_count, removed_internal_picks_count), malshab_id in zip(
+            HISTORY_STEP.iter_unpack(step_entries), malshab_ids
+        ):
+            step = DraftStep(draft_pick, UNITS[unit_code])
+            if course_code != SKIPPED_COURSE_CODE:
+                step.draft_result = DraftResult(malshab_id=malshab_id, unit=step.unit, course=COURSES[course_code], pick=draft_pick)
+            step.quota_row = quota_row if quota_row >= 0 else None
+            removals_end = removals_offset + removals_count * 3
+            removals = prioritization_removals[removals_offset:removals_end]
+            step.prioritization_removals = [
+                (COURSES[removals[index]], removals[index + 1], removals[index + 2]) for index in range(0, len(removals), 3)
+            ]
+            removals_offset = removals_end
+            internal_picks_end = internal_picks_offset + removed_internal_picks_count * 2
+            internal_picks = removed_internal_picks[internal_picks_offset:internal_picks_end]
+            step.removed_internal_picks = [
+                (internal_picks[index], COURSES[internal_picks[index + 1]]) for index in range(0, len(internal_picks), 2)
+            ]
+            internal_picks_offset = internal_picks_end
+            steps.append(step)
+        return steps
+
+    def get_courses(self) -> list[Course]:
+        """
+        Get the courses with a prioritization in the image, by their order in the Course enum.
+        """
+        return [course for course in COURSES if (ImageSection.PRIORIZED_ROWS, COURSE_TO_CODE[course]) in self.sections]
+
+    def get_remaining_internal_picks_order(self) -> list[Course]:
+        return [COURSES[code] for code in self._get_section(ImageSection.REMAINING_INTERNAL_PICKS_ORDER)]
+
+    def restore(self, draft):
+        """
+        Restore the full state of the image to a new draft, instead of setting it up.
+        The input data is used in place, the columns of the Malshab table and the prioritized rows stay views over the image.
+        Args:
+            draft (Draft): A new draft, picking for the unit the image was taken for.
+        """
+        if draft.my_unit != self.my_unit:
+            raise ValueError(f'Draft image was taken for unit {self.my_unit.name}, not {draft.my_unit.name}.')
+
+        table = MalshabTable()
+        table.ids = StringColumn(self._get_section(ImageSection.MALSHAB_IDS))
+        table.first_names = StringColumn(self._get_section(ImageSection.FIRST_NAMES))
+        table.last_names = StringColumn(self._get_section(ImageSection.LAST_NAMES))
+        table.genders = self._get_section(ImageSection.GENDERS)
+        table.medical_profiles = self._get_section(ImageSection.MEDICAL_PROFILES).cast('i')
+        table.psych_scores = self._get_section(ImageSection.PSYCH_SCORES).cast('i')
+        table.is_schakim_flags = self._get_section(ImageSection.IS_SCHAKIM_FLAGS)
+        table.is_combat_flags = self._get_section(ImageSection.IS_COMBAT_FLAGS)
+        draft.malshab_table = table
+
+        draft.course_to_prioritization = {}
+        for course in self.get_courses():
+            course_code = COURSE_TO_CODE[course]
+            prioritization = CoursePrioritization(course.name, table)
+            prioritization.priorized_rows = self._get_section(ImageSection.PRIORIZED_ROWS, course_code).cast('I')
+            prioritization.removed_positions = self._get_section(ImageSection.REMOVED_POSITIONS, course_code)
+            if (ImageSection.NEXT_POSITIONS, course_code) in self.sections:
+                prioritization.next_positions = self._get_section(ImageSection.NEXT_POSITIONS, course_code).cast('I')
+                prioritization.previous_positions = self._get_section(ImageSection.PREVIOUS_POSITIONS, course_code).cast('I')
+            prioritization.head_position, prioritization.remaining_count = \
+                PRIORITIZATION_CURSORS.unpack_from(self._get_section(ImageSection.PRIORITIZATION_CURSORS, course_code))
+            prioritization.current_suggestion_index = prioritization.head_position
+            draft.course_to_prioritization[course] = prioritization
+
+        eligibility_index = EligibilityIndex()
+        eligibility_index.row_to_malshab_id = StringColumn(self._get_section(ImageSection.ELIGIBILITY_MALSHAB_IDS))
+        eligibility_index.row_to_mask = self._get_section(ImageSection.ELIGIBILITY_MASKS)
+        draft.eligibility_index = eligibility_index
+        draft.unit_to_malshab_ids = {
+            unit: StringColumn(self._get_section(ImageSection.UNIT_MALSHAB_IDS, UNIT_TO_CODE[unit]))
+            for unit in UNITS if (ImageSection.UNIT_MALSHAB_IDS, UNIT_TO_CODE[unit]) in self.sections
+        }
+
+        draft.general_picking_order = _decode_picking_order(self._get_section(ImageSection.GENERAL_PICKING_ORDER))
+        draft.internal_picking_order = [COURSES[code] for code in self._get_section(ImageSection.INTERNAL_PICKING_ORDER)]
+        draft.contested_pick_index = ContestedPickIndex(draft.my_unit, eligibility_index)
+        draft.contested_pick_index.build(draft.general_picking_order)
+
+        quota_limits = json.loads(str(self._get_section(ImageSection.QUOTA_LIMITS), 'utf-8'))
+        draft.quota_tracker = QuotaTracker(
+            table,
+            _decode_limits(Course, quota_limits['courses']),
+            _decode_limits(Unit, quota_limits['units']),
+            self.schakim_latest_draft_pick,
+        )
+
+        draft.draft_results = self.get_draft_results()
+        for draft_result, row in zip(draft.draft_results, self._get_section(ImageSection.RESULT_ROWS).cast('i')):
+            if row >= 0:
+                draft.quota_tracker.commit(row, draft_result.unit, draft_result.course)
+        draft.history = self.get_history()
+        self._restore_cursors(draft)
+
+    def restore_state(self, draft):
+        """
+        Restore only the state of the draft to a draft that was already set up (e.g. forked from a template),
+        by replaying the picks in the history of the image on it, so it does not depend on the rows of the image's table.
+        The changes the picks make to the draft's own prioritizations and quotas are recorded again, so they can be undone.
+        Args:
+            draft (Draft): A draft that was set up for the unit the image was taken for, and did not make any picks yet.
+        """
+        if draft.my_unit != self.my_unit:
+            raise ValueError(f'Draft image was taken for unit {self.my_unit.name}, not {draft.my_unit.name}.')
+
+        draft.draft_results = self.get_draft_results()
+        draft.history = self.get_history()
+        for step in draft.history.steps:
+            step.prioritization_removals = []
+            step.quota_row = None
+            draft_result = step.draft_result
+            if draft_result is None:
+                continue
+            for course, prioritization in draft.course_to_prioritization.items():
+                head_position = prioritization.head_position
+                removed_position = prioritization.handle_malshab_chosen(draft_result.malshab_id)
+                if removed_position is not None:
+                    step.prioritization_removals.append((course, removed_position, head_position))
+            row = draft.malshab_table.get_row(draft_result.malshab_id)
+            if row is not None:
+                draft.quota_tracker.commit(row, draft_result.unit, draft_result.course)
+                step.quota_row = row
+        self._restore_cursors(draft)
+
+    def _restore_cursors(self, draft):
+        draft.remaining_internal_picks_order = self.get_remaining_internal_picks_order()
+        draft.current_draft_pick = self.current_draft_pick
+        draft.current_internal_pick = self.current_internal_pick
+        draft.is_active = self.is_active
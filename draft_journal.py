@@ -0,0 +1,231 @@
+import os
+import struct
+import zlib
+from enum import IntEnum
+from typing import Iterator
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft_image import DraftImage
+from clutch_libs.miluim.draft_result import DraftResult
+
+JOURNAL_FILE_NAME = 'journal.bin'
+SNAPSHOT_FILE_NAME = 'snapshot.bin'
+
+# Every record is prefixed by its payload length, a checksum of the payload, and its type
+RECORD_HEADER = struct.Struct('<IIB')
+PICK_PAYLOAD = struct.Struct('<IBB')
+SKIP_PAYLOAD = struct.Struct('<IB')
+OVERRIDE_PAYLOAD = struct.Struct('<IB')
+UNDO_PAYLOAD = struct.Struct('<I')
+
+# Units and courses are stored by their position in the enum, to keep the records compact
+UNITS: list[Unit] = list(Unit)
+COURSES: list[Course] = list(Course)
+UNIT_TO_CODE: dict[Unit, int] = {unit: code for code, unit in enumerate(UNITS)}
+COURSE_TO_CODE: dict[Course, int] = {course: code for code, course in enumerate(COURSES)}
+
+
+class JournalRecordType(IntEnum):
+    """
+    The types of actions recorded in the journal
+    """
+    PICK = 1
+    SKIP = 2
+    OVERRIDE = 3
+    UNDO = 4
+
+
+def _encode_string(value: str) -> bytes:
+    encoded_value = value.encode('utf-8')
+    return struct.pack('<H', len(encoded_value)) + encoded_value
+
+
+def _decode_string(payload: bytes, offset: int) -> tuple[str, int]:
+    (length,) = struct.unpack_from('<H', payload, offset)
+    offset += 2
+    return str(payload[offset:offset + length], 'utf-8'), offset + length
+
+
+class DraftJournal:
+    """
+    Append-only write-ahead journal of all the actions done in a draft, with periodic snapshots of the draft state.
+    Records are written as soon as an action is done, and synced to disk in batches.
+    A draft is resumed by loading the latest snapshot and replaying only the records written after it.
+    """
+
+    def __init__(self, directory: str, fsync_every: int = 16, snapshot_every: int = 50):
+        """
+        Initialize the DraftJournal object.
+        Args:
+            directory (str): The directory holding the journal and snapshot files.
+            fsync_every (int): The number of records written between syncs to disk.
+            snapshot_every (int): The number of draft picks between snapshots.
+        """
+        self.directory: str = directory
+        self.fsync_every: int = fsync_every
+        self.snapshot_every: int = snapshot_every
+        self.journal_path: str = os.path.join(directory, JOURNAL_FILE_NAME)
+        self.snapshot_path: str = os.path.join(directory, SNAPSHOT_FILE_NAME)
+        self._file = None
+        self._unsynced_records_count: int = 0
+        # The encoded input data of the draft, which is the same in every snapshot
+        self._snapshot_input_sections: list | None = None
+
+    def open(self):
+        """
+        Open the journal for appending, creating it if needed.
+        A torn record at the end of the journal (from a crash mid-write) is truncated.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        valid_length = 0
+        for _, _, end_offset in self.read_records():
+            valid_length = end_offset
+        self._file = open(self.journal_path, 'ab')
+        if self._file.tell() != valid_length:
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+
+    def close(self):
+        """
+        Sync and close the journal.
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def sync(self):
+        """
+        Flush all the written records to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced_records_count = 0
+
+    def _append(self, record_type: JournalRecordType, payload: bytes):
+        self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload), record_type) + payload)
+        self._unsynced_records_count += 1
+        if self._unsynced_records_count >= self.fsync_every:
+            self.sync()
+
+    def record_pick(self, draft_result: DraftResult):
+        """
+        Record a draft pick.
+        Args:
+            draft_result (DraftResult): The result of the pick.
+        """
+        self._append(
+            JournalRecordType.PICK,
+            PICK_PAYLOAD.pack(
+                draft_result.pick,
+                UNIT_TO_CODE[draft_result.unit],
+                COURSE_TO_CODE[draft_result.course],
+            ) + _encode_string(draft_result.malshab_id),
+        )
+
+    def record_skip(self, pick: int, unit: Unit):
+        """
+        Record a skipped draft pick.
+        Args:
+            pick (int): The skipped pick number.
+            unit (Unit): The unit whose pick was skipped.
+        """
+        self._append(JournalRecordType.SKIP, SKIP_PAYLOAD.pack(pick, UNIT_TO_CODE[unit]))
+
+    def record_override(self, pick: int, suggested_malshab_id: str, chosen_malshab_id: str, course: Course):
+        """
+        Record a suggestion that was overridden by the draft manager.
+        Args:
+            pick (int): The pick number.
+            suggested_malshab_id (str): The ID of the suggested Malshab.
+            chosen_malshab_id (str): The ID of the Malshab chosen instead.
+            course (Course): The course the chosen Malshab was picked for.
+        """
+        self._append(
+            JournalRecordType.OVERRIDE,
+            OVERRIDE_PAYLOAD.pack(pick, COURSE_TO_CODE[course])
+            + _encode_string(suggested_malshab_id)
+            + _encode_string(chosen_malshab_id),
+        )
+
+    def record_undo(self, pick: int):
+        """
+        Record an undone draft pick.
+        Args:
+            pick (int): The pick number that was undone, which is the current pick after the undo.
+        """
+        self._append(JournalRecordType.UNDO, UNDO_PAYLOAD.pack(pick))
+
+    @staticmethod
+    def _decode_record(record_type: JournalRecordType, payload: bytes) -> DraftResult | tuple:
+        if record_type == JournalRecordType.PICK:
+            pick, unit_code, course_code = PICK_PAYLOAD.unpack_from(payload)
+            malshab_id, _ = _decode_string(payload, PICK_PAYLOAD.size)
+            return DraftResult(malshab_id=malshab_id, unit=UNITS[unit_code], course=COURSES[course_code], pick=pick)
+        if record_type == JournalRecordType.SKIP:
+            pick, unit_code = SKIP_PAYLOAD.unpack_from(payload)
+            return pick, UNITS[unit_code]
+        if record_type == JournalRecordType.UNDO:
+            return UNDO_PAYLOAD.unpack_from(payload)
+        pick, course_code = OVERRIDE_PAYLOAD.unpack_from(payload)
+        suggested_malshab_id, offset = _decode_string(payload, OVERRIDE_PAYLOAD.size)
+        chosen_malshab_id, _ = _decode_string(payload, offset)
+        return pick, suggested_malshab_id, chosen_malshab_id, COURSES[course_code]
+
+    def read_records(self, offset: int = 0) -> Iterator[tuple[JournalRecordType, DraftResult | tuple, int]]:
+        """
+        Read the records of the journal, starting from the given byte offset.
+        Reading stops at the first torn or corrupted record.
+        Args:
+            offset (int): The byte offset to start reading from.
+        Returns:
+            Iterator[tuple[JournalRecordType, DraftResult | tuple, int]]: The record type, its decoded data,
+                and the byte offset right after it.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as file:
+            file.seek(offset)
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                payload_length, checksum, record_type = RECORD_HEADER.unpack(header)
+                payload = file.read(payload_length)
+                if len(payload) < payload_length or zlib.crc32(payload) != checksum \
+                        or record_type not in JournalRecordType._value2member_map_:
+                    return
+                offset += RECORD_HEADER.size + payload_length
+                record_type = JournalRecordType(record_type)
+                yield record_type, self._decode_record(record_type, payload), offset
+
+    def should_snapshot(self, draft_pick: int) -> bool:
+        return self.snapshot_every > 0 and draft_pick % self.snapshot_every == 0
+
+    def has_snapshot(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    def write_snapshot(self, draft):
+        """
+        Write a snapshot of the full draft state, as a draft image pointing at the current end of the journal.
+        Args:
+            draft (Draft): The draft to snapshot.
+        """
+        self.sync()
+        if self._snapshot_input_sections is None:
+            self._snapshot_input_sections = DraftImage.encode_input_sections(draft)
+        DraftImage.write(draft, self.snapshot_path, self._file.tell(), self._snapshot_input_sections)
+
+    def load_snapshot(self) -> DraftImage | None:
+        """
+        Load the latest snapshot, mapping it to memory.
+        Returns:
+            DraftImage | None: The snapshot, or None if there is no valid snapshot.
+        """
+        if not self.has_snapshot():
+            return None
+        try:
+            return DraftImage.open(self.snapshot_path)
+        except ValueError as e:
+            print(f'Draft snapshot is unusable, ignoring it: {e}')
+            return None
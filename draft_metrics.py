@@ -0,0 +1,243 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+from clutch_libs.miluim.consts import Unit
+
+# Upper bounds of the histogram buckets, in seconds
+SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+METRIC_NAME_PREFIX = 'miluim_draft'
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, in the Prometheus layout.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = SECONDS_BUCKETS):
+        """
+        Initialize the Histogram object.
+        Args:
+            buckets (tuple[float, ...]): The ascending upper bounds of the buckets.
+        """
+        self.buckets: tuple[float, ...] = buckets
+        self.bucket_counts: list[int] = [0] * len(buckets)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float):
+        """
+        Add an observed value to the histogram.
+        """
+        self.count += 1
+        self.sum += value
+        for index, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.bucket_counts[index] += 1
+                break
+
+    def to_prometheus_lines(self, name: str, description: str) -> list[str]:
+        lines = [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        cumulative_count = 0
+        for bucket, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative_count += bucket_count
+            lines.append(f'{name}_bucket{{le="{bucket}"}} {cumulative_count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum {self.sum}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class PickMetrics:
+    """
+    The measurements of computing a single suggestion for my unit.
+    """
+
+    def __init__(self, draft_pick: int, internal_pick: int):
+        """
+        Initialize the PickMetrics object.
+        Args:
+            draft_pick (int): The draft pick the suggestion was computed for.
+            internal_pick (int): The internal pick the suggestion was computed for.
+        """
+        self.draft_pick: int = draft_pick
+        self.internal_pick: int = internal_pick
+        self.seconds: float = 0.0
+        # Suggestions taken from the course prioritizations and tested
+        self.suggestions_tested: int = 0
+        # Picks probed while looking for the latest pick of suggestions
+        self.lookahead_steps: int = 0
+        # Malshabs queued (or scheduled) for later picks when the suggestion was made
+        self.queue_size: int = 0
+        # Peak traced memory while computing the suggestion, if tracing memory
+        self.peak_memory_bytes: int | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            'event': 'suggestion',
+            'pick': self.draft_pick + 1,
+            'internal_pick': self.internal_pick + 1,
+            'seconds': self.seconds,
+            'suggestions_tested': self.suggestions_tested,
+            'lookahead_steps': self.lookahead_steps,
+            'queue_size': self.queue_size,
+            'peak_memory_bytes': self.peak_memory_bytes,
+        }
+
+
+class RemovalMetrics:
+    """
+    The measurements of removing a chosen Malshab from the course prioritizations.
+    """
+
+    def __init__(self, draft_pick: int, unit: Unit, seconds: float, removed_count: int):
+        self.draft_pick = draft_pick
+        self.unit = unit
+        self.seconds = seconds
+        self.removed_count = removed_count
+
+    def to_dict(self) -> dict:
+        return {
+            'event': 'removal',
+            'pick': self.draft_pick + 1,
+            'unit': self.unit.value,
+            'seconds': self.seconds,
+            'removed_count': self.removed_count,
+        }
+
+
+class DraftMetrics:
+    """
+    Instrumentation of the draft's hot path: the suggestions of my unit, and the removal of chosen Malshabs.
+    A draft only measures itself when it has metrics attached (draft.metrics), so without them it costs a None check.
+    The instrumented code updates the counters of the current pick directly (e.g. metrics.current_pick.lookahead_steps).
+    """
+
+    def __init__(self, profile_directory: str = None, trace_memory: bool = False):
+        """
+        Initialize the DraftMetrics object.
+        Args:
+            profile_directory (str): Directory to write a cProfile dump of every suggestion to, named by its draft pick.
+            trace_memory (bool): Whether to trace the peak memory of every suggestion with tracemalloc.
+        """
+        self.profile_directory: str | None = profile_directory
+        self.trace_memory: bool = trace_memory
+
+        self.picks: list[PickMetrics] = []
+        self.removals: list[RemovalMetrics] = []
+        self.current_pick: PickMetrics | None = None
+
+        self.suggestion_seconds: Histogram = Histogram()
+        self.removal_seconds: Histogram = Histogram()
+        self.suggestions_tested_total: int = 0
+        self.lookahead_steps_total: int = 0
+        self.removed_positions_total: int = 0
+        self.max_queue_size: int = 0
+
+        self._start_time: float = 0.0
+        self._profiler: cProfile.Profile | None = None
+        self._is_tracing_memory: bool = False
+
+    def start_pick(self, draft_pick: int, internal_pick: int):
+        """
+        Start measuring the suggestion of my unit's current pick.
+        Args:
+            draft_pick (int): The current draft pick.
+            internal_pick (int): The current internal pick.
+        """
+        self.current_pick = PickMetrics(draft_pick, internal_pick)
+        if self.trace_memory:
+            self._is_tracing_memory = not tracemalloc.is_tracing()
+            if self._is_tracing_memory:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.profile_directory is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start_time = time.perf_counter()
+
+    def end_pick(self):
+        """
+        Finish measuring the suggestion of the current pick.
+        """
+        pick = self.current_pick
+        pick.seconds = time.perf_counter() - self._start_time
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(self.profile_directory, exist_ok=True)
+            self._profiler.dump_stats(os.path.join(self.profile_directory, f'pick_{pick.draft_pick + 1}.prof'))
+            self._profiler = None
+        if self.trace_memory:
+            _, pick.peak_memory_bytes = tracemalloc.get_traced_memory()
+            if self._is_tracing_memory:
+                tracemalloc.stop()
+                self._is_tracing_memory = False
+
+        self.picks.append(pick)
+        self.current_pick = None
+        self.suggestion_seconds.observe(pick.seconds)
+        self.suggestions_tested_total += pick.suggestions_tested
+        self.lookahead_steps_total += pick.lookahead_steps
+        self.max_queue_size = max(self.max_queue_size, pick.queue_size)
+
+    def record_removal(self, draft_pick: int, unit: Unit, seconds: float, removed_count: int):
+        """
+        Record the removal of a chosen Malshab from the course prioritizations.
+        Args:
+            draft_pick (int): The draft pick the Malshab was chosen in.
+            unit (Unit): The unit that chose the Malshab.
+            seconds (float): The time the removal took.
+            removed_count (int): The number of prioritizations the Malshab was removed from.
+        """
+        self.removals.append(RemovalMetrics(draft_pick, unit, seconds, removed_count))
+        self.removal_seconds.observe(seconds)
+        self.removed_positions_total += removed_count
+
+    def write_json_lines(self, path: str):
+        """
+        Write every measured suggestion and removal as a JSON line, by the order of the draft picks.
+        Args:
+            path (str): The path of the JSONL file.
+        """
+        records = sorted(
+            [pick.to_dict() for pick in self.picks] + [removal.to_dict() for removal in self.removals],
+            key=lambda record: record['pick'],
+        )
+        with open(path, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+
+    def to_prometheus(self) -> str:
+        """
+        Get the aggregated metrics in the Prometheus text exposition format.
+        """
+        lines = self.suggestion_seconds.to_prometheus_lines(
+            f'{METRIC_NAME_PREFIX}_suggestion_seconds', "Wall time of computing my unit's suggestion.",
+        )
+        lines += self.removal_seconds.to_prometheus_lines(
+            f'{METRIC_NAME_PREFIX}_removal_seconds', 'Wall time of removing a chosen Malshab from the course prioritizations.',
+        )
+        for name, metric_type, description, value in (
+            ('suggestions_tested_total', 'counter', 'Suggestions tested while computing suggestions.', self.suggestions_tested_total),
+            ('lookahead_steps_total', 'counter', 'Picks probed while looking for the latest pick of suggestions.', self.lookahead_steps_total),
+            ('removed_positions_total', 'counter', 'Positions removed from the course prioritizations.', self.removed_positions_total),
+            ('queue_size', 'gauge', 'Malshabs queued for later picks at the last suggestion.', self.picks[-1].queue_size if self.picks else 0),
+            ('max_queue_size', 'gauge', 'The largest queue of Malshabs for later picks.', self.max_queue_size),
+        ):
+            lines += [
+                f'# HELP {METRIC_NAME_PREFIX}_{name} {description}',
+                f'# TYPE {METRIC_NAME_PREFIX}_{name} {metric_type}',
+                f'{METRIC_NAME_PREFIX}_{name} {value}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """
+        Write the aggregated metrics in the Prometheus text exposition format, e.g. for a node exporter textfile collector.
+        Args:
+            path (str): The path of the metrics file.
+        """
+        with open(path, 'w') as file:
+            file.write(self.to_prometheus())
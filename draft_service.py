@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from clutch_libs.miluim.batch_driver import HeadlessDraft
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft import Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_journal import DraftJournal
+from clutch_libs.miluim.pick_scheduler import PICK_SCHEDULERS, GreedySlotScheduler
+
+# Requests are limited in size, they are small JSON objects
+MAX_REQUEST_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class DraftSession:
+    """
+    A single draft hosted by the service, with its own unit perspective.
+    All the operations on the draft are serialized by the session lock, and run in the service executor,
+    so a slow session never blocks the event loop or the other sessions.
+    """
+
+    def __init__(self, session_id: str, draft: Draft):
+        """
+        Initialize the DraftSession object.
+        Args:
+            session_id (str): The ID of the session.
+            draft (Draft): The draft, after setup.
+        """
+        self.session_id: str = session_id
+        self.draft: Draft = draft
+        self.lock: asyncio.Lock = asyncio.Lock()
+        # The suggestion of my unit's current pick, computed once per pick
+        self.recommendation_pick: int | None = None
+        self.recommendation: tuple | None = None
+
+    def get_current_unit(self) -> Unit | None:
+        draft = self.draft
+        if not draft.is_active or draft.current_draft_pick >= len(draft.general_picking_order):
+            return None
+        return draft.general_picking_order[draft.current_draft_pick]
+
+    def get_state(self) -> dict:
+        draft = self.draft
+        current_unit = self.get_current_unit()
+        return {
+            'session_id': self.session_id,
+            'my_unit': draft.my_unit.value,
+            'is_active': current_unit is not None,
+            'current_draft_pick': draft.current_draft_pick,
+            'current_internal_pick': draft.current_internal_pick,
+            'current_unit': current_unit.value if current_unit is not None else None,
+            'is_my_turn': current_unit == draft.my_unit,
+            'remaining_internal_picks_order': [course.value for course in draft.remaining_internal_picks_order],
+            'can_undo': bool(draft.history.steps),
+            'can_redo': bool(draft.history.undone_steps),
+        }
+
+    def get_recommendation(self) -> dict:
+        """
+        Get the suggestion for my unit's current pick, computing it if needed.
+        """
+        draft = self.draft
+        current_unit = self.get_current_unit()
+        if current_unit != draft.my_unit:
+            raise ValueError(f'Pick no. {draft.current_draft_pick + 1} is not a pick of unit {draft.my_unit.name}.')
+
+        if self.recommendation_pick != draft.current_draft_pick:
+            # The unit may have more picks than its internal picking order, the picks after it are not recommended
+            if draft.remaining_internal_picks_order:
+                self.recommendation = draft._get_suggestion_for_internal_pick()
+            else:
+                self.recommendation = None, None
+            self.recommendation_pick = draft.current_draft_pick
+        suggestion, course = self.recommendation
+        if suggestion is None:
+            return {'draft_pick': draft.current_draft_pick, 'malshab_id': None, 'course': None}
+        return {'draft_pick': draft.current_draft_pick, 'malshab_id': suggestion.id, 'course': course.value}
+
+    def record_pick(self, malshab_id: str, course: Course | None) -> dict:
+        """
+        Record the pick of the unit whose turn it is.
+        For my unit's picks the course defaults to the course of the suggestion.
+        """
+        draft = self.draft
+        current_unit = self.get_current_unit()
+        if current_unit is None:
+            raise ValueError('The draft has ended.')
+
+        # Like in the interactive draft, only picks other than the suggestion are checked for eligibility
+        suggestion = self.recommendation[0] if self.recommendation_pick == draft.current_draft_pick else None
+        is_suggestion = current_unit == draft.my_unit and suggestion is not None and suggestion.id == malshab_id
+        if not is_suggestion and not draft.eligibility_index.can_pick(current_unit, malshab_id):
+            raise ValueError(f'Malshab ID {malshab_id} is not allowed for unit {current_unit.name}.')
+
+        if current_unit == draft.my_unit:
+            if course is None:
+                if suggestion is None:
+                    raise ValueError('A course is required for a pick that was not recommended.')
+                course = self.recommendation[1]
+            if course not in draft.remaining_internal_picks_order:
+                raise ValueError(f'Course {course.name} has no remaining picks.')
+            if suggestion is not None and not is_suggestion and draft.journal is not None:
+                draft.journal.record_override(draft.current_draft_pick, suggestion.id, malshab_id, course)
+        else:
+            course = Course.EXTERNAL
+
+        draft.handle_chosen_malshab(malshab_id=malshab_id, unit=current_unit, course=course)
+        return self.get_state()
+
+    def skip(self) -> dict:
+        if self.get_current_unit() is None:
+            raise ValueError('The draft has ended.')
+        self.draft.skip_current_pick()
+        return self.get_state()
+
+    def undo(self) -> dict:
+        self.draft.undo()
+        self.recommendation_pick = None
+        return self.get_state()
+
+    def redo(self) -> dict:
+        self.draft.redo()
+        self.recommendation_pick = None
+        return self.get_state()
+
+    def get_results(self) -> dict:
+        return {
+            'results': [
+                {
+                    'pick': draft_result.pick,
+                    'unit': draft_result.unit.value,
+                    'course': draft_result.course.value,
+                    'malshab_id': draft_result.malshab_id,
+                }
+                for draft_result in self.draft.draft_results
+            ],
+        }
+
+    def close(self):
+        if self.draft.journal is not None:
+            self.draft.journal.close()
+            self.draft.journal = None
+
+
+class DraftService:
+    """
+    Hosts many draft sessions in one process, behind a local JSON lines API (one request and one response per line).
+    Sessions created from the same config for the same unit share its read-only data (the Malshab table,
+    the prioritizations, the unit lists and the indexes), which is loaded and validated for the unit only once.
+
+    Requests are JSON objects with a "command" and its arguments:
+        {"command": "create_session", "session_id": "cohort-a", "config": "draft.json",
+            "unit": "7190", "scheduler": "greedy", "journal": "journals/cohort-a"}
+        {"command": "get_state", "session_id": "cohort-a"}
+        {"command": "get_recommendation", "session_id": "cohort-a"}
+        {"command": "record_pick", "session_id": "cohort-a", "malshab_id": "123456789", "course": "shefa"}
+        {"command": "skip" / "undo" / "redo" / "get_results" / "close_session", "session_id": "cohort-a"}
+        {"command": "list_sessions"}
+    Responses are {"ok": true, ...} or {"ok": false, "error": "..."}.
+    """
+
+    def __init__(self, workers_count: int = None):
+        """
+        Initialize the DraftService object.
+        Args:
+            workers_count (int): The number of threads running draft operations, the default of ThreadPoolExecutor if not given.
+        """
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers_count, thread_name_prefix='draft-session')
+        self.sessions: dict[str, DraftSession] = {}
+        # The loaded drafts, by the path of their config and their unit, shared by all sessions created from them
+        self.config_path_and_unit_to_template_draft: dict[tuple[str, Unit], asyncio.Future] = {}
+
+    async def _run_in_executor(self, function: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def _get_template_draft(self, config_path: str, my_unit: Unit) -> Draft:
+        # The inputs are validated for the unit picking in them, so every unit gets its own template
+        key = os.path.abspath(config_path), my_unit
+        template_draft_future = self.config_path_and_unit_to_template_draft.get(key)
+        if template_draft_future is None:
+            def load_template_draft() -> Draft:
+                template_draft = Draft(my_unit)
+                template_draft.setup(DraftConfig.load_from_json(key[0]))
+                return template_draft
+
+            # Sessions created while the config is loading wait for the same load
+            template_draft_future = asyncio.ensure_future(self._run_in_executor(load_template_draft))
+            self.config_path_and_unit_to_template_draft[key] = template_draft_future
+        try:
+            return await asyncio.shield(template_draft_future)
+        except Exception:
+            # Let the next session try to load it again
+            self.config_path_and_unit_to_template_draft.pop(key, None)
+            raise
+
+    def _get_session(self, request: dict) -> DraftSession:
+        session_id = _get_field(request, 'session_id')
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError(f'There is no session {session_id}.')
+        return session
+
+    async def _run_in_session(self, request: dict, function: Callable[[DraftSession], dict]) -> dict:
+        session = self._get_session(request)
+        async with session.lock:
+            return await self._run_in_executor(function, session)
+
+    async def create_session(self, request: dict) -> dict:
+        session_id = _get_field(request, 'session_id')
+        if session_id in self.sessions:
+            raise ValueError(f'Session {session_id} already exists.')
+        my_unit = Unit(request.get('unit', Unit.TISHIM.value))
+        scheduler_name = request.get('scheduler', GreedySlotScheduler.name)
+        if scheduler_name not in PICK_SCHEDULERS:
+            raise ValueError(f'Unknown scheduler {scheduler_name}.')
+
+        template_draft = await self._get_template_draft(_get_field(request, 'config'), my_unit)
+        if session_id in self.sessions:
+            raise ValueError(f'Session {session_id} already exists.')
+        draft = template_draft.fork_setup(HeadlessDraft(pick_records=[], my_unit=my_unit))
+        draft.pick_scheduler = PICK_SCHEDULERS[scheduler_name]()
+        session = DraftSession(session_id, draft)
+        # Registered right away, so the session ID stays taken while the draft is resumed
+        self.sessions[session_id] = session
+
+        journal_directory = request.get('journal')
+        if journal_directory is None:
+            return session.get_state()
+
+        def resume(session: DraftSession) -> dict:
+            journal = DraftJournal(journal_directory)
+            journal.open()
+            try:
+                session.draft.resume_from_journal(journal)
+            except Exception:
+                journal.close()
+                raise
+            return session.get_state()
+
+        try:
+            return await self._run_in_session(request, resume)
+        except BaseException:
+            # A draft that failed to resume is left half way through its journal, drop the session
+            if self.sessions.get(session_id) is session:
+                del self.sessions[session_id]
+            raise
+
+    async def close_session(self, request: dict) -> dict:
+        session = self._get_session(request)
+        async with session.lock:
+            await self._run_in_executor(session.close)
+            self.sessions.pop(session.session_id, None)
+        return {}
+
+    async def list_sessions(self, request: dict) -> dict:
+        # Every state is read under its session's lock, so it is not read in the middle of a pick
+        states = []
+        for session in list(self.sessions.values()):
+            async with session.lock:
+                # Sessions closed while waiting for their turn are not listed
+                if self.sessions.get(session.session_id) is session:
+                    states.append(session.get_state())
+        return {'sessions': states}
+
+    async def get_state(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.get_state)
+
+    async def get_recommendation(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.get_recommendation)
+
+    async def record_pick(self, request: dict) -> dict:
+        malshab_id = str(_get_field(request, 'malshab_id')).strip()
+        course = Course(request['course']) if request.get('course') is not None else None
+        return await self._run_in_session(request, lambda session: session.record_pick(malshab_id, course))
+
+    async def skip(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.skip)
+
+    async def undo(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.undo)
+
+    async def redo(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.redo)
+
+    async def get_results(self, request: dict) -> dict:
+        return await self._run_in_session(request, DraftSession.get_results)
+
+    async def handle_request(self, request: dict) -> dict:
+        """
+        Handle a single API request.
+        Args:
+            request (dict): The request.
+        Returns:
+            dict: The response.
+        """
+        command_to_handler = {
+            'create_session': self.create_session,
+            'close_session': self.close_session,
+            'list_sessions': self.list_sessions,
+            'get_state': self.get_state,
+            'get_recommendation': self.get_recommendation,
+            'record_pick': self.record_pick,
+            'skip': self.skip,
+            'undo': self.undo,
+            'redo': self.redo,
+            'get_results': self.get_results,
+        }
+        try:
+            if not isinstance(request, dict):
+                raise ValueError('A request must be a JSON object.')
+            handler = command_to_handler.get(request.get('command'))
+            if handler is None:
+                raise ValueError(f'Unknown command {request.get("command")!r}.')
+            return {'ok': True} | await handler(request)
+        except (ValueError, OSError) as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            # Any other error still gets a response, so the requests after it on the connection are served
+            logger.exception('Failed to handle request %r.', request)
+            return {'ok': False, 'error': f'Internal error: {type(e).__name__}: {e}'}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve a client connection, answering each request line with a response line.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    response = {'ok': False, 'error': 'Request is too long.'}
+                    writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {'ok': False, 'error': f'Invalid JSON: {e}'}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = None, port: int = None):
+        """
+        Serve the API until cancelled, on a Unix socket or on a localhost TCP port.
+        Args:
+            socket_path (str): Path of the Unix socket to listen on.
+            port (int): The localhost port to listen on, if no socket path is given.
+        """
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path, limit=MAX_REQUEST_BYTES)
+            print(f'Draft service listening on {socket_path}')
+        else:
+            server = await asyncio.start_server(self.handle_connection, host='127.0.0.1', port=port, limit=MAX_REQUEST_BYTES)
+            print(f'Draft service listening on 127.0.0.1:{server.sockets[0].getsockname()[1]}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for session in self.sessions.values():
+                session.close()
+            self.executor.shutdown(wait=False)
+
+
+def _get_field(request: dict, name: str):
+    if request.get(name) is None:
+        raise ValueError(f'Request is missing the field {name!r}.')
+    return request[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host many drafts in one process, behind a local JSON lines API.')
+    listen_group = parser.add_mutually_exclusive_group(required=True)
+    listen_group.add_argument('--socket', help='Path of the Unix socket to listen on.')
+    listen_group.add_argument('--port', type=int, help='The localhost TCP port to listen on.')
+    parser.add_argument('--workers', type=int, help='Number of threads running draft operations.')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(DraftService(args.workers).serve(socket_path=args.socket, port=args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
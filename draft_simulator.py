@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from clutch_libs.miluim.batch_driver import HeadlessDraft
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft import Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.pick_scheduler import PICK_SCHEDULERS, GreedySlotScheduler
+
+
+class OpponentPolicy:
+    """
+    The way another unit picks from its list in a simulated draft.
+    The base policy picks uniformly at random among the available Malshabs.
+    """
+
+    # Number of random tries before falling back to scanning the whole list
+    ATTEMPTS = 50
+
+    def _get_weight(self, draft: Draft, unit: Unit, list_position: int, malshab_id: str) -> float:
+        """
+        The chance, in [0, 1], of accepting a randomly drawn available Malshab.
+        """
+        return 1.0
+
+    def choose(self, draft: Draft, unit: Unit, taken_malshab_ids: set[str], generator: random.Random) -> str | None:
+        """
+        Choose the Malshab the unit picks, by rejection sampling its list.
+        Args:
+            draft (Draft): The simulated draft.
+            unit (Unit): The unit picking.
+            taken_malshab_ids (set[str]): The IDs of the Malshabs that were already taken.
+            generator (random.Random): The random generator of the simulation.
+        Returns:
+            str | None: The chosen Malshab ID, or None if the unit has no available Malshabs.
+        """
+        malshab_ids = draft.unit_to_malshab_ids[unit]
+        if not malshab_ids:
+            return None
+        for _ in range(self.ATTEMPTS):
+            list_position = generator.randrange(len(malshab_ids))
+            malshab_id = malshab_ids[list_position]
+            if malshab_id not in taken_malshab_ids and generator.random() < self._get_weight(draft, unit, list_position, malshab_id):
+                return malshab_id
+
+        # Most of the list is taken (or rejected), choose among what's left by weight
+        available_candidates = [
+            (list_position, malshab_id) for list_position, malshab_id in enumerate(malshab_ids)
+            if malshab_id not in taken_malshab_ids
+        ]
+        if not available_candidates:
+            return None
+        weights = [self._get_weight(draft, unit, list_position, malshab_id) for list_position, malshab_id in available_candidates]
+        if not any(weights):
+            return generator.choice(available_candidates)[1]
+        return generator.choices(available_candidates, weights)[0][1]
+
+
+class RankBiasedPolicy(OpponentPolicy):
+    """
+    Treats the unit's list as its ranking, and prefers Malshabs higher on it.
+    A Malshab at relative position x in the list is accepted with chance (1 - x) ** bias.
+    """
+
+    def __init__(self, bias: float = 2.0):
+        self.bias = bias
+
+    def _get_weight(self, draft: Draft, unit: Unit, list_position: int, malshab_id: str) -> float:
+        return (1 - list_position / len(draft.unit_to_malshab_ids[unit])) ** self.bias
+
+
+class PsychScoreWeightedPolicy(OpponentPolicy):
+    """
+    Prefers Malshabs with higher psych scores, accepting with chance (psych_score / max_psych_score) ** exponent.
+    Malshabs we don't have details for get a neutral weight.
+    """
+
+    UNKNOWN_WEIGHT = 0.5
+
+    def __init__(self, exponent: float = 2.0, max_psych_score: int = 100):
+        self.exponent = exponent
+        self.max_psych_score = max_psych_score
+
+    def _get_weight(self, draft: Draft, unit: Unit, list_position: int, malshab_id: str) -> float:
+        row = draft.malshab_table.get_row(malshab_id)
+        if row is None:
+            return self.UNKNOWN_WEIGHT
+        return (draft.malshab_table.psych_scores[row] / self.max_psych_score) ** self.exponent
+
+
+POLICIES: dict[str, type[OpponentPolicy]] = {
+    'uniform': OpponentPolicy,
+    'rank': RankBiasedPolicy,
+    'psych': PsychScoreWeightedPolicy,
+}
+
+
+class SimulatedDraft(HeadlessDraft):
+    """
+    A headless draft where other units pick by their opponent policies, and my unit always accepts the suggestion.
+    """
+
+    def __init__(self, unit_to_policy: dict[Unit, OpponentPolicy], generator: random.Random):
+        super().__init__(pick_records=[])
+        self.unit_to_policy: dict[Unit, OpponentPolicy] = unit_to_policy
+        self.generator: random.Random = generator
+        self.taken_malshab_ids: set[str] = set()
+
+    def _get_external_pick(self, unit: Unit) -> str | None:
+        return self.unit_to_policy[unit].choose(self, unit, self.taken_malshab_ids, self.generator)
+
+    def handle_chosen_malshab(self, malshab_id: str, unit: Unit, course: Course = Course.EXTERNAL):
+        super().handle_chosen_malshab(malshab_id, unit, course)
+        self.taken_malshab_ids.add(malshab_id)
+
+
+# The read-only state of a worker process, set once by the pool initializer
+_worker_template_draft: Draft | None = None
+_worker_unit_to_policy: dict[Unit, OpponentPolicy] | None = None
+
+
+def _initialize_worker(template_draft: Draft, unit_to_policy: dict[Unit, OpponentPolicy]):
+    """
+    Receive the shared, read-only draft data once per worker, instead of once per simulation.
+    """
+    global _worker_template_draft, _worker_unit_to_policy
+    _worker_template_draft = template_draft
+    _worker_unit_to_policy = unit_to_policy
+    # The draft progress printing is meaningless (and slow) in simulations
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _run_simulations(seed: int, simulation_indexes: range) -> dict[Course, Counter]:
+    """
+    Run a batch of simulations in a worker, each seeded by its own index, so results don't depend on the batching.
+    """
+    course_to_counts: dict[Course, Counter] = {}
+    for simulation_index in simulation_indexes:
+        generator = random.Random(f'{seed}:{simulation_index}')
+        draft = _worker_template_draft.fork_setup(SimulatedDraft(_worker_unit_to_policy, generator))
+        draft.run_to_completion()
+        for draft_result in draft.draft_results:
+            if draft_result.unit == draft.my_unit:
+                course_to_counts.setdefault(draft_result.course, Counter())[draft_result.malshab_id] += 1
+    return course_to_counts
+
+
+class SimulationReport:
+    """
+    The distribution of the Malshabs each course ended up with, over all simulations.
+    """
+
+    def __init__(self, simulations_count: int, template_draft: Draft):
+        self.simulations_count: int = simulations_count
+        self.template_draft: Draft = template_draft
+        self.course_to_counts: dict[Course, Counter] = {}
+
+    def add_counts(self, course_to_counts: dict[Course, Counter]):
+        for course, counts in course_to_counts.items():
+            self.course_to_counts.setdefault(course, Counter()).update(counts)
+
+    def get_distribution(self, course: Course) -> list[tuple[str, int, float]]:
+        """
+        Get the Malshabs the course ended up with, by how often it got them.
+        Args:
+            course (Course): The course.
+        Returns:
+            list[tuple[str, int, float]]: The Malshab ID, its priority in the course (1-based, 0 if not prioritized),
+                and the share of the simulations in which the course got it.
+        """
+        prioritization = self.template_draft.course_to_prioritization.get(course)
+        distribution = []
+        for malshab_id, count in self.course_to_counts.get(course, Counter()).most_common():
+            row = self.template_draft.malshab_table.get_row(malshab_id)
+            position = prioritization.row_to_position.get(row) if prioritization is not None and row is not None else None
+            distribution.append((malshab_id, position + 1 if position is not None else 0, count / self.simulations_count))
+        return distribution
+
+    def to_dict(self) -> dict:
+        return {
+            'simulations_count': self.simulations_count,
+            'courses': {
+                course.value: [
+                    {'malshab_id': malshab_id, 'priority': priority, 'share': share}
+                    for malshab_id, priority, share in self.get_distribution(course)
+                ]
+                for course in self.course_to_counts
+            },
+        }
+
+
+def simulate_drafts(
+    template_draft: Draft,
+    simulations_count: int,
+    unit_to_policy: dict[Unit, OpponentPolicy] = None,
+    workers_count: int = None,
+    seed: int = 0,
+    batch_size: int = 50,
+) -> SimulationReport:
+    """
+    Simulate many full drafts in a process pool, with other units picking by stochastic policies.
+    The results are reproducible for a given seed, regardless of the number of workers.
+    Args:
+        template_draft (Draft): A draft after setup, whose input data is shared by all simulations.
+        simulations_count (int): The number of drafts to simulate.
+        unit_to_policy (dict[Unit, OpponentPolicy]): The policy of each unit, uniform picks if not given.
+        workers_count (int): The number of worker processes, the number of CPUs if not given.
+        seed (int): The base seed of the simulations.
+        batch_size (int): The number of simulations sent to a worker at once.
+    Returns:
+        SimulationReport: The distribution of the Malshabs each course ended up with.
+    """
+    unit_to_policy = unit_to_policy if unit_to_policy is not None else {}
+    unit_to_policy = {unit: unit_to_policy.get(unit, OpponentPolicy()) for unit in Unit}
+    report = SimulationReport(simulations_count, template_draft)
+
+    # Only the input data is sent to the workers, without any state of the template draft
+    shared_draft = template_draft.fork_setup()
+    with ProcessPoolExecutor(
+        max_workers=workers_count,
+        initializer=_initialize_worker,
+        initargs=(shared_draft, unit_to_policy),
+    ) as executor:
+        futures = [
+            executor.submit(_run_simulations, seed, range(start, min(start + batch_size, simulations_count)))
+            for start in range(0, simulations_count, batch_size)
+        ]
+        for future in futures:
+            report.add_counts(future.result())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate drafts to evaluate the suggestion strategy.')
+    parser.add_argument('config', help='Path to the draft config JSON file.')
+    parser.add_argument('--simulations', type=int, default=1000, help='Number of drafts to simulate.')
+    parser.add_argument('--workers', type=int, help='Number of worker processes.')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='uniform', help='The policy of all other units.')
+    parser.add_argument('--scheduler', choices=sorted(PICK_SCHEDULERS), default=GreedySlotScheduler.name, help='The pick scheduler of my unit.')
+    parser.add_argument('--seed', type=int, default=0, help='Base seed of the simulations.')
+    parser.add_argument('--output', help='Path to write the report JSON to.')
+    parser.add_argument('--top', type=int, default=10, help='Number of Malshabs to print per course.')
+    args = parser.parse_args()
+
+    template_draft = Draft()
+    template_draft.setup(DraftConfig.load_from_json(args.config))
+    template_draft.pick_scheduler = PICK_SCHEDULERS[args.scheduler]()
+    policy = POLICIES[args.policy]()
+    report = simulate_drafts(
+        template_draft,
+        args.simulations,
+        {unit: policy for unit in Unit},
+        workers_count=args.workers,
+        seed=args.seed,
+    )
+
+    for course in report.course_to_counts:
+        print(f'{course.name}:')
+        for malshab_id, priority, share in report.get_distribution(course)[:args.top]:
+            print(f'  {malshab_id} (priority {priority}): {share:.1%}')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report.to_dict(), file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
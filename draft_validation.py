@@ -0,0 +1,105 @@
+from array import array
+
+# The sources of the single-column inputs that aren't per unit or per course
+GENERAL_PICKING_ORDER_SOURCE = 'general_picking_order'
+INTERNAL_PICKING_ORDER_SOURCE = 'internal_picking_order'
+
+
+class ValidationIssue:
+    """
+    A single problem found in the draft inputs, with where it was found.
+    """
+
+    def __init__(self, path: str | None, line: int | None, message: str, is_error: bool = True):
+        """
+        Initialize the ValidationIssue object.
+        Args:
+            path (str | None): The file the problem is in, None if it isn't in a specific file.
+            line (int | None): The 1-based line of the problem in the file, None if it is about the whole file.
+            message (str): The description of the problem.
+            is_error (bool): Whether the problem prevents running the draft, or is only a warning.
+        """
+        self.path = path
+        self.line = line
+        self.message = message
+        self.is_error = is_error
+
+    def __str__(self) -> str:
+        location = (self.path or '<input>') + (f':{self.line}' if self.line is not None else '')
+        return f'{location}: {"" if self.is_error else "warning: "}{self.message}'
+
+
+class ValidationReport:
+    """
+    All the problems found in the draft inputs, collected while loading them and when checking them against each other,
+    so they can all be fixed at once instead of one per setup attempt.
+    The inputs record the file they were loaded from and the line of each of their values (as sources),
+    so problems found after loading can still point at their line.
+    """
+
+    def __init__(self):
+        """
+        Initialize the ValidationReport object.
+        """
+        self.issues: list[ValidationIssue] = []
+        self.source_to_path: dict = {}
+        # The line of every value of the source, by its position in the loaded input
+        self.source_to_lines: dict = {}
+
+    def add_error(self, path: str | None, line: int | None, message: str):
+        self.issues.append(ValidationIssue(path, line, message))
+
+    def add_warning(self, path: str | None, line: int | None, message: str):
+        self.issues.append(ValidationIssue(path, line, message, is_error=False))
+
+    def set_source(self, source, path: str, lines: array = None):
+        """
+        Record the file an input was loaded from.
+        Args:
+            source: The key of the input, e.g. its unit or course, or one of the picking order sources.
+            path (str): The file it was loaded from.
+            lines (array): The line of each of its values, by their position in the input.
+        """
+        self.source_to_path[source] = path
+        if lines is not None:
+            self.source_to_lines[source] = lines
+
+    def get_path(self, source) -> str | None:
+        return self.source_to_path.get(source)
+
+    def get_line(self, source, index: int) -> int | None:
+        """
+        Get the line in its file of a value of an input.
+        Args:
+            source: The key of the input.
+            index (int): The position of the value in the input.
+        Returns:
+            int | None: The 1-based line, or None if the input's lines weren't recorded.
+        """
+        lines = self.source_to_lines.get(source)
+        return lines[index] if lines is not None and index < len(lines) else None
+
+    def add_source_error(self, source, index: int | None, message: str):
+        self.add_error(self.get_path(source), self.get_line(source, index) if index is not None else None, message)
+
+    def add_source_warning(self, source, index: int | None, message: str):
+        self.add_warning(self.get_path(source), self.get_line(source, index) if index is not None else None, message)
+
+    @property
+    def errors(self) -> list[ValidationIssue]:
+        return [issue for issue in self.issues if issue.is_error]
+
+    @property
+    def warnings(self) -> list[ValidationIssue]:
+        return [issue for issue in self.issues if not issue.is_error]
+
+    def raise_for_errors(self):
+        """
+        Raise a ValueError listing all the errors, if any were found.
+        """
+        errors = self.errors
+        if errors:
+            raise ValueError(f'Found {len(errors)} problems in the draft inputs:\n' + '\n'.join(map(str, errors)))
+
+    def __str__(self) -> str:
+        return '\n'.join(map(str, self.issues))
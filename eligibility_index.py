@@ -0,0 +1,95 @@
+from array import array
+from functools import cached_property
+
+from clutch_libs.miluim.consts import Unit
+
+
+class EligibilityIndex:
+    """
+    Hashed index of which units are allowed to pick which Malshab.
+    Each Malshab ID is interned to a compact row number, and each row holds a bitmask of the eligible units,
+    so checking eligibility is a dict lookup and a bit test instead of a list scan.
+    """
+
+    # Every unit gets a fixed bit, based on its position in the Unit enum
+    UNIT_TO_BIT: dict[Unit, int] = {unit: 1 << index for index, unit in enumerate(Unit)}
+
+    def __init__(self):
+        """
+        Initialize the EligibilityIndex object.
+        """
+        self.row_to_malshab_id: list[str] = []
+        self.row_to_mask: array = array('B')
+
+    @cached_property
+    def malshab_id_to_row(self) -> dict[str, int]:
+        # Built on first use, so an index mapped from an image is usable before its IDs are indexed
+        return {malshab_id: row for row, malshab_id in enumerate(self.row_to_malshab_id)}
+
+    def _get_or_create_row(self, malshab_id: str) -> int:
+        row = self.malshab_id_to_row.get(malshab_id)
+        if row is None:
+            row = len(self.row_to_mask)
+            self.malshab_id_to_row[malshab_id] = row
+            self.row_to_malshab_id.append(malshab_id)
+            self.row_to_mask.append(0)
+        return row
+
+    def add_unit_malshab_ids(self, unit: Unit, malshab_ids: list[str]):
+        """
+        Mark all the given Malshab IDs as eligible for the given unit.
+        Args:
+            unit (Unit): The unit that can pick the Malshabs.
+            malshab_ids (list[str]): The IDs of the Malshabs the unit can pick.
+        """
+        unit_bit = self.UNIT_TO_BIT[unit]
+        for malshab_id in malshab_ids:
+            self.row_to_mask[self._get_or_create_row(malshab_id)] |= unit_bit
+
+    def build(self, unit_to_malshab_ids: dict[Unit, list[str]]):
+        """
+        Build the index from scratch, based on the mapping of units to Malshab IDs.
+        Args:
+            unit_to_malshab_ids (dict[Unit, list[str]]): The Malshab IDs each unit can pick.
+        """
+        self.malshab_id_to_row = {}
+        self.row_to_malshab_id = []
+        self.row_to_mask = array('B')
+        for unit, malshab_ids in unit_to_malshab_ids.items():
+            self.add_unit_malshab_ids(unit, malshab_ids)
+
+    def get_mask(self, malshab_id: str) -> int:
+        """
+        Get the bitmask of units that can pick the Malshab.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+        Returns:
+            int: The bitmask of eligible units, 0 if the Malshab is unknown.
+        """
+        row = self.malshab_id_to_row.get(malshab_id)
+        return 0 if row is None else self.row_to_mask[row]
+
+    def can_pick(self, unit: Unit, malshab_id: str) -> bool:
+        """
+        Check if the unit is allowed to pick the Malshab.
+        Args:
+            unit (Unit): The unit picking.
+            malshab_id (str): The ID of the Malshab.
+        Returns:
+            bool: True if the Malshab is on the unit's list, False otherwise.
+        """
+        return bool(self.get_mask(malshab_id) & self.UNIT_TO_BIT[unit])
+
+    def get_eligible_units(self, malshab_id: str) -> list[Unit]:
+        """
+        Get all the units that can pick the Malshab.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+        Returns:
+            list[Unit]: The units that have the Malshab on their list.
+        """
+        mask = self.get_mask(malshab_id)
+        return [unit for unit, unit_bit in self.UNIT_TO_BIT.items() if mask & unit_bit]
+
+    def __len__(self) -> int:
+        return len(self.row_to_mask)
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from clutch_libs.miluim.consts import Unit
+from clutch_libs.miluim.course_prioritization import ParsedPrioritization
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_image import BYTE_ORDER_TO_CODE, IMAGE_VERSION, DraftImage, StringColumn
+from clutch_libs.miluim.draft_validation import ValidationIssue
+
+CACHE_MAGIC = b'MILCACHE'
+# Bumped whenever the parsing or the format changes, so older entries are parsed again
+CACHE_VERSION = 2
+# Magic, version, byte order, blobs count, checksum of everything after the header
+CACHE_HEADER = struct.Struct('<8sHBxII')
+BLOB_LENGTH = struct.Struct('<Q')
+# The kinds of parsed files, part of the name of their cache entries
+PRIORITIZATION_KIND = 'prioritization'
+SINGLE_COLUMN_KIND = 'column'
+SETUP_KIND = 'setup'
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedColumn:
+    """
+    The values of a single column CSV file, with the line of each of them.
+    """
+
+    def __init__(self, csv_path: str, values: list[str] = None, lines: array = None):
+        """
+        Initialize the ParsedColumn object.
+        Args:
+            csv_path (str): Path to the CSV file.
+            values (list[str]): The values, empty lines skipped.
+            lines (array): The 1-based line of every value.
+        """
+        self.csv_path: str = csv_path
+        self.values: list[str] = values if values is not None else []
+        self.lines: array = lines if lines is not None else array('I')
+
+    @classmethod
+    def parse(cls, csv_path: str) -> 'ParsedColumn':
+        """
+        Parse a single column CSV file, streaming it line by line.
+        Args:
+            csv_path (str): Path to the CSV file.
+        Returns:
+            ParsedColumn: The parsed values.
+        """
+        parsed = cls(csv_path)
+        with open(csv_path, 'r') as file:
+            for line_number, line in enumerate(file, start=1):
+                value = line.strip()
+                if value:
+                    parsed.values.append(value)
+                    parsed.lines.append(line_number)
+        return parsed
+
+
+def _encode_blobs(blobs: list[bytes]) -> bytes:
+    body = b''.join(BLOB_LENGTH.pack(len(blob)) + blob for blob in blobs)
+    return CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, BYTE_ORDER_TO_CODE[sys.byteorder], len(blobs), zlib.crc32(body)) + body
+
+
+def _decode_blobs(data: bytes) -> list[memoryview]:
+    magic, version, byte_order_code, blobs_count, checksum = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or byte_order_code != BYTE_ORDER_TO_CODE[sys.byteorder]:
+        raise ValueError('Cache entry was written by another version or on another machine.')
+    body = memoryview(data)[CACHE_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise ValueError('Cache entry is corrupted.')
+    blobs = []
+    offset = 0
+    for _ in range(blobs_count):
+        (length,) = BLOB_LENGTH.unpack_from(body, offset)
+        offset += BLOB_LENGTH.size
+        blobs.append(body[offset:offset + length])
+        offset += length
+    return blobs
+
+
+def _decode_array(typecode: str, blob: memoryview) -> array:
+    # Blobs are not aligned, so they are copied instead of cast in place
+    values = array(typecode)
+    values.frombytes(blob)
+    return values
+
+
+def _encode_prioritization(parsed: ParsedPrioritization) -> bytes:
+    return _encode_blobs([
+        json.dumps({'error': parsed.error, 'errors': parsed.errors}).encode('utf-8'),
+        StringColumn.encode(parsed.ids),
+        StringColumn.encode(parsed.first_names),
+        StringColumn.encode(parsed.last_names),
+        parsed.genders.tobytes(),
+        parsed.medical_profiles.tobytes(),
+        parsed.psych_scores.tobytes(),
+        bytes(parsed.is_schakim_flags),
+        parsed.lines.tobytes(),
+    ])
+
+
+def _decode_prioritization(csv_path: str, data: bytes) -> ParsedPrioritization:
+    raw_errors, ids, first_names, last_names, genders, medical_profiles, psych_scores, is_schakim_flags, lines = _decode_blobs(data)
+    parsed = ParsedPrioritization(csv_path)
+    errors = json.loads(str(raw_errors, 'utf-8'))
+    parsed.error = errors['error']
+    parsed.errors = [(line, message) for line, message in errors['errors']]
+    parsed.ids = list(StringColumn(ids))
+    parsed.first_names = list(StringColumn(first_names))
+    parsed.last_names = list(StringColumn(last_names))
+    parsed.genders = array('B', genders)
+    parsed.medical_profiles = _decode_array('i', medical_profiles)
+    parsed.psych_scores = _decode_array('i', psych_scores)
+    parsed.is_schakim_flags = bytearray(is_schakim_flags)
+    parsed.lines = _decode_array('I', lines)
+    return parsed
+
+
+def _encode_column(parsed: ParsedColumn) -> bytes:
+    return _encode_blobs([StringColumn.encode(parsed.values), parsed.lines.tobytes()])
+
+
+def _decode_column(csv_path: str, data: bytes) -> ParsedColumn:
+    values, lines = _decode_blobs(data)
+    return ParsedColumn(csv_path, list(StringColumn(values)), _decode_array('I', lines))
+
+
+class InputCache:
+    """
+    Parses the input files of a draft, caching the parsed files on disk if given a directory.
+    Entries are keyed by the SHA-256 of the file's content (not its path or modification time),
+    so an unchanged file is never parsed twice, and a changed file is always parsed again.
+    Each entry is a compact binary file of the parsed columns, checked by a CRC32 checksum,
+    and any entry that can't be read is simply parsed again. Entries are written atomically,
+    so concurrent setups can share the directory. The cache never evicts entries, the directory can be cleared at any time.
+    Parsing touches no shared state, so files can be loaded from several threads at once.
+
+    On top of the parsed files, the cache keeps an image of the whole set up draft (see draft_image),
+    keyed by the content of all the input files and the rest of the config. When none of them changed,
+    the draft is mapped from the image instead of being set up, skipping the loading and the validation too.
+    The issues the validation found (only warnings, drafts with errors aren't cached) are kept next to the image.
+    """
+
+    def __init__(self, directory: str = None):
+        """
+        Initialize the InputCache object.
+        Args:
+            directory (str): The directory of the cache entries, created if needed. Nothing is cached if not given.
+        """
+        self.directory: str | None = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        # The digests of the files hashed so far, so the setup image and the parsed files don't hash them twice
+        self.path_to_digest: dict[str, str] = {}
+
+    def _get_digest(self, csv_path: str) -> str:
+        digest = self.path_to_digest.get(csv_path)
+        if digest is None:
+            with open(csv_path, 'rb') as file:
+                digest = hashlib.file_digest(file, 'sha256').hexdigest()
+            self.path_to_digest[csv_path] = digest
+        return digest
+
+    def _get_entry_path(self, csv_path: str, kind: str) -> str:
+        return os.path.join(self.directory, f'{kind}-{CACHE_VERSION}-{self._get_digest(csv_path)}.bin')
+
+    def get_setup_image_path(self, config: DraftConfig, my_unit: Unit) -> str | None:
+        """
+        Get the path of the image of a draft set up from the config, keyed by everything the setup depends on.
+        Args:
+            config (DraftConfig): The config of the draft.
+            my_unit (Unit): The unit the draft picks for.
+        Returns:
+            str | None: The path of the image, which may not exist yet. None if nothing is cached, or an input file is missing.
+        """
+        if self.directory is None:
+            return None
+        general_picking_order = config.general_picking_order
+        try:
+            setup_key = {
+                'image_version': IMAGE_VERSION,
+                'unit': my_unit.value,
+                'courses': {course.value: self._get_digest(csv_path) for course, csv_path in config.course_to_prioritization_path.items()},
+                'units': {unit.value: self._get_digest(csv_path) for unit, csv_path in config.unit_to_malshab_ids_path.items()},
+                'general_picking_order': self._get_digest(config.general_picking_order_path) if general_picking_order is None else [
+                    list(general_picking_order.run_starts), list(general_picking_order.run_unit_codes),
+                    general_picking_order.block_length, general_picking_order.total_picks,
+                ],
+                'internal_picking_order': self._get_digest(config.internal_picking_order_path),
+                'course_quotas': {course.value: {attribute.value: limit for attribute, limit in limits.items()}
+                                  for course, limits in config.course_to_quota_limits.items()},
+                'unit_quotas': {unit.value: {attribute.value: limit for attribute, limit in limits.items()}
+                                for unit, limits in config.unit_to_quota_limits.items()},
+                'schakim_latest_draft_pick': config.schakim_latest_draft_pick,
+            }
+        except OSError:
+            # The setup reports the missing files
+            return None
+        digest = hashlib.sha256(json.dumps(setup_key, sort_keys=True).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{SETUP_KIND}-{CACHE_VERSION}-{digest}.bin')
+
+    def load_setup_image(self, image_path: str | None) -> tuple[DraftImage, list[ValidationIssue]] | None:
+        """
+        Open the image of a set up draft, if it was cached.
+        Args:
+            image_path (str | None): The path of the image, from get_setup_image_path.
+        Returns:
+            tuple[DraftImage, list[ValidationIssue]] | None: The image and the issues found when validating it,
+                None if it wasn't cached or can't be read.
+        """
+        if image_path is None or not os.path.exists(image_path):
+            return None
+        try:
+            with open(f'{image_path}.issues.json', 'r') as file:
+                issues = [ValidationIssue(path, line, message, is_error) for path, line, message, is_error in json.load(file)]
+            return DraftImage.open(image_path), issues
+        except (ValueError, TypeError, struct.error, OSError) as e:
+            logger.warning('Ignoring the cached setup image %s: %s', image_path, e)
+            return None
+
+    def write_setup_image(self, image_path: str | None, draft):
+        """
+        Cache the image of a draft that was just set up and validated, with the issues found when validating it.
+        Args:
+            image_path (str | None): The path of the image, from get_setup_image_path.
+            draft (Draft): The draft, before any pick.
+        """
+        if image_path is None:
+            return
+        issues_path = f'{image_path}.issues.json'
+        temporary_path = f'{issues_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            # The issues are written first, so an image is never found without them
+            with open(temporary_path, 'w') as file:
+                json.dump([[issue.path, issue.line, issue.message, issue.is_error] for issue in draft.validation_report.issues], file)
+            os.replace(temporary_path, issues_path)
+            DraftImage.write(draft, image_path)
+        except OSError as e:
+            logger.warning('Could not cache the setup image %s: %s', image_path, e)
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _load(self, csv_path: str, kind: str, parse, encode, decode):
+        if self.directory is None:
+            return parse(csv_path)
+
+        entry_path = self._get_entry_path(csv_path, kind)
+        try:
+            with open(entry_path, 'rb') as file:
+                return decode(csv_path, file.read())
+        except FileNotFoundError:
+            pass
+        except (ValueError, struct.error, UnicodeDecodeError, KeyError, TypeError) as e:
+            logger.warning('Ignoring the cache entry of %s: %s', csv_path, e)
+
+        parsed = parse(csv_path)
+        if getattr(parsed, 'error', None) is not None:
+            # Files that can't be parsed at all are quick to fail again, and their error names their path
+            return parsed
+        temporary_path = f'{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temporary_path, 'wb') as file:
+                file.write(encode(parsed))
+            os.replace(temporary_path, entry_path)
+        except OSError as e:
+            # A cache that can't be written only costs parsing the file again next time
+            logger.warning('Could not cache %s: %s', csv_path, e)
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return parsed
+
+    def load_prioritization(self, csv_path: str) -> ParsedPrioritization:
+        """
+        Get the parsed prioritization CSV file, from the cache if it was parsed before.
+        """
+        return self._load(csv_path, PRIORITIZATION_KIND, ParsedPrioritization.parse, _encode_prioritization, _decode_prioritization)
+
+    def load_single_column(self, csv_path: str) -> ParsedColumn:
+        """
+        Get the parsed single column CSV file, from the cache if it was parsed before.
+        """
+        return self._load(csv_path, SINGLE_COLUMN_KIND, ParsedColumn.parse, _encode_column, _decode_column)
@@ -0,0 +1,416 @@
+import argparse
+import logging
+import sys
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.course_prioritization import CoursePrioritization
+from clutch_libs.miluim.draft import SKIP_COMMAND, UNDO_COMMAND, Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_result import DraftResult
+from clutch_libs.miluim.draft_validation import ValidationReport
+from clutch_libs.miluim.malshab import Malshab
+from clutch_libs.miluim.pick_scheduler import PICK_SCHEDULERS, GreedySlotScheduler, PickScheduler
+
+
+class LeagueStep:
+    """
+    The changes a single draft pick (or skip) made to the league, recorded so it can be undone.
+    """
+
+    def __init__(self, draft_pick: int, unit: Unit):
+        """
+        Initialize the LeagueStep object.
+        Args:
+            draft_pick (int): The draft pick of the step.
+            unit (Unit): The unit picking in the step.
+        """
+        self.draft_pick: int = draft_pick
+        self.unit: Unit = unit
+        # None for a skipped pick
+        self.draft_result: DraftResult | None = None
+        # The row counted towards the quotas, None if the Malshab's details are unknown
+        self.quota_row: int | None = None
+        # The prioritization, the removed position and the head position before the removal, once per shared prioritization
+        self.prioritization_removals: list[tuple[CoursePrioritization, int, int]] = []
+        # The index and the course of every pick removed from each unit's remaining internal picking order, in order
+        self.unit_to_removed_internal_picks: dict[Unit, list[tuple[int, Course]]] = {}
+
+
+class LeagueDraft:
+    """
+    A single draft followed from the point of view of several units at once, e.g. by the draft coordinator.
+    Every unit gets a perspective: a Draft picking for it, with its own course prioritizations, internal picking order,
+    quotas and pick scheduler. All the perspectives share the rest: the Malshab table, the eligibility index,
+    the unit lists, the general picking order and the draft results.
+    A pick is applied once for the whole league: the Malshab is looked up once, removed once from every prioritization
+    (perspectives loading the same prioritization file share it), and every perspective only updates its own plan.
+    Recommendations are computed one perspective at a time, since shared prioritizations share their suggestion cursor.
+    Only the picking unit's recommendation is computed on its perspective, the others are previewed on forks of theirs,
+    since suggesting may drop courses from the remaining internal picking order, which only a unit's own turn may do.
+    """
+
+    def __init__(self, pick_scheduler: PickScheduler = None):
+        """
+        Initialize the LeagueDraft object.
+        Args:
+            pick_scheduler (PickScheduler): The strategy of every unit's suggestions, forked per unit. Greedy if not given.
+        """
+        self.pick_scheduler: PickScheduler = pick_scheduler if pick_scheduler is not None else GreedySlotScheduler()
+        self.unit_to_draft: dict[Unit, Draft] = {}
+        # Every distinct prioritization of the perspectives, a chosen Malshab is removed from each of them once
+        self.prioritizations: list[CoursePrioritization] = []
+        self.draft_results: list[DraftResult] = []
+        self.steps: list[LeagueStep] = []
+        self.current_draft_pick: int = 0
+        # The recommendation of each unit for the current state, computed on first use
+        self.unit_to_recommendation: dict[Unit, tuple[Malshab | None, Course | None]] = {}
+
+    @property
+    def template_draft(self) -> Draft:
+        # The first perspective, which loaded the shared inputs
+        return next(iter(self.unit_to_draft.values()))
+
+    @property
+    def general_picking_order(self):
+        return self.template_draft.general_picking_order
+
+    @property
+    def is_active(self) -> bool:
+        return self.current_draft_pick < len(self.general_picking_order)
+
+    def setup(self, unit_to_config: dict[Unit, DraftConfig]):
+        """
+        Setup the perspective of every unit from its config.
+        The unit lists and the general picking order are loaded once, from the first config, and all the configs must agree on them.
+        Prioritization files are loaded once too, even if several units use them.
+        All the problems in the inputs of all the units are reported together.
+        Args:
+            unit_to_config (dict[Unit, DraftConfig]): The config of every unit in the league.
+        """
+        if not unit_to_config:
+            raise ValueError('A league draft needs the config of at least one unit.')
+        first_unit, first_config = next(iter(unit_to_config.items()))
+        for unit, config in unit_to_config.items():
+            if config.unit_to_malshab_ids_path != first_config.unit_to_malshab_ids_path \
+                    or config.general_picking_order_path != first_config.general_picking_order_path \
+                    or config.general_picking_order != first_config.general_picking_order:
+                raise ValueError(
+                    f'The config of unit {unit.name} has other unit lists or another general picking order '
+                    f'than the config of unit {first_unit.name}.'
+                )
+
+        print('Starting league draft setup...')
+        template_draft = Draft(first_unit)
+        template_draft.setup_unit_to_malshab_ids(first_config.unit_to_malshab_ids_path)
+        if first_config.general_picking_order is not None:
+            template_draft.set_general_picking_order(first_config.general_picking_order)
+        else:
+            template_draft.setup_general_picking_order(first_config.general_picking_order_path)
+
+        self.unit_to_draft = {}
+        path_to_prioritization: dict[str, CoursePrioritization] = {}
+        errors: list[str] = []
+        for unit, config in unit_to_config.items():
+            print(f'Setting up the perspective of unit {unit.name}...')
+            if unit == first_unit:
+                draft = template_draft
+            else:
+                draft = template_draft.fork_setup(Draft(unit))
+                # Problems in the shared inputs were reported by the first unit, only their files and lines are needed
+                draft.validation_report = ValidationReport()
+                draft.validation_report.source_to_path = dict(template_draft.validation_report.source_to_path)
+                draft.validation_report.source_to_lines = dict(template_draft.validation_report.source_to_lines)
+            self._setup_perspective(draft, config, path_to_prioritization)
+            try:
+                draft.validate_input_data(check_shared_inputs=unit == first_unit)
+            except ValueError as e:
+                errors.append(f'Unit {unit.name}: {e}')
+            self.unit_to_draft[unit] = draft
+        if errors:
+            raise ValueError('\n'.join(errors))
+
+        self.prioritizations = list(path_to_prioritization.values())
+        self.draft_results = []
+        self.steps = []
+        self.current_draft_pick = 0
+        self.unit_to_recommendation = {}
+        print('League draft setup completed successfully.')
+
+    def _setup_perspective(self, draft: Draft, config: DraftConfig, path_to_prioritization: dict[str, CoursePrioritization]):
+        """
+        Load the inputs of a single unit into its perspective, sharing the prioritizations loaded already.
+        """
+        report = draft.validation_report
+        for course in draft.course_to_prioritization.keys():
+            csv_path = config.course_to_prioritization_path[course]
+            prioritization = path_to_prioritization.get(csv_path)
+            if prioritization is None:
+                prioritization = CoursePrioritization(course.name, draft.malshab_table)
+                prioritization.is_quiet = True
+                prioritization.load_from_csv(csv_path, report=report, source=course)
+                path_to_prioritization[csv_path] = prioritization
+            else:
+                report.set_source(course, csv_path)
+            draft.course_to_prioritization[course] = prioritization
+        draft.setup_internal_picking_order(config.internal_picking_order_path)
+        draft.setup_quotas(config.course_to_quota_limits, config.unit_to_quota_limits, config.schakim_latest_draft_pick)
+
+        draft.draft_results = self.draft_results
+        draft.pick_scheduler = self.pick_scheduler.fork()
+        # Six perspectives reasoning out loud would drown the draft output
+        draft.pick_scheduler.is_quiet = True
+
+    @staticmethod
+    def _get_perspective_course(draft: Draft, unit: Unit, course: Course) -> Course:
+        # Other units' courses are external from the point of view of a unit
+        return course if unit == draft.my_unit else Course.EXTERNAL
+
+    def get_recommendation(self, unit: Unit) -> tuple[Malshab | None, Course | None]:
+        """
+        Get the suggestion for the unit's next pick, from its perspective, computing it if needed.
+        Args:
+            unit (Unit): The unit.
+        Returns:
+            tuple[Malshab | None, Course | None]: The suggested Malshab and its course, (None, None) if the unit has no more picks.
+        """
+        recommendation = self.unit_to_recommendation.get(unit)
+        if recommendation is not None:
+            return recommendation
+
+        draft = self.unit_to_draft.get(unit)
+        if draft is None:
+            raise ValueError(f'Unit {unit.name} is not in the league.')
+        has_picks_left = draft.contested_pick_index.get_next_unit_pick(unit, self.current_draft_pick) < len(self.general_picking_order)
+        if draft.is_active and draft.remaining_internal_picks_order and has_picks_left:
+            if unit == self.general_picking_order[self.current_draft_pick]:
+                # The unit is picking, so its perspective suggests exactly like a single draft would
+                recommendation = draft._get_suggestion_for_internal_pick()
+            else:
+                recommendation = self._get_preview_recommendation(draft)
+        else:
+            recommendation = None, None
+        self.unit_to_recommendation[unit] = recommendation
+        return recommendation
+
+    @staticmethod
+    def _get_preview_recommendation(draft: Draft) -> tuple[Malshab | None, Course | None]:
+        """
+        Get the suggestion of a unit that is not picking now, on a fork of its perspective.
+        Suggesting may drop courses that ran out of Malshabs from the remaining internal picking order, or end the draft,
+        which only the unit's own turn may do.
+        """
+        preview_draft = draft.fork_state()
+        preview_draft.pick_scheduler.is_quiet = True
+        for prioritization in preview_draft.course_to_prioritization.values():
+            prioritization.is_quiet = True
+        recommendation = preview_draft._get_suggestion_for_internal_pick()
+        # The fork computed its cache for the current state, so the perspective can reuse it
+        draft.pick_scheduler.adopt_cache(preview_draft.pick_scheduler)
+        return recommendation
+
+    def get_recommendations(self) -> dict[Unit, tuple[Malshab | None, Course | None]]:
+        """
+        Get the suggestion for the next pick of every unit in the league.
+        """
+        return {unit: self.get_recommendation(unit) for unit in self.unit_to_draft}
+
+    def _start_step(self, unit: Unit) -> LeagueStep:
+        step = LeagueStep(self.current_draft_pick, unit)
+        # Internal picks removed while suggesting become part of the step, like in a single draft
+        for draft_unit, draft in self.unit_to_draft.items():
+            step.unit_to_removed_internal_picks[draft_unit] = draft.history.pending_removed_internal_picks
+            draft.history.pending_removed_internal_picks = []
+        return step
+
+    def _complete_step(self, step: LeagueStep):
+        self.steps.append(step)
+        self.current_draft_pick += 1
+        for draft in self.unit_to_draft.values():
+            draft.current_draft_pick = self.current_draft_pick
+        self.unit_to_recommendation = {}
+
+    def handle_chosen_malshab(self, malshab_id: str, unit: Unit, course: Course = Course.EXTERNAL):
+        """
+        Handle the case when a Malshab is chosen, updating every perspective.
+        Args:
+            malshab_id (str): The ID of the chosen Malshab.
+            unit (Unit): The unit that chose the Malshab.
+            course (Course): The course the Malshab was chosen for, external for units outside the league,
+                or for picks that don't count towards the unit's internal picking order.
+        """
+        picking_draft = self.unit_to_draft.get(unit)
+        if course != Course.EXTERNAL and (picking_draft is None or course not in picking_draft.remaining_internal_picks_order):
+            raise ValueError(f'Unit {unit.name} has no remaining picks for course {course.name}.')
+        step = self._start_step(unit)
+
+        # Let every unit's scheduler update its plan before the draft moves on
+        for draft in self.unit_to_draft.values():
+            draft.pick_scheduler.handle_malshab_chosen(draft, malshab_id, unit, self._get_perspective_course(draft, unit, course))
+
+        # Look the Malshab up once, and remove it once from every prioritization, however many units share it
+        row = self.template_draft.malshab_table.get_row(malshab_id)
+        if row is not None:
+            for prioritization in self.prioritizations:
+                head_position = prioritization.head_position
+                removed_position = prioritization.handle_row_chosen(row)
+                if removed_position is not None:
+                    step.prioritization_removals.append((prioritization, removed_position, head_position))
+            for draft in self.unit_to_draft.values():
+                draft.quota_tracker.commit(row, unit, self._get_perspective_course(draft, unit, course))
+            step.quota_row = row
+
+        draft_result = DraftResult(malshab_id=malshab_id, unit=unit, course=course, pick=self.current_draft_pick)
+        self.draft_results.append(draft_result)
+        step.draft_result = draft_result
+
+        if course != Course.EXTERNAL:
+            index = picking_draft.remaining_internal_picks_order.index(course)
+            picking_draft.remaining_internal_picks_order.pop(index)
+            step.unit_to_removed_internal_picks[unit].append((index, course))
+            picking_draft.current_internal_pick += 1
+
+        self._complete_step(step)
+
+    def skip_current_pick(self):
+        """
+        Skip the current draft pick, without assigning any Malshab.
+        """
+        skipped_unit = self.general_picking_order[self.current_draft_pick]
+        print(f'Pick no. {self.current_draft_pick + 1} of unit {skipped_unit.name} was skipped.')
+        self._complete_step(self._start_step(skipped_unit))
+
+    def undo(self):
+        """
+        Undo the last pick (or skip) in every perspective.
+        """
+        if not self.steps:
+            raise ValueError('There are no picks to undo.')
+
+        step = self.steps.pop()
+        draft_result = step.draft_result
+        if draft_result is not None:
+            self.draft_results.pop()
+            for prioritization, position, head_position in reversed(step.prioritization_removals):
+                prioritization.restore_malshab(position, head_position)
+        for unit, draft in self.unit_to_draft.items():
+            # Changes made while suggesting the current pick are reverted too
+            draft._revert_removed_internal_picks(draft.history.pending_removed_internal_picks)
+            draft.history.pending_removed_internal_picks = []
+            if draft_result is not None:
+                if step.quota_row is not None:
+                    draft.quota_tracker.uncommit(
+                        step.quota_row, draft_result.unit, self._get_perspective_course(draft, draft_result.unit, draft_result.course),
+                    )
+                if draft_result.unit == unit and draft_result.course != Course.EXTERNAL:
+                    draft.current_internal_pick -= 1
+            draft._revert_removed_internal_picks(step.unit_to_removed_internal_picks[unit])
+            draft.current_draft_pick = step.draft_pick
+            draft.is_active = True
+
+            # The plans for the next picks were made for a state that no longer exists
+            draft.pick_scheduler = draft.pick_scheduler.fork()
+            draft.pick_scheduler.is_quiet = True
+            draft.quota_tracker.clear_reservations()
+
+        self.current_draft_pick = step.draft_pick
+        self.unit_to_recommendation = {}
+        print(f'Undid pick no. {self.current_draft_pick + 1} of unit {step.unit.name}.')
+
+    def _print_recommendations(self):
+        for unit, (suggestion, course) in self.get_recommendations().items():
+            if suggestion is None:
+                print(f'-- {unit.name}: no more picks')
+            else:
+                print(f'-- {unit.name}: {suggestion.id} for course {course.name}')
+
+    def _get_pick(self, unit: Unit) -> tuple[str, Course] | str | None:
+        """
+        Get the pick of the current unit from the draft coordinator.
+        Returns:
+            tuple[str, Course] | str | None: The chosen Malshab ID and its course, an undo command, or None if the pick is skipped.
+        """
+        draft = self.template_draft
+        while True:
+            chosen_malshab_id = draft._get_input(
+                f'Enter {unit.name} the chosen Malshab ID (or "{SKIP_COMMAND}" / "{UNDO_COMMAND}"): '
+            ).strip()
+            if chosen_malshab_id.lower() == SKIP_COMMAND:
+                return None
+            if chosen_malshab_id.lower() == UNDO_COMMAND:
+                return UNDO_COMMAND
+            if not draft.eligibility_index.can_pick(unit, chosen_malshab_id):
+                print(f'Malshab ID {chosen_malshab_id} is not allowed for unit {unit.name}. Let them choose again.')
+                continue
+            if unit not in self.unit_to_draft:
+                return chosen_malshab_id, Course.EXTERNAL
+
+            # The recommended course is taken for the recommended Malshab, otherwise it is asked for
+            suggestion, course = self.get_recommendation(unit)
+            if suggestion is not None and suggestion.id == chosen_malshab_id:
+                return chosen_malshab_id, course
+            try:
+                course = Course(draft._get_input(
+                    f'Enter the course for the chosen Malshab ID ({" / ".join([course.name for course in Course])}): '
+                ).strip())
+            except ValueError as e:
+                print(f'Error: {e}')
+                continue
+            return chosen_malshab_id, course
+
+    def act(self):
+        """
+        Show the recommendations of every unit, and record the current pick.
+        """
+        unit = self.general_picking_order[self.current_draft_pick]
+        print(f'Pick no. {self.current_draft_pick + 1} for unit {unit.name}')
+        self._print_recommendations()
+
+        pick = self._get_pick(unit)
+        try:
+            if pick is None:
+                self.skip_current_pick()
+            elif pick == UNDO_COMMAND:
+                self.undo()
+            else:
+                self.handle_chosen_malshab(*pick, unit=unit)
+        except ValueError as e:
+            print(f'Error: {e}')
+
+    def run(self, unit_to_config: dict[Unit, DraftConfig]):
+        """
+        Run the draft process for the draft coordinator, with live recommendations for every unit.
+        Args:
+            unit_to_config (dict[Unit, DraftConfig]): The config of every unit in the league.
+        """
+        try:
+            self.setup(unit_to_config)
+        except Exception as e:
+            print(f'Error during draft setup: {e}')
+            return
+
+        while self.is_active:
+            self.act()
+        print('No more picks in the general picking order. Ending draft.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a draft with live recommendations for every unit.')
+    parser.add_argument(
+        'configs', nargs='+', metavar='UNIT=CONFIG',
+        help='The draft config JSON file of every unit in the league, e.g. 7190=tishim.json.',
+    )
+    parser.add_argument('--scheduler', choices=sorted(PICK_SCHEDULERS), default=GreedySlotScheduler.name, help='The strategy of the suggestions.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    unit_to_config = {}
+    for raw_config in args.configs:
+        unit, separator, config_path = raw_config.partition('=')
+        if not separator:
+            parser.error(f'Expected UNIT=CONFIG, got {raw_config!r}.')
+        unit_to_config[Unit(unit)] = DraftConfig.load_from_json(config_path)
+    LeagueDraft(PICK_SCHEDULERS[args.scheduler]()).run(unit_to_config)
+
+
+if __name__ == '__main__':
+    main()
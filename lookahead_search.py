@@ -0,0 +1,388 @@
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from clutch_libs.miluim.consts import Course, QuotaAttribute, Unit
+from clutch_libs.miluim.eligibility_index import EligibilityIndex
+
+
+class UniformOpponentModel:
+    """
+    The chance another unit picks a given Malshab: uniform over the part of its list that is still available.
+    """
+
+    def get_pick_probability(self, draft, unit: Unit, malshab_id: str, remaining_list_size: int) -> float:
+        """
+        Get the probability that the unit picks the Malshab in its next pick.
+        Args:
+            draft (Draft): The draft.
+            unit (Unit): The picking unit, which has the Malshab on its list.
+            malshab_id (str): The ID of the Malshab.
+            remaining_list_size (int): The number of Malshabs still available on the unit's list.
+        Returns:
+            float: The probability of the pick.
+        """
+        return 1 / remaining_list_size if remaining_list_size > 0 else 0.0
+
+
+class LookaheadCandidate:
+    """
+    A Malshab my unit may pick for a course in the next picks, with everything the search needs to know about it.
+    """
+
+    def __init__(
+        self,
+        malshab_id: str,
+        course: Course,
+        value: float,
+        attributes: tuple[QuotaAttribute, ...],
+        survival_probabilities: tuple[float, ...],
+    ):
+        """
+        Initialize the LookaheadCandidate object.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+            course (Course): The course the Malshab would be picked for.
+            value (float): The value of getting the Malshab for the course, by its rank in the course's prioritization.
+            attributes (tuple[QuotaAttribute, ...]): The attributes of the Malshab that count towards quotas.
+            survival_probabilities (tuple[float, ...]): The probability the Malshab can still be picked by us
+                in each of our next picks (0 where it can't be picked at all, e.g. schakim after their last pick).
+        """
+        self.malshab_id = malshab_id
+        self.course = course
+        self.value = value
+        self.attributes = attributes
+        self.survival_probabilities = survival_probabilities
+
+
+class LookaheadProblem:
+    """
+    The search over our next picks, reduced to plain numbers, so it can be sent to other processes without the draft.
+    """
+
+    def __init__(
+        self,
+        candidates: list[LookaheadCandidate],
+        course_to_slots: dict[Course, int],
+        unit_capacity: dict[QuotaAttribute, int],
+        course_to_capacity: dict[Course, dict[QuotaAttribute, int]],
+        depth: int,
+        beam_width: int,
+    ):
+        """
+        Initialize the LookaheadProblem object.
+        Args:
+            candidates (list[LookaheadCandidate]): The candidates of all the courses.
+            course_to_slots (dict[Course, int]): The number of our next picks each course gets, by the internal picking order.
+            unit_capacity (dict[QuotaAttribute, int]): How many more Malshabs of each limited attribute my unit can get.
+            course_to_capacity (dict[Course, dict[QuotaAttribute, int]]): The same, for each course with limits.
+            depth (int): The number of our picks searched.
+            beam_width (int): The number of partial plans kept in every step.
+        """
+        self.candidates = candidates
+        self.course_to_slots = course_to_slots
+        self.unit_capacity = unit_capacity
+        self.course_to_capacity = course_to_capacity
+        self.depth = depth
+        self.beam_width = beam_width
+
+
+class LookaheadRecommendation:
+    """
+    A candidate for the current pick, with the best plan for our next picks that starts with it.
+    """
+
+    def __init__(self, malshab_id: str, course: Course, expected_value: float, plan: list[tuple[str, Course]]):
+        """
+        Initialize the LookaheadRecommendation object.
+        Args:
+            malshab_id (str): The ID of the recommended Malshab.
+            course (Course): The course to pick the Malshab for.
+            expected_value (float): The expected value of the plan, counting each pick by the chance it is still available.
+            plan (list[tuple[str, Course]]): The Malshab and course of each of our next picks, starting with this one.
+        """
+        self.malshab_id = malshab_id
+        self.course = course
+        self.expected_value = expected_value
+        self.plan = plan
+
+
+def _fits_plan(problem: LookaheadProblem, plan: tuple[int, ...], candidate: LookaheadCandidate) -> bool:
+    """
+    Check if the candidate fits the course slots and the quotas, together with the picks of the plan.
+    """
+    candidates = problem.candidates
+    same_course_count = sum(candidates[index].course == candidate.course for index in plan)
+    if same_course_count >= problem.course_to_slots.get(candidate.course, 0):
+        return False
+
+    course_capacity = problem.course_to_capacity.get(candidate.course)
+    for attribute in candidate.attributes:
+        unit_capacity = problem.unit_capacity.get(attribute)
+        attribute_course_capacity = course_capacity.get(attribute) if course_capacity is not None else None
+        if unit_capacity is None and attribute_course_capacity is None:
+            continue
+        unit_count = course_count = 1
+        for index in plan:
+            if attribute in candidates[index].attributes:
+                unit_count += 1
+                course_count += candidates[index].course == candidate.course
+        if unit_capacity is not None and unit_count > unit_capacity:
+            return False
+        if attribute_course_capacity is not None and course_count > attribute_course_capacity:
+            return False
+    return True
+
+
+def search_branch(problem: LookaheadProblem, root_index: int, deadline: float) -> tuple[int, float, tuple[int, ...]]:
+    """
+    Beam search for the best plan of our next picks that starts with the given candidate.
+    Plans that picked the same Malshabs for the same courses in a different order lead to the same future,
+    so a transposition table keeps only the best of them.
+    The deadline is checked before extending every plan, so a branch stops soon after it passes,
+    even in a worker process, returning the best plan of the last step it completed.
+    Args:
+        problem (LookaheadProblem): The search problem.
+        root_index (int): The index of the candidate picked in the current pick.
+        deadline (float): The time (as in time.time) to stop searching at.
+    Returns:
+        tuple[int, float, tuple[int, ...]]: The number of our picks searched, the expected value of the best plan,
+            and the indexes of its candidates.
+    """
+    candidates = problem.candidates
+    root = candidates[root_index]
+    beam: list[tuple[float, tuple[int, ...]]] = [(root.value * root.survival_probabilities[0], (root_index,))]
+    searched_depth = 1
+    for step in range(1, problem.depth):
+        transposition_table: dict[frozenset, tuple[float, tuple[int, ...]]] = {}
+        is_timed_out = False
+        for expected_value, plan in beam:
+            if time.time() > deadline:
+                is_timed_out = True
+                break
+            is_extended = False
+            for index, candidate in enumerate(candidates):
+                survival_probability = candidate.survival_probabilities[step]
+                if survival_probability == 0 \
+                        or any(candidates[planned].malshab_id == candidate.malshab_id for planned in plan) \
+                        or not _fits_plan(problem, plan, candidate):
+                    continue
+                is_extended = True
+                extended_plan = plan + (index,)
+                extended_value = expected_value + candidate.value * survival_probability
+                key = frozenset((candidates[planned].malshab_id, candidates[planned].course) for planned in extended_plan)
+                best = transposition_table.get(key)
+                if best is None or best[0] < extended_value:
+                    transposition_table[key] = (extended_value, extended_plan)
+            # A plan that can't be extended keeps its value, with fewer picks
+            if not is_extended:
+                key = frozenset((candidates[planned].malshab_id, candidates[planned].course) for planned in plan)
+                transposition_table.setdefault(key, (expected_value, plan))
+        # A step cut short doesn't cover all the plans, keep the beam of the last complete step
+        if is_timed_out:
+            break
+        beam = heapq.nlargest(problem.beam_width, transposition_table.values(), key=lambda entry: entry[0])
+        searched_depth = step + 1
+    expected_value, plan = max(beam, key=lambda entry: entry[0])
+    return searched_depth, expected_value, plan
+
+
+class LookaheadSearch:
+    """
+    Look ahead over my unit's next picks, to see how each candidate for the current pick would play out.
+    Other units are modeled by the general picking order and their eligibility lists: every pick of another unit
+    takes each available Malshab on its list with the probability given by the opponent model,
+    so every candidate has a chance to still be available in each of our next picks.
+    A plan is valued by the sum of its picks' values, each weighted by the chance it is still available,
+    and every candidate for the current pick gets a beam search for its best plan.
+    The branches run in a process pool (when more than one worker is used), within a time budget.
+    Plans searched to different depths are not comparable (a deeper plan adds the values of more picks),
+    so when the time budget cuts some branches short, only the branches searched deepest are ranked.
+    """
+
+    def __init__(
+        self,
+        depth: int = 3,
+        beam_width: int = 16,
+        candidates_per_course: int = 6,
+        workers_count: int = 1,
+        time_budget_seconds: float = 1.0,
+        opponent_model: UniformOpponentModel = None,
+    ):
+        """
+        Initialize the LookaheadSearch object.
+        Args:
+            depth (int): The number of our next picks to plan.
+            beam_width (int): The number of partial plans kept in every step of a branch.
+            candidates_per_course (int): The number of top remaining Malshabs considered for each course.
+            workers_count (int): The number of worker processes, the search runs in this process if 1.
+            time_budget_seconds (float): The time to search for, branches that didn't search as deep as others in time are left out.
+            opponent_model (UniformOpponentModel): The model of other units' picks, uniform if not given.
+        """
+        self.depth: int = depth
+        self.beam_width: int = beam_width
+        self.candidates_per_course: int = candidates_per_course
+        self.workers_count: int = workers_count
+        self.time_budget_seconds: float = time_budget_seconds
+        self.opponent_model: UniformOpponentModel = opponent_model if opponent_model is not None else UniformOpponentModel()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def close(self):
+        """
+        Shut down the worker processes, if any were started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _get_survival_probabilities(self, draft, malshab_id: str, step_to_opponent_picks: list[list[tuple[Unit, int]]]) -> tuple[float, ...]:
+        """
+        Get the chance the Malshab is still available in each of our next picks.
+        Args:
+            draft (Draft): The draft.
+            malshab_id (str): The ID of the Malshab.
+            step_to_opponent_picks (list[list[tuple[Unit, int]]]): The picks of other units before each of our next picks,
+                with the size of the picking unit's available list at the time.
+        """
+        malshab_mask = draft.eligibility_index.get_mask(malshab_id)
+        survival_probability = 1.0
+        survival_probabilities = []
+        for opponent_picks in step_to_opponent_picks:
+            for unit, remaining_list_size in opponent_picks:
+                if malshab_mask & EligibilityIndex.UNIT_TO_BIT[unit]:
+                    survival_probability *= 1 - self.opponent_model.get_pick_probability(draft, unit, malshab_id, remaining_list_size)
+            survival_probabilities.append(survival_probability)
+        return tuple(survival_probabilities)
+
+    def build_problem(self, draft) -> LookaheadProblem | None:
+        """
+        Reduce the search from the draft's current pick to a LookaheadProblem.
+        Args:
+            draft (Draft): The draft, at a pick of my unit.
+        Returns:
+            LookaheadProblem | None: The problem, or None if there is nothing left to pick.
+        """
+        contested_pick_index = draft.contested_pick_index
+        my_unit_picks_count = contested_pick_index.count_my_unit_picks(draft.current_draft_pick, contested_pick_index.total_picks)
+        depth = min(self.depth, my_unit_picks_count, len(draft.remaining_internal_picks_order))
+        if depth == 0:
+            return None
+        my_unit_picks = [contested_pick_index.get_my_unit_pick(step, draft.current_draft_pick) for step in range(depth)]
+
+        # Our next picks go to the next courses of the internal picking order, in any order
+        course_to_slots: dict[Course, int] = {}
+        for course in draft.remaining_internal_picks_order[:depth]:
+            course_to_slots[course] = course_to_slots.get(course, 0) + 1
+
+        # Every unit picks from its own list, so its available part shrinks by its picks so far
+        unit_to_remaining_list_size = {unit: len(malshab_ids) for unit, malshab_ids in draft.unit_to_malshab_ids.items()}
+        for draft_result in draft.draft_results:
+            if draft_result.unit in unit_to_remaining_list_size:
+                unit_to_remaining_list_size[draft_result.unit] -= 1
+        step_to_opponent_picks: list[list[tuple[Unit, int]]] = []
+        pick_index = draft.current_draft_pick
+        for my_unit_pick in my_unit_picks:
+            opponent_picks = []
+            for unit in draft.general_picking_order[pick_index:my_unit_pick]:
+                if unit != draft.my_unit and unit in unit_to_remaining_list_size:
+                    opponent_picks.append((unit, unit_to_remaining_list_size[unit]))
+                    unit_to_remaining_list_size[unit] -= 1
+            step_to_opponent_picks.append(opponent_picks)
+            pick_index = my_unit_pick
+
+        quota_tracker = draft.quota_tracker.fork(with_picked_counts=True)
+        candidates: list[LookaheadCandidate] = []
+        for course in course_to_slots:
+            course_candidates_count = 0
+            # The rank counts every remaining Malshab, including the ones that can't be picked
+            for rank, malshab in enumerate(draft.course_to_prioritization[course].iter_remaining_malshabs()):
+                if course_candidates_count >= self.candidates_per_course:
+                    break
+                if not quota_tracker.can_add(malshab.row, draft.my_unit, course) \
+                        or (malshab.is_schakim and not quota_tracker.can_pick_schakim_at(my_unit_picks[0])):
+                    continue
+                survival_probabilities = self._get_survival_probabilities(draft, malshab.id, step_to_opponent_picks)
+                if malshab.is_schakim:
+                    survival_probabilities = tuple(
+                        survival_probability if quota_tracker.can_pick_schakim_at(my_unit_pick) else 0.0
+                        for survival_probability, my_unit_pick in zip(survival_probabilities, my_unit_picks)
+                    )
+                course_candidates_count += 1
+                candidates.append(LookaheadCandidate(
+                    malshab_id=malshab.id,
+                    course=course,
+                    value=1 / (1 + rank),
+                    attributes=quota_tracker.get_malshab_attributes(malshab.row),
+                    survival_probabilities=survival_probabilities,
+                ))
+        if not candidates:
+            return None
+
+        def get_capacity(limits: dict[QuotaAttribute, int], picked_counts: dict[QuotaAttribute, int]) -> dict[QuotaAttribute, int]:
+            return {attribute: limit - picked_counts[attribute] for attribute, limit in limits.items()}
+
+        return LookaheadProblem(
+            candidates=candidates,
+            course_to_slots=course_to_slots,
+            unit_capacity=get_capacity(
+                quota_tracker.unit_to_limits.get(draft.my_unit, {}), quota_tracker.unit_to_picked_counts.get(draft.my_unit, {}),
+            ),
+            course_to_capacity={
+                course: get_capacity(limits, quota_tracker.course_to_picked_counts[course])
+                for course, limits in quota_tracker.course_to_limits.items()
+            },
+            depth=depth,
+            beam_width=self.beam_width,
+        )
+
+    def search(self, draft) -> list[LookaheadRecommendation]:
+        """
+        Search my unit's next picks from the draft's current pick.
+        Args:
+            draft (Draft): The draft, at a pick of my unit.
+        Returns:
+            list[LookaheadRecommendation]: The candidates for the current pick, by descending expected value.
+                Candidates whose branch didn't start, or didn't search as deep as the others, within the time budget are left out.
+        """
+        problem = self.build_problem(draft)
+        if problem is None:
+            return []
+        deadline = time.time() + self.time_budget_seconds
+        root_indexes = [
+            index for index, candidate in enumerate(problem.candidates) if candidate.survival_probabilities[0] > 0
+        ]
+
+        results: list[tuple[int, float, tuple[int, ...]]] = []
+        if self.workers_count <= 1:
+            for root_index in root_indexes:
+                if time.time() > deadline:
+                    break
+                results.append(search_branch(problem, root_index, deadline))
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers_count)
+            futures = {self._executor.submit(search_branch, problem, root_index, deadline) for root_index in root_indexes}
+            while futures:
+                done, futures = wait(futures, timeout=max(deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                results += [future.result() for future in done]
+            # Only the branches that didn't start yet can be cancelled, the running ones stop at the deadline by themselves
+            for future in futures:
+                future.cancel()
+
+        if results:
+            searched_depth = max(result[0] for result in results)
+            results = [result for result in results if result[0] == searched_depth]
+        # Ties are broken by the order of the candidates (by course, then by priority), whatever order the branches finished in
+        results.sort(key=lambda result: (-result[1], result[2][0]))
+        candidates = problem.candidates
+        return [
+            LookaheadRecommendation(
+                malshab_id=candidates[plan[0]].malshab_id,
+                course=candidates[plan[0]].course,
+                expected_value=expected_value,
+                plan=[(candidates[index].malshab_id, candidates[index].course) for index in plan],
+            )
+            for _, expected_value, plan in results
+        ]
@@ -4,8 +4,12 @@ from clutch_libs.miluim.consts import MINIMAL_COMBAT_MEDICAL_PROFILE, Gender
 class Malshab:
     """
     Class to represent a Malsahab
+    A Malshab created directly holds its own details. The Malshabs of a draft are stored in a MalshabTable,
+    which hands out MalshabRow views over its rows instead, with the same attributes.
     """
 
+    __slots__ = ('id', 'first_name', 'last_name', 'gender', 'medical_profile', 'psych_score', 'is_schakim')
+
     def __init__(
         self,
         id_number: str,
@@ -24,6 +28,23 @@ class Malshab:
         self.psych_score = psych_score
         self.is_schakim = is_schakim
 
+    @classmethod
+    def from_table_row(cls, table, row: int) -> 'MalshabRow':
+        """
+        Create a view of a row in a MalshabTable, without copying its data.
+        Args:
+            table (MalshabTable): The table holding the Malshab.
+            row (int): The row of the Malshab in the table.
+        Returns:
+            MalshabRow: The Malshab view.
+        """
+        return MalshabRow(table, row)
+
+    @property
+    def row(self) -> int | None:
+        # A Malshab created directly is not in any table
+        return None
+
 
     def is_combat(self) -> bool:
         """
@@ -31,4 +52,58 @@ class Malshab:
         Females are not considered combat soldiers
         Minimal medical profile needs to be met
         """
-        return self.gender.value is not Gender.FEMALE.value and self.medical_profile >= MINIMAL_COMBAT_MEDICAL_PROFILE
+        return self.gender != Gender.FEMALE and self.medical_profile >= MINIMAL_COMBAT_MEDICAL_PROFILE
+
+
+class MalshabRow(Malshab):
+    """
+    A lightweight view over a single row of a MalshabTable, read-only.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row: int):
+        """
+        Initialize the MalshabRow object.
+        Args:
+            table (MalshabTable): The table holding the Malshab.
+            row (int): The row of the Malshab in the table.
+        """
+        self._table = table
+        self._row = row
+
+    @property
+    def id(self) -> str:
+        return self._table.ids[self._row]
+
+    @property
+    def first_name(self) -> str:
+        return self._table.first_names[self._row]
+
+    @property
+    def last_name(self) -> str:
+        return self._table.last_names[self._row]
+
+    @property
+    def gender(self) -> Gender:
+        return self._table.get_gender(self._row)
+
+    @property
+    def medical_profile(self) -> int:
+        return self._table.medical_profiles[self._row]
+
+    @property
+    def psych_score(self) -> int:
+        return self._table.psych_scores[self._row]
+
+    @property
+    def is_schakim(self) -> bool:
+        return bool(self._table.is_schakim_flags[self._row])
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+
+    def is_combat(self) -> bool:
+        return bool(self._table.is_combat_flags[self._row])
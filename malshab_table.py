@@ -0,0 +1,145 @@
+from array import array
+from functools import cached_property
+from itertools import compress
+
+from clutch_libs.miluim.consts import MINIMAL_COMBAT_MEDICAL_PROFILE, Gender
+from clutch_libs.miluim.malshab import Malshab, MalshabRow
+
+# Genders are stored as small ints, by their position in the Gender enum
+GENDER_TO_CODE: dict[Gender, int] = {gender: code for code, gender in enumerate(Gender)}
+CODE_TO_GENDER: list[Gender] = list(Gender)
+
+
+class MalshabTable:
+    """
+    A shared, deduplicated table of all the Malshabs in the draft.
+    Every Malshab is stored once, as a row in a set of columns (struct of arrays),
+    so the course prioritizations only hold row numbers, and attribute queries run over whole columns at once.
+    Malshab objects handed out by the table are lightweight views over a row (MalshabRow).
+    The columns may also be read-only views over a memory-mapped draft image (see draft_image),
+    in which case the table cannot grow, and the ID index is only built when first used.
+    """
+
+    def __init__(self):
+        """
+        Initialize the MalshabTable object.
+        """
+        self.ids: list[str] = []
+        self.first_names: list[str] = []
+        self.last_names: list[str] = []
+        self.genders: array = array('B')
+        self.medical_profiles: array = array('i')
+        self.psych_scores: array = array('i')
+        self.is_schakim_flags: bytearray = bytearray()
+        # Derived column, kept so combat queries don't need to recompute the rule per row
+        self.is_combat_flags: bytearray = bytearray()
+
+    @cached_property
+    def malshab_id_to_row(self) -> dict[str, int]:
+        # Built on first use, so a table mapped from an image is usable before its IDs are indexed
+        return {malshab_id: row for row, malshab_id in enumerate(self.ids)}
+
+    def add_malshab(
+        self,
+        id_number: str,
+        first_name: str,
+        last_name: str,
+        gender: Gender,
+        medical_profile: int,
+        psych_score: int,
+        is_schakim: bool,
+    ) -> int:
+        """
+        Add a Malshab to the table, unless a Malshab with the same ID is already in it.
+        Returns:
+            int: The row of the Malshab in the table.
+        """
+        row = self.malshab_id_to_row.get(id_number)
+        if row is not None:
+            return row
+
+        row = len(self.ids)
+        self.ids.append(id_number)
+        self.first_names.append(first_name)
+        self.last_names.append(last_name)
+        self.genders.append(GENDER_TO_CODE[Gender(gender)])
+        self.medical_profiles.append(medical_profile)
+        self.psych_scores.append(psych_score)
+        self.is_schakim_flags.append(bool(is_schakim))
+        self.is_combat_flags.append(
+            gender != Gender.FEMALE and medical_profile >= MINIMAL_COMBAT_MEDICAL_PROFILE
+        )
+        self.malshab_id_to_row[id_number] = row
+        return row
+
+    def get_row(self, malshab_id: str) -> int | None:
+        """
+        Get the row of the Malshab with the given ID.
+        Args:
+            malshab_id (str): The ID of the Malshab.
+        Returns:
+            int | None: The row, or None if the Malshab is not in the table.
+        """
+        return self.malshab_id_to_row.get(malshab_id)
+
+    def get_malshab(self, row: int) -> Malshab:
+        """
+        Get a view of the Malshab in the given row.
+        Args:
+            row (int): The row in the table.
+        Returns:
+            Malshab: The Malshab.
+        """
+        return MalshabRow(self, row)
+
+    def get_gender(self, row: int) -> Gender:
+        return CODE_TO_GENDER[self.genders[row]]
+
+    def get_combat_rows(self) -> list[int]:
+        """
+        Get all the rows of combat eligible Malshabs.
+        """
+        return list(compress(range(len(self.ids)), self.is_combat_flags))
+
+    def get_schakim_rows(self) -> list[int]:
+        """
+        Get all the rows of Malshabs that are schakim.
+        """
+        return list(compress(range(len(self.ids)), self.is_schakim_flags))
+
+    def get_rows_with_gender(self, gender: Gender) -> list[int]:
+        """
+        Get all the rows of Malshabs with the given gender.
+        """
+        return list(compress(range(len(self.ids)), map(GENDER_TO_CODE[gender].__eq__, self.genders)))
+
+    def get_rows_with_min_psych_score(self, min_psych_score: int) -> list[int]:
+        """
+        Get all the rows of Malshabs with a psych score of at least the given score.
+        """
+        # Compares the whole column at once, as min_psych_score <= psych_score
+        return list(compress(range(len(self.ids)), map(min_psych_score.__le__, self.psych_scores)))
+
+    def get_rows(self, malshab_ids: list[str]) -> list[int]:
+        """
+        Get the rows of the given Malshab IDs, ignoring IDs that are not in the table.
+        """
+        malshab_id_to_row = self.malshab_id_to_row
+        return [row for row in map(malshab_id_to_row.get, malshab_ids) if row is not None]
+
+    def count_combat(self, malshab_ids: list[str]) -> int:
+        """
+        Count the combat eligible Malshabs among the given IDs.
+        """
+        is_combat_flags = self.is_combat_flags
+        return sum(is_combat_flags[row] for row in self.get_rows(malshab_ids))
+
+    def count_schakim(self, malshab_ids: list[str]) -> int:
+        """
+        Count the schakim among the given IDs.
+        """
+        is_schakim_flags = self.is_schakim_flags
+        return sum(is_schakim_flags[row] for row in self.get_rows(malshab_ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,432 @@
+import argparse
+import json
+import math
+from array import array
+from typing import Iterable
+
+from clutch_libs.miluim.consts import Gender, Unit
+from clutch_libs.miluim.draft_journal import DraftJournal
+from clutch_libs.miluim.lookahead_search import UniformOpponentModel
+from clutch_libs.miluim.malshab_table import GENDER_TO_CODE, MalshabTable
+
+# The features a unit's choice is modeled by, in the order of the weights.
+# Malshabs on other units' lists that aren't in our table have no details, and are only marked as unknown.
+FEATURE_NAMES = ('is_female', 'medical_profile', 'psych_score', 'is_schakim', 'is_combat', 'is_unknown')
+UNKNOWN_FEATURES = (0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+FEMALE_CODE = GENDER_TO_CODE[Gender.FEMALE]
+
+
+def _get_features(table: MalshabTable, row: int | None) -> tuple[float, ...]:
+    if row is None:
+        return UNKNOWN_FEATURES
+    return (
+        float(table.genders[row] == FEMALE_CODE),
+        table.medical_profiles[row] / 100,
+        table.psych_scores[row] / 100,
+        float(table.is_schakim_flags[row]),
+        float(table.is_combat_flags[row]),
+        0.0,
+    )
+
+
+def _solve(matrix: list[list[float]], vector: list[float]) -> list[float]:
+    """
+    Solve the linear system matrix * x = vector, by Gaussian elimination with partial pivoting.
+    """
+    size = len(vector)
+    rows = [matrix[index][:] + [vector[index]] for index in range(size)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda index: abs(rows[index][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for index in range(column + 1, size):
+            factor = rows[index][column] / rows[column][column]
+            for other_column in range(column, size + 1):
+                rows[index][other_column] -= factor * rows[column][other_column]
+    solution = [0.0] * size
+    for column in reversed(range(size)):
+        solution[column] = (
+            rows[column][size] - sum(rows[column][index] * solution[index] for index in range(column + 1, size))
+        ) / rows[column][column]
+    return solution
+
+
+class _UnitChoiceStatistics:
+    """
+    The sums over a unit's available Malshabs, weighted by the current model, that its choices are scored against.
+    """
+
+    def __init__(self, features_count: int):
+        self.weight_sum: float = 0.0
+        self.feature_sums: list[float] = [0.0] * features_count
+        self.product_sums: list[list[float]] = [[0.0] * features_count for _ in range(features_count)]
+
+    def update(self, weight: float, features: tuple[float, ...], sign: float = 1.0):
+        self.weight_sum += sign * weight
+        weight *= sign
+        for index, feature in enumerate(features):
+            if feature:
+                self.feature_sums[index] += weight * feature
+                product_row = self.product_sums[index]
+                for other_index, other_feature in enumerate(features):
+                    product_row[other_index] += weight * feature * other_feature
+
+
+class _UnitFit:
+    """
+    The log likelihood of a unit's choices under the current model, with its gradient and (negated) Hessian.
+    """
+
+    def __init__(self, features_count: int):
+        self.choices_count: int = 0
+        self.log_likelihood: float = 0.0
+        self.uniform_log_likelihood: float = 0.0
+        self.gradient: list[float] = [0.0] * features_count
+        self.hessian: list[list[float]] = [[0.0] * features_count for _ in range(features_count)]
+
+    def add_choice(self, score: float, features: tuple[float, ...], statistics: _UnitChoiceStatistics, available_count: int):
+        weight_sum = statistics.weight_sum
+        means = [feature_sum / weight_sum for feature_sum in statistics.feature_sums]
+        self.choices_count += 1
+        self.log_likelihood += score - math.log(weight_sum)
+        self.uniform_log_likelihood -= math.log(available_count)
+        for index, feature in enumerate(features):
+            self.gradient[index] += feature - means[index]
+            hessian_row = self.hessian[index]
+            product_row = statistics.product_sums[index]
+            for other_index, other_mean in enumerate(means):
+                hessian_row[other_index] += product_row[other_index] / weight_sum - means[index] * other_mean
+
+
+class PickProbabilityModel(UniformOpponentModel):
+    """
+    The chance another unit picks a given Malshab, learned from the results of past drafts.
+    Each unit's pick is modeled as a choice among the Malshabs still available on its list (a conditional logit):
+    a Malshab is chosen with probability proportional to exp(weights * features), so the chance it is taken
+    at a given pick depends on its details and on what else is left on the unit's list by then.
+    A unit without weights (e.g. with no past picks) picks uniformly, like the UniformOpponentModel.
+    """
+
+    def __init__(self, unit_to_weights: dict[Unit, list[float]] = None):
+        """
+        Initialize the PickProbabilityModel object.
+        Args:
+            unit_to_weights (dict[Unit, list[float]]): The weight of every feature (by FEATURE_NAMES) for each unit.
+        """
+        self.unit_to_weights: dict[Unit, list[float]] = unit_to_weights if unit_to_weights is not None else {}
+        # The number of choices each unit was fitted on, with their mean log likelihood by the model and by uniform picks
+        self.unit_to_fit_summary: dict[Unit, tuple[int, float, float]] = {}
+
+        # Caches, each replaced as a whole, so a draft and its speculative fork can query the model from two threads.
+        # The weight of every row of the table per unit (computed in one pass over the table's columns),
+        # keyed by the table and its size
+        self._row_weights_cache: tuple[MalshabTable | None, int, dict[Unit, array]] = (None, 0, {})
+        # The total weight and size of each unit's available list, keyed by the draft and its state
+        self._available_weight_cache: tuple[object, tuple[int, int] | None, dict[Unit, tuple[float, int]]] = (None, None, {})
+
+    def _get_weights(self, unit: Unit) -> list[float]:
+        return self.unit_to_weights.get(unit, [0.0] * len(FEATURE_NAMES))
+
+    def _get_row_weights(self, table: MalshabTable, unit: Unit) -> array:
+        cached_table, cached_table_size, unit_to_row_weights = self._row_weights_cache
+        if table is not cached_table or len(table.ids) != cached_table_size:
+            unit_to_row_weights = {}
+            self._row_weights_cache = (table, len(table.ids), unit_to_row_weights)
+        row_weights = unit_to_row_weights.get(unit)
+        if row_weights is None:
+            female_weight, medical_profile_weight, psych_score_weight, schakim_weight, combat_weight, _ = self._get_weights(unit)
+            medical_profile_weight /= 100
+            psych_score_weight /= 100
+            row_weights = array('d', (
+                math.exp(
+                    female_weight * (gender_code == FEMALE_CODE) + medical_profile_weight * medical_profile
+                    + psych_score_weight * psych_score + schakim_weight * is_schakim + combat_weight * is_combat
+                )
+                for gender_code, medical_profile, psych_score, is_schakim, is_combat in zip(
+                    table.genders, table.medical_profiles, table.psych_scores, table.is_schakim_flags, table.is_combat_flags,
+                )
+            ))
+            unit_to_row_weights[unit] = row_weights
+        return row_weights
+
+    def _get_unknown_weight(self, unit: Unit) -> float:
+        return math.exp(self._get_weights(unit)[FEATURE_NAMES.index('is_unknown')])
+
+    def _get_available_weight(self, draft, unit: Unit) -> tuple[float, int]:
+        """
+        Get the total weight and the number of the Malshabs still available on the unit's list.
+        Computed once per draft pick, and shared by all the queries made in it.
+        """
+        state_key = (draft.current_draft_pick, len(draft.draft_results))
+        cached_draft, cached_state_key, unit_to_available_weight = self._available_weight_cache
+        if draft is not cached_draft or state_key != cached_state_key:
+            unit_to_available_weight = {}
+            self._available_weight_cache = (draft, state_key, unit_to_available_weight)
+        available_weight = unit_to_available_weight.get(unit)
+        if available_weight is None:
+            row_weights = self._get_row_weights(draft.malshab_table, unit)
+            unknown_weight = self._get_unknown_weight(unit)
+            get_row = draft.malshab_table.malshab_id_to_row.get
+            taken_malshab_ids = {draft_result.malshab_id for draft_result in draft.draft_results}
+            weight_sum = 0.0
+            available_count = 0
+            for malshab_id in draft.unit_to_malshab_ids.get(unit, []):
+                if malshab_id in taken_malshab_ids:
+                    continue
+                row = get_row(malshab_id)
+                weight_sum += row_weights[row] if row is not None else unknown_weight
+                available_count += 1
+            available_weight = (weight_sum, available_count)
+            unit_to_available_weight[unit] = available_weight
+        return available_weight
+
+    def get_available_count(self, draft, unit: Unit) -> int:
+        """
+        Get the number of Malshabs still available on the unit's list.
+        """
+        return self._get_available_weight(draft, unit)[1]
+
+    def get_pick_probabilities(
+        self,
+        draft,
+        unit: Unit,
+        malshab_ids: list[str],
+        remaining_list_size: int = None,
+    ) -> list[float]:
+        """
+        Get the probability that the unit picks each of the Malshabs, scoring the whole pool at once.
+        The Malshabs are expected to be available on the unit's list.
+        Args:
+            draft (Draft): The draft.
+            unit (Unit): The picking unit.
+            malshab_ids (list[str]): The IDs of the Malshabs.
+            remaining_list_size (int): The number of Malshabs that will be available on the unit's list when it picks.
+                The Malshabs available now are assumed to be representative of those left then. If not given,
+                the probabilities are for a pick made now.
+        Returns:
+            list[float]: The probability of each Malshab to be picked.
+        """
+        weight_sum, available_count = self._get_available_weight(draft, unit)
+        remaining_list_size = available_count if remaining_list_size is None else remaining_list_size
+        if remaining_list_size <= 0 or available_count == 0:
+            return [0.0] * len(malshab_ids)
+        # The available weight, scaled to the number of Malshabs left when the unit picks
+        denominator = weight_sum / available_count * remaining_list_size
+        row_weights = self._get_row_weights(draft.malshab_table, unit)
+        unknown_weight = self._get_unknown_weight(unit)
+        get_row = draft.malshab_table.malshab_id_to_row.get
+        return [
+            min(1.0, (row_weights[row] if row is not None else unknown_weight) / denominator)
+            for row in map(get_row, malshab_ids)
+        ]
+
+    def get_pick_probability(self, draft, unit: Unit, malshab_id: str, remaining_list_size: int) -> float:
+        return self.get_pick_probabilities(draft, unit, [malshab_id], remaining_list_size)[0]
+
+    def get_relative_weights(self, draft, unit: Unit, malshab_ids: list[str]) -> list[float]:
+        """
+        Get the weight of each of the Malshabs relative to the mean weight of the Malshabs available on the unit's list,
+        scoring the whole pool at once. A pick of the unit made when n Malshabs are left on its list
+        takes a Malshab with probability min(1, relative weight / n).
+        Args:
+            draft (Draft): The draft.
+            unit (Unit): The picking unit.
+            malshab_ids (list[str]): The IDs of the Malshabs.
+        Returns:
+            list[float]: The relative weight of each Malshab, 0 if nothing is left on the unit's list.
+        """
+        weight_sum, available_count = self._get_available_weight(draft, unit)
+        if available_count == 0:
+            return [0.0] * len(malshab_ids)
+        mean_weight = weight_sum / available_count
+        row_weights = self._get_row_weights(draft.malshab_table, unit)
+        unknown_weight = self._get_unknown_weight(unit)
+        get_row = draft.malshab_table.malshab_id_to_row.get
+        return [
+            (row_weights[row] if row is not None else unknown_weight) / mean_weight
+            for row in map(get_row, malshab_ids)
+        ]
+
+    @staticmethod
+    def get_survival_log_probability(relative_weight: float, available_count: int, picks_count: int) -> float:
+        """
+        Get the log of the chance that a Malshab is not taken by any of a unit's next picks.
+        The k-th of them takes it with probability relative_weight / (available_count - k),
+        so the chance it survives them all is a ratio of gamma functions, computed at once for any number of picks.
+        Args:
+            relative_weight (float): The relative weight of the Malshab, from get_relative_weights.
+            available_count (int): The number of Malshabs available on the unit's list now, from get_available_count.
+            picks_count (int): The number of the unit's next picks.
+        Returns:
+            float: The log probability, -inf if one of the picks is certain to take the Malshab.
+        """
+        # Picks made after the unit's list ran out don't take anyone
+        picks_count = min(picks_count, available_count)
+        if picks_count <= 0 or relative_weight <= 0:
+            return 0.0
+        # The last of the picks is the most likely to take it
+        if relative_weight >= available_count - picks_count + 1:
+            return -math.inf
+        return math.lgamma(available_count - relative_weight + 1) - math.lgamma(available_count - relative_weight - picks_count + 1) \
+            - math.lgamma(available_count + 1) + math.lgamma(available_count - picks_count + 1)
+
+    @staticmethod
+    def _evaluate(drafts: list, unit_to_weights: dict[Unit, list[float]]) -> dict[Unit, _UnitFit]:
+        """
+        Replay the past drafts, scoring every pick of every unit against the Malshabs available to it at the time.
+        """
+        features_count = len(FEATURE_NAMES)
+        unit_to_fit = {unit: _UnitFit(features_count) for unit in Unit}
+        for draft in drafts:
+            table = draft.malshab_table
+            malshab_id_to_features: dict[str, tuple[float, ...]] = {}
+            unit_to_statistics: dict[Unit, _UnitChoiceStatistics] = {}
+            unit_to_available_ids: dict[Unit, set[str]] = {}
+            for unit, malshab_ids in draft.unit_to_malshab_ids.items():
+                weights = unit_to_weights[unit]
+                statistics = _UnitChoiceStatistics(features_count)
+                for malshab_id in malshab_ids:
+                    features = malshab_id_to_features.get(malshab_id)
+                    if features is None:
+                        features = _get_features(table, table.get_row(malshab_id))
+                        malshab_id_to_features[malshab_id] = features
+                    statistics.update(math.exp(sum(map(float.__mul__, weights, features))), features)
+                unit_to_statistics[unit] = statistics
+                unit_to_available_ids[unit] = set(malshab_ids)
+
+            for draft_result in draft.draft_results:
+                malshab_id = draft_result.malshab_id
+                features = malshab_id_to_features.get(malshab_id)
+                available_ids = unit_to_available_ids.get(draft_result.unit)
+                if features is None or available_ids is None or malshab_id not in available_ids:
+                    # Not a choice from the unit's list (or picked twice), nothing to learn from
+                    continue
+                unit_to_fit[draft_result.unit].add_choice(
+                    sum(map(float.__mul__, unit_to_weights[draft_result.unit], features)),
+                    features,
+                    unit_to_statistics[draft_result.unit],
+                    len(available_ids),
+                )
+                # The Malshab is no longer available to any unit
+                for unit, available_ids in unit_to_available_ids.items():
+                    if malshab_id in available_ids:
+                        available_ids.remove(malshab_id)
+                        weight = math.exp(sum(map(float.__mul__, unit_to_weights[unit], features)))
+                        unit_to_statistics[unit].update(weight, features, sign=-1.0)
+        return unit_to_fit
+
+    @classmethod
+    def fit(
+        cls,
+        drafts: Iterable,
+        l2_penalty: float = 1.0,
+        max_iterations: int = 25,
+        tolerance: float = 1e-6,
+    ) -> 'PickProbabilityModel':
+        """
+        Fit the model to the picks of past drafts, by Newton's method on the penalized log likelihood.
+        Args:
+            drafts (Iterable[Draft]): Past drafts with their input data and results (e.g. resumed from their journals).
+            l2_penalty (float): The L2 penalty on the weights, keeps them finite for units with few picks.
+            max_iterations (int): The maximal number of Newton steps.
+            tolerance (float): Fitting stops once no weight changes by more than this.
+        Returns:
+            PickProbabilityModel: The fitted model.
+        """
+        drafts = list(drafts)
+        features_count = len(FEATURE_NAMES)
+        unit_to_weights = {unit: [0.0] * features_count for unit in Unit}
+        for _ in range(max_iterations):
+            unit_to_fit = cls._evaluate(drafts, unit_to_weights)
+            max_step = 0.0
+            for unit, fit in unit_to_fit.items():
+                if fit.choices_count == 0:
+                    continue
+                weights = unit_to_weights[unit]
+                gradient = [gradient - l2_penalty * weight for gradient, weight in zip(fit.gradient, weights)]
+                for index in range(features_count):
+                    fit.hessian[index][index] += l2_penalty
+                step = _solve(fit.hessian, gradient)
+                unit_to_weights[unit] = [weight + step_size for weight, step_size in zip(weights, step)]
+                max_step = max(max_step, max(map(abs, step)))
+            if max_step < tolerance:
+                break
+
+        unit_to_fit = cls._evaluate(drafts, unit_to_weights)
+        model = cls({unit: weights for unit, weights in unit_to_weights.items() if unit_to_fit[unit].choices_count})
+        model.unit_to_fit_summary = {
+            unit: (fit.choices_count, fit.log_likelihood / fit.choices_count, fit.uniform_log_likelihood / fit.choices_count)
+            for unit, fit in unit_to_fit.items() if fit.choices_count
+        }
+        return model
+
+    def save(self, path: str):
+        """
+        Save the model weights to a JSON file.
+        Args:
+            path (str): The path of the JSON file.
+        """
+        with open(path, 'w') as file:
+            json.dump({
+                'features': list(FEATURE_NAMES),
+                'units': {unit.value: weights for unit, weights in self.unit_to_weights.items()},
+            }, file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'PickProbabilityModel':
+        """
+        Load a model saved by save.
+        Args:
+            path (str): The path of the JSON file.
+        Returns:
+            PickProbabilityModel: The loaded model.
+        """
+        with open(path) as file:
+            data = json.load(file)
+        if tuple(data.get('features', ())) != FEATURE_NAMES:
+            raise ValueError(f'Model {path} was fitted on the features {data.get("features")}, expected {list(FEATURE_NAMES)}.')
+        return cls({Unit(unit): [float(weight) for weight in weights] for unit, weights in data['units'].items()})
+
+
+def load_journaled_drafts(journal_directories: list[str]) -> list:
+    """
+    Load past drafts from their journal directories, with their input data taken from their snapshots.
+    Args:
+        journal_directories (list[str]): The journal directories of the drafts.
+    Returns:
+        list[Draft]: The drafts, at the point their journals end.
+    """
+    # Imported here, since the draft uses the model
+    from clutch_libs.miluim.draft import Draft
+
+    drafts = []
+    for journal_directory in journal_directories:
+        journal = DraftJournal(journal_directory)
+        snapshot = journal.load_snapshot()
+        if snapshot is None:
+            raise ValueError(f'Journal directory {journal_directory} has no snapshot of the draft data.')
+        # The draft picks for the unit it was journaled for
+        draft = Draft(snapshot.my_unit)
+        draft.resume_from_journal(journal, snapshot)
+        drafts.append(draft)
+    return drafts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the model of other units' picks from the journals of past drafts.")
+    parser.add_argument('journals', nargs='+', help='Journal directories of past drafts.')
+    parser.add_argument('--output', required=True, help='Path to save the model JSON to.')
+    parser.add_argument('--l2-penalty', type=float, default=1.0, help='The L2 penalty on the weights.')
+    args = parser.parse_args()
+
+    model = PickProbabilityModel.fit(load_journaled_drafts(args.journals), l2_penalty=args.l2_penalty)
+    model.save(args.output)
+    for unit, (choices_count, log_likelihood, uniform_log_likelihood) in model.unit_to_fit_summary.items():
+        weights = ', '.join(f'{name} {weight:+.2f}' for name, weight in zip(FEATURE_NAMES, model.unit_to_weights[unit]))
+        print(
+            f'{unit.name}: {choices_count} picks, mean log likelihood {log_likelihood:.3f} '
+            f'(uniform {uniform_log_likelihood:.3f}), weights: {weights}'
+        )
+
+
+if __name__ == '__main__':
+    main()
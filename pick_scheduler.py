@@ -0,0 +1,392 @@
+import heapq
+import logging
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft_metrics import PickMetrics
+from clutch_libs.miluim.malshab import Malshab
+
+logger = logging.getLogger(__name__)
+
+
+class PickScheduler:
+    """
+    Base class for the strategies that decide who my unit should pick next.
+    A scheduler is attached to a single draft, and is notified of every pick, so it can keep its plan up to date.
+    """
+
+    name: str = None
+    # Quiet schedulers don't log their reasoning, for computations running in the background
+    is_quiet: bool = False
+
+    def _log(self, message: str, *args):
+        # Formatted lazily, only if the reasoning is logged
+        if not self.is_quiet:
+            logger.info(message, *args)
+
+    @staticmethod
+    def _get_pick_metrics(draft) -> PickMetrics | None:
+        # The measurements of the current suggestion, None unless the draft is instrumented
+        return draft.metrics.current_pick if draft.metrics is not None else None
+
+    def fork(self) -> 'PickScheduler':
+        """
+        Create a new scheduler with the same configuration, and no state.
+        """
+        return type(self)()
+
+    def fork_state(self) -> 'PickScheduler':
+        """
+        Create a new scheduler with the same configuration for a fork of the draft's state,
+        with a copy of the computations this scheduler cached.
+        """
+        scheduler = self.fork()
+        scheduler.adopt_cache(self)
+        return scheduler
+
+    def adopt_cache(self, scheduler: 'PickScheduler'):
+        """
+        Take a copy of the computations cached by another scheduler of the same kind, instead of this scheduler's.
+        The other scheduler must have computed them for the same point of the draft, e.g. on a fork of it.
+        Args:
+            scheduler (PickScheduler): The other scheduler.
+        """
+
+    def get_suggestion(self, draft) -> tuple[Malshab, Course]:
+        """
+        Get the suggestion for my unit's current pick.
+        Args:
+            draft (Draft): The draft.
+        Returns:
+            tuple[Malshab, Course]: The suggested Malshab and its course, (None, None) if the draft should end.
+        """
+        raise NotImplementedError()
+
+    def handle_malshab_chosen(self, draft, malshab_id: str, unit: Unit, course: Course):
+        """
+        Handle a pick, before the draft moves on to the next pick.
+        Args:
+            draft (Draft): The draft.
+            malshab_id (str): The ID of the chosen Malshab.
+            unit (Unit): The unit that chose the Malshab.
+            course (Course): The course the Malshab was chosen for.
+        """
+
+    def get_planned_malshab_ids(self) -> set[str]:
+        """
+        Get the IDs of the Malshabs the current plan relies on.
+        """
+        return set()
+
+    def get_relied_on_malshab_ids(self) -> set[str]:
+        """
+        Get the IDs of the Malshabs the last suggestion depends on, other than the suggestion itself.
+        Taking any other Malshab doesn't change the suggestion for the same pick.
+        """
+        return self.get_planned_malshab_ids()
+
+
+class GreedySlotScheduler(PickScheduler):
+    """
+    Fill the queue of my unit's next picks greedily, following the internal picking order:
+    each suggestion takes the latest free pick in which it can still be called,
+    and the first suggestion that can only be called now is picked.
+    The queue is rebuilt from scratch on every pick, and every Malshab in it is reserved in the quotas,
+    so later suggestions respect the combat, gender and schakim limits together with it.
+    """
+
+    name = 'greedy'
+
+    def __init__(self):
+        self.optimized_pick_number_to_malshab_id: dict[int, str] = {}
+
+    def get_suggestion(self, draft) -> tuple[Malshab, Course]:
+        # Start the suggestions of all courses from the top, with an empty queue
+        for prioritization in draft.course_to_prioritization.values():
+            prioritization.reset_suggestions()
+        draft.quota_tracker.clear_reservations()
+        my_unit = draft.my_unit
+        pick_metrics = self._get_pick_metrics(draft)
+
+        next_course = draft.remaining_internal_picks_order[0]
+        chosen_malshab_id = None
+        current_pick_index = 0
+        optimized_pick_number_to_malshab_id: dict[int, str] = {}
+        self.optimized_pick_number_to_malshab_id = optimized_pick_number_to_malshab_id
+        while not chosen_malshab_id:
+            # Get the next course from the internal picking order
+            self._log('-- Testing next call for course %s', next_course.name)
+
+            # Get the next suggestion for the draft pick
+            suggestion: Malshab = draft.course_to_prioritization[next_course].get_next_suggestion()
+
+            # Check if the suggestion is None (no more suggestions available)
+            if suggestion is None:
+                self._log('-- No more suggestions available for course %s. Moving to the next course.', next_course.name)
+                draft.remove_internal_pick(current_pick_index)
+                if len(draft.remaining_internal_picks_order) <= current_pick_index:
+                    self._log('-- No more picks available. Ending draft.')
+                    draft.is_active = False
+                    return None, None
+                next_course = draft.remaining_internal_picks_order[current_pick_index]
+                continue
+            if pick_metrics is not None:
+                pick_metrics.suggestions_tested += 1
+
+            # Check if the suggestion can be delayed
+            latest_pick_for_current_suggestion = draft.get_lateset_pick_for_suggestion(suggestion, next_course)
+
+            # Skip this suggestion if he cannot be picked
+            if latest_pick_for_current_suggestion is None:
+                self._log('-- Suggestion %s cannot be picked. Skipping and choosing again for same course.', suggestion.id)
+                continue
+
+            # Try to fit this pick into the optimized pick number (queue)
+            while latest_pick_for_current_suggestion > 0:
+                if latest_pick_for_current_suggestion not in optimized_pick_number_to_malshab_id:
+                    optimized_pick_number_to_malshab_id[latest_pick_for_current_suggestion] = suggestion.id
+                    draft.quota_tracker.reserve(suggestion.row, my_unit, next_course)
+                    break
+                else:
+                    latest_pick_for_current_suggestion -= 1
+
+            # If suggestion should be immidiately picked, or if the queue is overflowing
+            if latest_pick_for_current_suggestion == 0:
+                self._log('-- Suggestion %s is contested. Picking it now.', suggestion.id)
+                chosen_malshab_id = suggestion.id
+                break
+            else:
+                self._log('-- Suggestion %s is not contested, and predicted to be called in %d picks.', suggestion.id, latest_pick_for_current_suggestion)
+                self._log('--Checking next suggestion.')
+
+            current_pick_index += 1
+            if len(draft.remaining_internal_picks_order) <= current_pick_index:
+                self._log('-- No more picks available. Ending draft.')
+                draft.is_active = False
+                return None, None
+            next_course = draft.remaining_internal_picks_order[current_pick_index]
+
+        if pick_metrics is not None:
+            pick_metrics.queue_size = len(optimized_pick_number_to_malshab_id)
+        return suggestion, next_course
+
+    def get_planned_malshab_ids(self) -> set[str]:
+        return set(self.optimized_pick_number_to_malshab_id.values())
+
+
+class DeadlineScheduler(PickScheduler):
+    """
+    Treat the latest pick in which each candidate can still be called as its deadline,
+    and assign candidates to my unit's future picks (slots) to maximize the priority-weighted value.
+    Every course gets as many slots as it has left in the internal picking order, but like the greedy scheduler,
+    a contested candidate of a later course may take an earlier slot.
+    Candidates are taken by descending value, each into the latest free slot before its deadline
+    (the classic greedy for unit jobs with deadlines, using a union-find of free slots).
+    The current pick gets the candidate scheduled for it, or the earliest deadline candidate,
+    preferring the courses by the internal picking order.
+
+    The deadlines, which are the expensive part, are kept between picks, in absolute internal pick numbers:
+    they don't move as the draft advances, so a deadline is only computed again once its contested pick passes.
+    The assignment depends on the ranks of every course's candidates and on the free slots, which almost every pick
+    changes, so it is rebuilt for all the courses on every suggestion, and always matches a schedule built from scratch.
+    Scheduled candidates are reserved in the quotas, and a candidate is only scheduled if it fits them.
+    """
+
+    name = 'deadline'
+
+    def __init__(self, candidates_per_slot: int = 3):
+        """
+        Initialize the DeadlineScheduler object.
+        Args:
+            candidates_per_slot (int): The number of candidates considered per slot of a course.
+        """
+        self.candidates_per_slot: int = candidates_per_slot
+
+        # The schedule itself, by absolute internal pick number
+        self.slot_to_malshab: dict[int, Malshab] = {}
+        self.malshab_id_to_slot: dict[str, int] = {}
+        self.malshab_id_to_course: dict[str, Course] = {}
+        self.course_to_scheduled_count: dict[Course, int] = {}
+
+        # Cached deadlines (absolute slot, or None if the candidate cannot be picked), by the pick they last until
+        self.malshab_id_to_deadline: dict[str, int | None] = {}
+        self.contested_picks_heap: list[tuple[int, str]] = []
+        # What the cached deadlines were counted from, see _expire_deadlines
+        self.deadlines_basis: tuple[int, int | None] | None = None
+        # Every candidate the last suggestion was chosen from, whose ranks the schedule depends on
+        self.examined_malshab_ids: set[str] = set()
+
+    def fork(self) -> 'DeadlineScheduler':
+        return DeadlineScheduler(self.candidates_per_slot)
+
+    def adopt_cache(self, scheduler: 'DeadlineScheduler'):
+        self.malshab_id_to_deadline = dict(scheduler.malshab_id_to_deadline)
+        self.contested_picks_heap = list(scheduler.contested_picks_heap)
+        self.deadlines_basis = scheduler.deadlines_basis
+
+    def get_planned_malshab_ids(self) -> set[str]:
+        return set(self.malshab_id_to_slot)
+
+    def get_relied_on_malshab_ids(self) -> set[str]:
+        return set(self.examined_malshab_ids)
+
+    def _get_deadline(self, draft, suggestion: Malshab) -> int | None:
+        """
+        Get the last slot in which the suggestion can be called, cached until its contested pick passes.
+        """
+        if suggestion.id in self.malshab_id_to_deadline:
+            deadline = self.malshab_id_to_deadline[suggestion.id]
+            # A deadline that passed in the meantime means the suggestion cannot be picked anymore
+            return deadline if deadline is not None and deadline >= draft.current_internal_pick else None
+
+        latest_pick = draft.get_lateset_pick_for_suggestion(suggestion)
+        deadline = draft.current_internal_pick + latest_pick if latest_pick is not None else None
+        self.malshab_id_to_deadline[suggestion.id] = deadline
+        contested_pick = draft.contested_pick_index.get_next_contested_pick(suggestion.id, draft.current_draft_pick)
+        heapq.heappush(self.contested_picks_heap, (contested_pick, suggestion.id))
+        return deadline
+
+    def _expire_deadlines(self, draft):
+        """
+        Drop the cached deadlines whose contested pick has passed without the Malshab being taken,
+        since they can now be called later.
+        All of them are dropped if a pick of my unit was skipped, since the deadlines count my unit's picks that are left,
+        and on every pick with a pick probability model, since the risk is measured from the current pick.
+        """
+        skipped_picks_count = draft.contested_pick_index.count_my_unit_picks(0, draft.current_draft_pick) - draft.current_internal_pick
+        deadlines_basis = (skipped_picks_count, draft.current_draft_pick if draft.pick_probability_model is not None else None)
+        if deadlines_basis != self.deadlines_basis:
+            self.malshab_id_to_deadline = {}
+            self.contested_picks_heap = []
+            self.deadlines_basis = deadlines_basis
+            return
+
+        while self.contested_picks_heap and self.contested_picks_heap[0][0] < draft.current_draft_pick:
+            _, malshab_id = heapq.heappop(self.contested_picks_heap)
+            self.malshab_id_to_deadline.pop(malshab_id, None)
+
+    def _schedule(self, draft, malshab: Malshab, course: Course, slot: int):
+        self.slot_to_malshab[slot] = malshab
+        self.malshab_id_to_slot[malshab.id] = slot
+        self.malshab_id_to_course[malshab.id] = course
+        self.course_to_scheduled_count[course] = self.course_to_scheduled_count.get(course, 0) + 1
+        draft.quota_tracker.reserve(malshab.row, draft.my_unit, course)
+
+    def _unschedule(self, draft, malshab_id: str):
+        slot = self.malshab_id_to_slot.pop(malshab_id, None)
+        if slot is not None:
+            malshab = self.slot_to_malshab.pop(slot)
+            course = self.malshab_id_to_course.pop(malshab_id)
+            self.course_to_scheduled_count[course] -= 1
+            draft.quota_tracker.release(malshab.row, draft.my_unit, course)
+
+    def _update_schedule(self, draft):
+        """
+        Schedule the candidates of all the courses into my unit's remaining picks, from the cached deadlines.
+        """
+        self._expire_deadlines(draft)
+        for malshab_id in list(self.malshab_id_to_slot):
+            self._unschedule(draft, malshab_id)
+
+        # The slots of each course, with the courses ordered by the internal picking order
+        course_to_quota: dict[Course, int] = {}
+        for course in draft.remaining_internal_picks_order:
+            course_to_quota[course] = course_to_quota.get(course, 0) + 1
+
+        # Collect the candidates of each course, with their value by priority
+        candidates: list[tuple[float, int, Malshab, Course, int]] = []
+        tested_count = 0
+        examined_malshab_ids = self.examined_malshab_ids = set()
+        for course_order, (course, quota) in enumerate(course_to_quota.items()):
+            candidates_limit = quota * self.candidates_per_slot
+            for rank, suggestion in enumerate(draft.course_to_prioritization[course].iter_remaining_malshabs(candidates_limit)):
+                examined_malshab_ids.add(suggestion.id)
+                deadline = self._get_deadline(draft, suggestion)
+                if deadline is not None:
+                    candidates.append((1 / (1 + rank), -course_order, suggestion, course, deadline))
+                tested_count += 1
+        pick_metrics = self._get_pick_metrics(draft)
+        if pick_metrics is not None:
+            pick_metrics.suggestions_tested += tested_count
+        candidates.sort(key=lambda candidate: (candidate[0], candidate[1]), reverse=True)
+
+        # Free slots, as a union-find pointing every slot to the latest free slot at or before it
+        first_slot = draft.current_internal_pick
+        slots_count = len(draft.remaining_internal_picks_order)
+        parent = list(range(slots_count))
+
+        def find_free_offset(offset: int) -> int:
+            root = offset
+            while root >= 0 and parent[root] != root:
+                root = parent[root]
+            # Compress the path
+            while offset >= 0 and parent[offset] != offset:
+                parent[offset], offset = root, parent[offset]
+            return root
+
+        my_unit = draft.my_unit
+        for _, _, suggestion, course, deadline in candidates:
+            if suggestion.id in self.malshab_id_to_slot or self.course_to_scheduled_count.get(course, 0) >= course_to_quota[course]:
+                continue
+            if not draft.quota_tracker.can_add(suggestion.row, my_unit, course):
+                continue
+            free_offset = find_free_offset(min(deadline - first_slot, slots_count - 1))
+            if free_offset < 0:
+                continue
+            self._schedule(draft, suggestion, course, first_slot + free_offset)
+            parent[free_offset] = free_offset - 1
+
+    def get_suggestion(self, draft) -> tuple[Malshab, Course]:
+        while draft.remaining_internal_picks_order:
+            next_course = draft.remaining_internal_picks_order[0]
+            # Drop courses that ran out of suggestions, like the greedy scheduler does
+            if draft.course_to_prioritization[next_course].remaining_count == 0:
+                self._log('-- No more suggestions available for course %s. Moving to the next course.', next_course.name)
+                draft.remove_internal_pick(0)
+                continue
+
+            self._update_schedule(draft)
+            pick_metrics = self._get_pick_metrics(draft)
+            if pick_metrics is not None:
+                pick_metrics.queue_size = len(self.slot_to_malshab)
+
+            suggestion = self.slot_to_malshab.get(draft.current_internal_pick)
+            if suggestion is not None:
+                course = self.malshab_id_to_course[suggestion.id]
+                self._log('-- Suggestion %s for course %s is contested. Picking it now.', suggestion.id, course.name)
+                return suggestion, course
+
+            # Nothing has to be called now, call the earliest deadline candidate, by the internal picking order
+            for course in dict.fromkeys(draft.remaining_internal_picks_order):
+                scheduled_for_course = [
+                    (slot, malshab) for slot, malshab in self.slot_to_malshab.items()
+                    if self.malshab_id_to_course[malshab.id] == course
+                ]
+                if scheduled_for_course:
+                    _, suggestion = min(scheduled_for_course, key=lambda scheduled: scheduled[0])
+                    self._log('-- Nothing is contested, picking %s for course %s, which is scheduled earliest.', suggestion.id, course.name)
+                    return suggestion, course
+
+            # Nothing could be scheduled, call the first candidate that can still be picked
+            for suggestion in draft.course_to_prioritization[next_course].iter_remaining_malshabs():
+                self.examined_malshab_ids.add(suggestion.id)
+                if self._get_deadline(draft, suggestion) is not None \
+                        and draft.quota_tracker.can_add(suggestion.row, draft.my_unit, next_course):
+                    return suggestion, next_course
+
+            self._log('-- No suggestion can be picked for course %s. Moving to the next course.', next_course.name)
+            draft.remove_internal_pick(0)
+
+        self._log('-- No more picks available. Ending draft.')
+        draft.is_active = False
+        return None, None
+
+    def handle_malshab_chosen(self, draft, malshab_id: str, unit: Unit, course: Course):
+        # The chosen Malshab is counted in the quotas as picked now, and is not a candidate anymore
+        self._unschedule(draft, malshab_id)
+        self.malshab_id_to_deadline.pop(malshab_id, None)
+
+
+PICK_SCHEDULERS: dict[str, type[PickScheduler]] = {
+    GreedySlotScheduler.name: GreedySlotScheduler,
+    DeadlineScheduler.name: DeadlineScheduler,
+}
@@ -0,0 +1,216 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator
+
+from clutch_libs.miluim.consts import Unit
+
+# Units are stored by their position in the enum, like in the journal and the draft image
+UNITS: list[Unit] = list(Unit)
+UNIT_TO_CODE: dict[Unit, int] = {unit: code for code, unit in enumerate(UNITS)}
+
+
+class PickingOrder:
+    """
+    The general picking order of a draft, stored compressed.
+    Real orders repeat a round (round robin, or a snake of a round and its reverse), so the order is stored
+    as a block of picks repeated until the total number of picks (the last repetition may be cut short),
+    and the block itself is run-length encoded. An order without a pattern is a single block of all its picks.
+    Every query (the unit of a pick, a unit's next pick, a unit's picks in a range) is a bisect over the block's runs.
+    It is read-only, and behaves like a sequence of units, so it can be indexed, sliced and iterated like a list.
+    """
+
+    def __init__(self, run_starts: array, run_unit_codes: array, block_length: int, total_picks: int):
+        """
+        Initialize the PickingOrder object, from the runs of its block. Use the from_* class methods to create one.
+        Args:
+            run_starts (array): The position in the block where each run starts, ascending from 0.
+            run_unit_codes (array): The unit (by its position in the Unit enum) picking in each run.
+            block_length (int): The number of picks in the block.
+            total_picks (int): The number of picks in the order.
+        """
+        if total_picks > 0 and block_length == 0:
+            raise ValueError(f'A picking order of {total_picks} picks needs a non-empty block.')
+        self.run_starts: array = run_starts
+        self.run_unit_codes: array = run_unit_codes
+        self.block_length: int = block_length
+        self.total_picks: int = total_picks
+
+        # The runs of each unit in the block, with the number of its picks in the block before each run
+        self.unit_to_run_starts: dict[Unit, array] = {unit: array('I') for unit in Unit}
+        self.unit_to_run_ends: dict[Unit, array] = {unit: array('I') for unit in Unit}
+        self.unit_to_run_prefix: dict[Unit, array] = {unit: array('I') for unit in Unit}
+        self.unit_to_block_count: dict[Unit, int] = {unit: 0 for unit in Unit}
+        for index, run_start in enumerate(run_starts):
+            unit = UNITS[run_unit_codes[index]]
+            run_end = run_starts[index + 1] if index + 1 < len(run_starts) else block_length
+            self.unit_to_run_starts[unit].append(run_start)
+            self.unit_to_run_ends[unit].append(run_end)
+            self.unit_to_run_prefix[unit].append(self.unit_to_block_count[unit])
+            self.unit_to_block_count[unit] += run_end - run_start
+
+    @classmethod
+    def from_block(cls, block: list[Unit], total_picks: int = None) -> 'PickingOrder':
+        """
+        Create an order repeating the given block of picks.
+        Args:
+            block (list[Unit]): The picks of the block.
+            total_picks (int): The number of picks in the order, a single block if not given.
+        Returns:
+            PickingOrder: The order.
+        """
+        run_starts = array('I')
+        run_unit_codes = array('B')
+        for position, unit in enumerate(block):
+            unit_code = UNIT_TO_CODE[unit]
+            if not run_unit_codes or run_unit_codes[-1] != unit_code:
+                run_starts.append(position)
+                run_unit_codes.append(unit_code)
+        return cls(run_starts, run_unit_codes, len(block), len(block) if total_picks is None else total_picks)
+
+    @classmethod
+    def from_pattern(cls, pattern: list[Unit], rounds: int, snake: bool = False) -> 'PickingOrder':
+        """
+        Create an order of rounds, each picking by the pattern.
+        Args:
+            pattern (list[Unit]): The order of the units in a round.
+            rounds (int): The number of rounds.
+            snake (bool): Reverse the pattern every other round.
+        Returns:
+            PickingOrder: The order.
+        """
+        pattern = list(pattern)
+        return cls.from_block(pattern + pattern[::-1] if snake else pattern, len(pattern) * rounds)
+
+    @classmethod
+    def from_units(cls, units: Iterable[Unit]) -> 'PickingOrder':
+        """
+        Create an order of the given picks, compressed by the shortest block they repeat.
+        Args:
+            units (Iterable[Unit]): The unit of every pick.
+        Returns:
+            PickingOrder: The order.
+        """
+        codes = bytes(UNIT_TO_CODE[unit] for unit in units)
+        # The shortest period is the length minus the longest proper prefix that is also a suffix (KMP prefix function)
+        prefix_lengths = [0] * len(codes)
+        for index in range(1, len(codes)):
+            length = prefix_lengths[index - 1]
+            while length and codes[index] != codes[length]:
+                length = prefix_lengths[length - 1]
+            if codes[index] == codes[length]:
+                length += 1
+            prefix_lengths[index] = length
+        block_length = len(codes) - prefix_lengths[-1] if codes else 0
+        # A block that doesn't repeat at least twice doesn't save anything
+        if block_length * 2 > len(codes):
+            block_length = len(codes)
+        return cls.from_block([UNITS[code] for code in codes[:block_length]], len(codes))
+
+    def get_unit(self, pick_index: int) -> Unit:
+        """
+        Get the unit picking in the given pick.
+        """
+        if not 0 <= pick_index < self.total_picks:
+            raise IndexError(f'Pick {pick_index} is out of the picking order of {self.total_picks} picks.')
+        position = pick_index % self.block_length
+        return UNITS[self.run_unit_codes[bisect_right(self.run_starts, position) - 1]]
+
+    def _count_picks_before(self, unit: Unit, pick_index: int) -> int:
+        # The unit's picks in [0, pick_index)
+        pick_index = min(max(pick_index, 0), self.total_picks)
+        if not self.block_length:
+            return 0
+        rounds, position = divmod(pick_index, self.block_length)
+        count = rounds * self.unit_to_block_count[unit]
+        run_starts = self.unit_to_run_starts[unit]
+        run_index = bisect_right(run_starts, position) - 1
+        if run_index >= 0:
+            count += self.unit_to_run_prefix[unit][run_index] \
+                + min(position, self.unit_to_run_ends[unit][run_index]) - run_starts[run_index]
+        return count
+
+    def count_unit_picks(self, unit: Unit, start_pick: int, end_pick: int) -> int:
+        """
+        Count the unit's picks in the range [start_pick, end_pick).
+        Args:
+            unit (Unit): The unit to count the picks of.
+            start_pick (int): The first pick of the range.
+            end_pick (int): The pick after the last pick of the range.
+        Returns:
+            int: The number of picks the unit owns in the range.
+        """
+        if end_pick <= start_pick:
+            return 0
+        return self._count_picks_before(unit, end_pick) - self._count_picks_before(unit, start_pick)
+
+    def get_next_unit_pick(self, unit: Unit, pick_index: int) -> int:
+        """
+        Get the first pick owned by the unit, starting from the given pick (inclusive).
+        Args:
+            unit (Unit): The unit to check.
+            pick_index (int): The pick to start from.
+        Returns:
+            int: The pick number, or the total number of picks if the unit has no more picks.
+        """
+        pick_index = max(pick_index, 0)
+        if pick_index >= self.total_picks or not self.unit_to_block_count[unit]:
+            return self.total_picks
+        rounds, position = divmod(pick_index, self.block_length)
+        run_starts = self.unit_to_run_starts[unit]
+        run_index = bisect_right(run_starts, position) - 1
+        if run_index >= 0 and position < self.unit_to_run_ends[unit][run_index]:
+            next_pick = pick_index
+        elif run_index + 1 < len(run_starts):
+            next_pick = rounds * self.block_length + run_starts[run_index + 1]
+        else:
+            next_pick = (rounds + 1) * self.block_length + run_starts[0]
+        return min(next_pick, self.total_picks)
+
+    def get_nth_unit_pick(self, unit: Unit, pick_number: int, start_pick: int) -> int:
+        """
+        Get the unit's n-th pick, counting from the given pick.
+        Args:
+            unit (Unit): The unit.
+            pick_number (int): The 0-based number of the unit's pick, relative to the start pick.
+            start_pick (int): The pick to count from.
+        Returns:
+            int: The draft pick number, or the total number of picks if the unit doesn't have that many picks left.
+        """
+        block_count = self.unit_to_block_count[unit]
+        if not block_count:
+            return self.total_picks
+        rounds, number_in_block = divmod(self._count_picks_before(unit, start_pick) + pick_number, block_count)
+        run_prefix = self.unit_to_run_prefix[unit]
+        run_index = bisect_right(run_prefix, number_in_block) - 1
+        pick_index = rounds * self.block_length + self.unit_to_run_starts[unit][run_index] + number_in_block - run_prefix[run_index]
+        return min(pick_index, self.total_picks)
+
+    def count(self, unit: Unit) -> int:
+        """
+        Count all the picks of the unit.
+        """
+        return self._count_picks_before(unit, self.total_picks)
+
+    def __len__(self) -> int:
+        return self.total_picks
+
+    def __getitem__(self, index: int | slice) -> Unit | list[Unit]:
+        if isinstance(index, slice):
+            return [self.get_unit(pick_index) for pick_index in range(*index.indices(self.total_picks))]
+        return self.get_unit(index + self.total_picks if index < 0 else index)
+
+    def __iter__(self) -> Iterator[Unit]:
+        for round_start in range(0, self.total_picks, self.block_length or 1):
+            for index, run_start in enumerate(self.run_starts):
+                run_end = self.run_starts[index + 1] if index + 1 < len(self.run_starts) else self.block_length
+                unit = UNITS[self.run_unit_codes[index]]
+                for _ in range(max(min(run_end, self.total_picks - round_start) - run_start, 0)):
+                    yield unit
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (PickingOrder, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(unit == other_unit for unit, other_unit in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f'PickingOrder({self.total_picks} picks, a block of {self.block_length} picks in {len(self.run_starts)} runs)'
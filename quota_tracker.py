@@ -0,0 +1,197 @@
+from clutch_libs.miluim.consts import DEFAULT_SCHAKIM_LATEST_DRAFT_PICK, Course, Gender, QuotaAttribute, Unit
+from clutch_libs.miluim.malshab_table import CODE_TO_GENDER, MalshabTable
+
+GENDER_TO_QUOTA_ATTRIBUTE: dict[Gender, QuotaAttribute] = {
+    Gender.MALE: QuotaAttribute.MALE,
+    Gender.FEMALE: QuotaAttribute.FEMALE,
+}
+
+
+class QuotaTracker:
+    """
+    Limits on the number of combat, schakim, male and female Malshabs each course and each unit may get,
+    with running counts of the Malshabs already picked and of the ones reserved by the pick scheduler for later picks.
+    Every update and check touches only the attributes of a single Malshab, so they are O(1),
+    and can run inside the look-ahead of the schedulers.
+    """
+
+    def __init__(
+        self,
+        malshab_table: MalshabTable,
+        course_to_limits: dict[Course, dict[QuotaAttribute, int]] = None,
+        unit_to_limits: dict[Unit, dict[QuotaAttribute, int]] = None,
+        schakim_latest_draft_pick: int | None = DEFAULT_SCHAKIM_LATEST_DRAFT_PICK,
+    ):
+        """
+        Initialize the QuotaTracker object.
+        Args:
+            malshab_table (MalshabTable): The table holding the Malshabs.
+            course_to_limits (dict[Course, dict[QuotaAttribute, int]]): The maximal count of each attribute per course.
+            unit_to_limits (dict[Unit, dict[QuotaAttribute, int]]): The maximal count of each attribute per unit.
+            schakim_latest_draft_pick (int | None): The last draft pick in which schakim can be picked, None for no limit.
+        """
+        self.malshab_table: MalshabTable = malshab_table
+        self.schakim_latest_draft_pick: int | None = schakim_latest_draft_pick
+        self.course_to_limits: dict[Course, dict[QuotaAttribute, int]] = {}
+        self.unit_to_limits: dict[Unit, dict[QuotaAttribute, int]] = {}
+
+        # Running counts, only of the limited attributes
+        self.course_to_picked_counts: dict[Course, dict[QuotaAttribute, int]] = {}
+        self.unit_to_picked_counts: dict[Unit, dict[QuotaAttribute, int]] = {}
+        self.course_to_reserved_counts: dict[Course, dict[QuotaAttribute, int]] = {}
+        self.unit_to_reserved_counts: dict[Unit, dict[QuotaAttribute, int]] = {}
+        self.set_limits(course_to_limits or {}, unit_to_limits or {})
+
+    def set_limits(self, course_to_limits: dict[Course, dict[QuotaAttribute, int]], unit_to_limits: dict[Unit, dict[QuotaAttribute, int]]):
+        """
+        Set the limits, resetting all the counts.
+        Args:
+            course_to_limits (dict[Course, dict[QuotaAttribute, int]]): The maximal count of each attribute per course.
+            unit_to_limits (dict[Unit, dict[QuotaAttribute, int]]): The maximal count of each attribute per unit.
+        """
+        self.course_to_limits = {course: dict(limits) for course, limits in course_to_limits.items() if limits}
+        self.unit_to_limits = {unit: dict(limits) for unit, limits in unit_to_limits.items() if limits}
+        self.course_to_picked_counts = {course: dict.fromkeys(limits, 0) for course, limits in self.course_to_limits.items()}
+        self.unit_to_picked_counts = {unit: dict.fromkeys(limits, 0) for unit, limits in self.unit_to_limits.items()}
+        self.course_to_reserved_counts = {course: dict.fromkeys(limits, 0) for course, limits in self.course_to_limits.items()}
+        self.unit_to_reserved_counts = {unit: dict.fromkeys(limits, 0) for unit, limits in self.unit_to_limits.items()}
+
+    def fork(self, with_picked_counts: bool = False) -> 'QuotaTracker':
+        """
+        Create a new tracker with the same limits, and nothing reserved yet.
+        Args:
+            with_picked_counts (bool): Copy the counts of the picked Malshabs, instead of starting with nothing picked.
+        Returns:
+            QuotaTracker: The forked tracker.
+        """
+        forked_tracker = QuotaTracker(self.malshab_table, self.course_to_limits, self.unit_to_limits, self.schakim_latest_draft_pick)
+        if with_picked_counts:
+            forked_tracker.course_to_picked_counts = {course: dict(counts) for course, counts in self.course_to_picked_counts.items()}
+            forked_tracker.unit_to_picked_counts = {unit: dict(counts) for unit, counts in self.unit_to_picked_counts.items()}
+        return forked_tracker
+
+    def get_malshab_attributes(self, row: int) -> tuple[QuotaAttribute, ...]:
+        """
+        Get the attributes of a Malshab that count towards quotas.
+        Args:
+            row (int): The row of the Malshab in the table.
+        Returns:
+            tuple[QuotaAttribute, ...]: The attributes of the Malshab.
+        """
+        table = self.malshab_table
+        attributes = (GENDER_TO_QUOTA_ATTRIBUTE[CODE_TO_GENDER[table.genders[row]]],)
+        if table.is_combat_flags[row]:
+            attributes += (QuotaAttribute.COMBAT,)
+        if table.is_schakim_flags[row]:
+            attributes += (QuotaAttribute.SCHAKIM,)
+        return attributes
+
+    def can_pick_schakim_at(self, draft_pick: int) -> bool:
+        """
+        Check if schakim can still be picked in the given draft pick.
+        """
+        return self.schakim_latest_draft_pick is None or draft_pick <= self.schakim_latest_draft_pick
+
+    @staticmethod
+    def _fits(attributes: tuple[QuotaAttribute, ...], limits: dict, picked_counts: dict, reserved_counts: dict) -> bool:
+        for attribute in attributes:
+            limit = limits.get(attribute)
+            if limit is not None and picked_counts[attribute] + reserved_counts[attribute] >= limit:
+                return False
+        return True
+
+    def can_add(self, row: int, unit: Unit, course: Course = Course.EXTERNAL) -> bool:
+        """
+        Check if a Malshab can be added to a unit and course without exceeding their quotas,
+        counting both the Malshabs already picked and the reserved ones.
+        Args:
+            row (int): The row of the Malshab in the table.
+            unit (Unit): The unit picking the Malshab.
+            course (Course): The course the Malshab is picked for, external for other units.
+        Returns:
+            bool: True if all the quotas allow the Malshab, False otherwise.
+        """
+        unit_limits = self.unit_to_limits.get(unit)
+        course_limits = self.course_to_limits.get(course)
+        if unit_limits is None and course_limits is None:
+            return True
+
+        attributes = self.get_malshab_attributes(row)
+        if unit_limits is not None and not self._fits(
+            attributes, unit_limits, self.unit_to_picked_counts[unit], self.unit_to_reserved_counts[unit]
+        ):
+            return False
+        if course_limits is not None and not self._fits(
+            attributes, course_limits, self.course_to_picked_counts[course], self.course_to_reserved_counts[course]
+        ):
+            return False
+        return True
+
+    def _update_counts(self, row: int, unit: Unit, course: Course, unit_to_counts: dict, course_to_counts: dict, delta: int):
+        unit_counts = unit_to_counts.get(unit)
+        course_counts = course_to_counts.get(course)
+        if unit_counts is None and course_counts is None:
+            return
+
+        for attribute in self.get_malshab_attributes(row):
+            if unit_counts is not None and attribute in unit_counts:
+                unit_counts[attribute] += delta
+            if course_counts is not None and attribute in course_counts:
+                course_counts[attribute] += delta
+
+    def commit(self, row: int, unit: Unit, course: Course = Course.EXTERNAL):
+        """
+        Count a picked Malshab towards the quotas of its unit and course.
+        Args:
+            row (int): The row of the Malshab in the table.
+            unit (Unit): The unit that picked the Malshab.
+            course (Course): The course the Malshab was picked for, external for other units.
+        """
+        self._update_counts(row, unit, course, self.unit_to_picked_counts, self.course_to_picked_counts, 1)
+
+    def uncommit(self, row: int, unit: Unit, course: Course = Course.EXTERNAL):
+        """
+        Remove a picked Malshab from the counts, when its pick is undone.
+        Args:
+            row (int): The row of the Malshab in the table.
+            unit (Unit): The unit that picked the Malshab.
+            course (Course): The course the Malshab was picked for, external for other units.
+        """
+        self._update_counts(row, unit, course, self.unit_to_picked_counts, self.course_to_picked_counts, -1)
+
+    def reserve(self, row: int, unit: Unit, course: Course):
+        """
+        Tentatively count a Malshab the scheduler plans to pick later, so other candidates respect it.
+        Args:
+            row (int): The row of the Malshab in the table.
+            unit (Unit): The unit planning to pick the Malshab.
+            course (Course): The course the Malshab is planned for.
+        """
+        self._update_counts(row, unit, course, self.unit_to_reserved_counts, self.course_to_reserved_counts, 1)
+
+    def release(self, row: int, unit: Unit, course: Course):
+        """
+        Remove a reservation made by reserve.
+        Args:
+            row (int): The row of the Malshab in the table.
+            unit (Unit): The unit the Malshab was reserved for.
+            course (Course): The course the Malshab was reserved for.
+        """
+        self._update_counts(row, unit, course, self.unit_to_reserved_counts, self.course_to_reserved_counts, -1)
+
+    def clear_reservations(self):
+        """
+        Remove all the reservations, for schedulers that rebuild their plan from scratch.
+        """
+        for counts in list(self.unit_to_reserved_counts.values()) + list(self.course_to_reserved_counts.values()):
+            for attribute in counts:
+                counts[attribute] = 0
+
+    def get_picked_count(self, attribute: QuotaAttribute, unit: Unit = None, course: Course = None) -> int | None:
+        """
+        Get the number of picked Malshabs with an attribute, for a unit or a course.
+        Returns:
+            int | None: The count, or None if the attribute is not limited (and so not counted) for them.
+        """
+        counts = self.unit_to_picked_counts.get(unit) if unit is not None else self.course_to_picked_counts.get(course)
+        return counts.get(attribute) if counts is not None else None
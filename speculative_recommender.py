@@ -0,0 +1,245 @@
+import logging
+import threading
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.malshab import Malshab
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRecommendation:
+    """
+    A suggestion for my unit's next pick, computed ahead of time on a fork of the draft.
+    """
+
+    def __init__(
+        self,
+        draft_pick: int,
+        internal_pick: int,
+        suggestion: Malshab | None,
+        course: Course | None,
+        removed_internal_pick_indexes: list[int],
+        is_active: bool,
+        relied_on_malshab_ids: set[str],
+        pick_scheduler=None,
+    ):
+        """
+        Initialize the SpeculativeRecommendation object.
+        Args:
+            draft_pick (int): The draft pick the suggestion was computed for.
+            internal_pick (int): The internal pick the suggestion was computed for.
+            suggestion (Malshab | None): The suggested Malshab, None if the draft should end.
+            course (Course | None): The course of the suggestion.
+            removed_internal_pick_indexes (list[int]): The indexes removed from the remaining internal picking order
+                during the computation, of courses that ran out of suggestions, in order.
+            is_active (bool): Whether the draft is still active after the computation.
+            relied_on_malshab_ids (set[str]): The Malshabs the suggestion relies on being available.
+            pick_scheduler (PickScheduler): The scheduler of the fork, with the computations it cached.
+        """
+        self.draft_pick = draft_pick
+        self.internal_pick = internal_pick
+        self.suggestion = suggestion
+        self.course = course
+        self.removed_internal_pick_indexes = removed_internal_pick_indexes
+        self.is_active = is_active
+        self.relied_on_malshab_ids = relied_on_malshab_ids
+        self.pick_scheduler = pick_scheduler
+
+
+class SpeculativeRecommender:
+    """
+    Computes my unit's next suggestion in a background thread, while the draft waits for other units to pick.
+    The computation runs on a fork of the draft state, positioned at my unit's next pick, with a copy of the scheduler's cache,
+    so it never touches the draft itself. Other units' picks only invalidate it if they take a Malshab it relies on
+    (the suggestion, or any candidate the scheduler chose it from), so a valid speculation is exactly
+    what the scheduler would have suggested when our turn arrives.
+    When it is invalidated, it is computed again on the spot, reusing what the speculation cached (like the deadlines).
+    With a pick probability model, the risk of every candidate depends on all the Malshabs other units take,
+    so there is nothing to speculate on, and the suggestion is always computed on the spot.
+    """
+
+    def __init__(self):
+        """
+        Initialize the SpeculativeRecommender object.
+        """
+        self.condition: threading.Condition = threading.Condition()
+        self.worker: threading.Thread | None = None
+        self.is_stopped: bool = False
+
+        # Bumped on every invalidation, computations of older generations are discarded
+        self.generation: int = 0
+        self.recommendation: SpeculativeRecommendation | None = None
+        # The last computation that finished, even if it was invalidated
+        self.computed_recommendation: SpeculativeRecommendation | None = None
+        # The fork waiting for the worker, and the generation of the computation pending or running
+        self.pending_draft = None
+        self.computing_generation: int | None = None
+        # Malshabs taken by other units since the running computation forked the draft
+        self.malshab_ids_chosen_since_fork: set[str] = set()
+
+        # How many suggestions were ready in time, and how many had to be computed on the spot
+        self.hits_count: int = 0
+        self.misses_count: int = 0
+
+    def start(self):
+        """
+        Start the background worker.
+        """
+        self.is_stopped = False
+        self.worker = threading.Thread(target=self._run_worker, name='speculative-recommender', daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop the background worker, waiting for the running computation to finish.
+        """
+        with self.condition:
+            self.is_stopped = True
+            self.condition.notify_all()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def invalidate(self):
+        """
+        Discard the current recommendation, and any computation in progress.
+        """
+        with self.condition:
+            self.generation += 1
+            self.recommendation = None
+            self.computed_recommendation = None
+            self.pending_draft = None
+            self.condition.notify_all()
+
+    def speculate(self, draft):
+        """
+        Start computing the suggestion for my unit's next pick, unless it is already computed or in progress.
+        Must be called from the thread running the draft.
+        Args:
+            draft (Draft): The draft.
+        """
+        with self.condition:
+            if self.recommendation is not None or self.computing_generation == self.generation:
+                return
+
+            if draft.pick_probability_model is not None:
+                return
+            my_unit = draft.my_unit
+            next_my_unit_pick = draft.contested_pick_index.get_next_unit_pick(my_unit, draft.current_draft_pick)
+            if not draft.is_active or not draft.remaining_internal_picks_order \
+                    or next_my_unit_pick >= draft.contested_pick_index.total_picks:
+                return
+
+            # Fork the state at my unit's next pick, assuming the picks until then don't take anyone we rely on
+            speculative_draft = draft.fork_state()
+            speculative_draft.pick_scheduler.is_quiet = True
+            for prioritization in speculative_draft.course_to_prioritization.values():
+                prioritization.is_quiet = True
+            speculative_draft.current_draft_pick = next_my_unit_pick
+
+            self.pending_draft = speculative_draft
+            self.computing_generation = self.generation
+            self.malshab_ids_chosen_since_fork = set()
+            self.condition.notify_all()
+
+    def handle_malshab_chosen(self, draft, malshab_id: str, unit: Unit):
+        """
+        Invalidate the recommendation if the pick affects it.
+        Args:
+            draft (Draft): The draft.
+            malshab_id (str): The ID of the chosen Malshab.
+            unit (Unit): The unit that chose the Malshab.
+        """
+        # Our own pick changes the state the next suggestion depends on
+        if unit == draft.my_unit:
+            self.invalidate()
+            return
+
+        with self.condition:
+            self.malshab_ids_chosen_since_fork.add(malshab_id)
+            if self.recommendation is not None and malshab_id in self.recommendation.relied_on_malshab_ids:
+                self.generation += 1
+                self.recommendation = None
+
+    def get_suggestion(self, draft) -> tuple[Malshab, Course]:
+        """
+        Get the suggestion for my unit's current pick, computed ahead of time if possible.
+        Waits for a computation of the current state that is still running,
+        and falls back to computing the suggestion on the spot if there is none.
+        Args:
+            draft (Draft): The draft.
+        Returns:
+            tuple[Malshab, Course]: The suggested Malshab and its course, (None, None) if the draft should end.
+        """
+        with self.condition:
+            while self.computing_generation == self.generation and self.recommendation is None and not self.is_stopped:
+                self.condition.wait()
+            recommendation = self.recommendation
+            computed_recommendation = self.computed_recommendation
+            self.recommendation = None
+            self.computed_recommendation = None
+
+        if recommendation is None or not self._is_for_current_pick(draft, recommendation):
+            self.misses_count += 1
+            # An invalidated computation of this pick still saves the work that didn't depend on the Malshabs taken
+            if computed_recommendation is not None and self._is_for_current_pick(draft, computed_recommendation):
+                draft.pick_scheduler.adopt_cache(computed_recommendation.pick_scheduler)
+            return draft.pick_scheduler.get_suggestion(draft)
+
+        self.hits_count += 1
+        for index in recommendation.removed_internal_pick_indexes:
+            draft.remove_internal_pick(index)
+        draft.is_active = recommendation.is_active
+        if not draft.is_active:
+            logger.info('-- No more picks available. Ending draft.')
+        elif recommendation.suggestion is not None:
+            logger.info('-- Suggestion %s for course %s was computed ahead of time.', recommendation.suggestion.id, recommendation.course.name)
+        return recommendation.suggestion, recommendation.course
+
+    @staticmethod
+    def _is_for_current_pick(draft, recommendation: SpeculativeRecommendation) -> bool:
+        return recommendation.draft_pick == draft.current_draft_pick and recommendation.internal_pick == draft.current_internal_pick
+
+    def _compute(self, speculative_draft) -> SpeculativeRecommendation | None:
+        try:
+            suggestion, course = speculative_draft.pick_scheduler.get_suggestion(speculative_draft)
+        except Exception:
+            # The suggestion is computed again on the spot, where the error is raised to the draft
+            return None
+        relied_on_malshab_ids = speculative_draft.pick_scheduler.get_relied_on_malshab_ids()
+        if suggestion is not None:
+            relied_on_malshab_ids.add(suggestion.id)
+        return SpeculativeRecommendation(
+            draft_pick=speculative_draft.current_draft_pick,
+            internal_pick=speculative_draft.current_internal_pick,
+            suggestion=suggestion,
+            course=course,
+            removed_internal_pick_indexes=[index for index, _ in speculative_draft.history.pending_removed_internal_picks],
+            is_active=speculative_draft.is_active,
+            relied_on_malshab_ids=relied_on_malshab_ids,
+            pick_scheduler=speculative_draft.pick_scheduler,
+        )
+
+    def _run_worker(self):
+        while True:
+            with self.condition:
+                while self.pending_draft is None and not self.is_stopped:
+                    self.condition.wait()
+                if self.is_stopped:
+                    return
+                speculative_draft = self.pending_draft
+                generation = self.computing_generation
+                self.pending_draft = None
+
+            recommendation = self._compute(speculative_draft)
+
+            with self.condition:
+                if recommendation is not None:
+                    self.computed_recommendation = recommendation
+                # Keep the result only if nothing it relies on was taken while computing it
+                if recommendation is not None and generation == self.generation \
+                        and not recommendation.relied_on_malshab_ids & self.malshab_ids_chosen_since_fork:
+                    self.recommendation = recommendation
+                if self.computing_generation == generation:
+                    self.computing_generation = None
+                self.condition.notify_all()
@@ -0,0 +1,162 @@
+import random
+from array import array
+
+from clutch_libs.miluim.consts import MINIMAL_COMBAT_MEDICAL_PROFILE, Course, Gender, Unit
+from clutch_libs.miluim.draft import MY_UNIT, Draft
+from clutch_libs.miluim.picking_order import PickingOrder
+
+INTERNAL_COURSES = [Course.SHEFA, Course.APOLLO, Course.MIVZAR, Course.HERMON]
+COMBAT_MEDICAL_PROFILES = [72, 82, 97]
+NON_COMBAT_MEDICAL_PROFILES = [21, 24, 45, 64]
+
+
+class SyntheticDraftParameters:
+    """
+    The parameters of a synthetic draft, used for benchmarks and simulations.
+    """
+
+    def __init__(
+        self,
+        malshabs_count: int = 2000,
+        units: list[Unit] = None,
+        picks_count: int = 600,
+        eligibility_ratio: float = 0.4,
+        prioritization_ratio: float = 0.5,
+        schakim_ratio: float = 0.1,
+        combat_ratio: float = 0.5,
+        shuffle_rounds: bool = True,
+        seed: int = 0,
+    ):
+        """
+        Initialize the SyntheticDraftParameters object.
+        Args:
+            malshabs_count (int): The number of Malshabs in the pool.
+            units (list[Unit]): The units taking part in the draft, my unit is always added.
+            picks_count (int): The length of the general picking order.
+            eligibility_ratio (float): The chance of each Malshab to be on each unit's list, which sets the overlap.
+            prioritization_ratio (float): The share of my unit's Malshabs each course prioritizes.
+            schakim_ratio (float): The share of Malshabs that are schakim.
+            combat_ratio (float): The share of Malshabs that are combat eligible.
+            shuffle_rounds (bool): Shuffle the order of the units in each round, instead of a fixed round robin.
+            seed (int): The seed of the random generator.
+        """
+        self.malshabs_count = malshabs_count
+        self.units = units if units is not None else list(Unit)
+        if MY_UNIT not in self.units:
+            self.units = [MY_UNIT] + self.units
+        self.picks_count = picks_count
+        self.eligibility_ratio = eligibility_ratio
+        self.prioritization_ratio = prioritization_ratio
+        self.schakim_ratio = schakim_ratio
+        self.combat_ratio = combat_ratio
+        self.shuffle_rounds = shuffle_rounds
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return {
+            'malshabs_count': self.malshabs_count,
+            'units': [unit.value for unit in self.units],
+            'picks_count': self.picks_count,
+            'eligibility_ratio': self.eligibility_ratio,
+            'prioritization_ratio': self.prioritization_ratio,
+            'schakim_ratio': self.schakim_ratio,
+            'combat_ratio': self.combat_ratio,
+            'shuffle_rounds': self.shuffle_rounds,
+            'seed': self.seed,
+        }
+
+
+def generate_synthetic_draft(parameters: SyntheticDraftParameters, draft: Draft = None) -> Draft:
+    """
+    Fill a draft with randomly generated, but realistic, input data.
+    The same parameters (including the seed) always generate the same draft.
+    Args:
+        parameters (SyntheticDraftParameters): The parameters of the generated draft.
+        draft (Draft): The draft to fill, a new one is created if not given.
+    Returns:
+        Draft: The filled draft, ready to run.
+    """
+    generator = random.Random(parameters.seed)
+    draft = draft if draft is not None else Draft()
+    units = parameters.units if draft.my_unit in parameters.units else [draft.my_unit] + parameters.units
+
+    # Generate the Malshab pool
+    malshab_ids = [str(100000000 + index) for index in range(parameters.malshabs_count)]
+    for index, malshab_id in enumerate(malshab_ids):
+        if generator.random() < parameters.combat_ratio:
+            gender = Gender.MALE
+            medical_profile = generator.choice(COMBAT_MEDICAL_PROFILES)
+        else:
+            gender = generator.choice(list(Gender))
+            medical_profile = generator.choice(
+                NON_COMBAT_MEDICAL_PROFILES if gender == Gender.MALE else NON_COMBAT_MEDICAL_PROFILES + COMBAT_MEDICAL_PROFILES
+            )
+        draft.malshab_table.add_malshab(
+            malshab_id,
+            f'first{index}',
+            f'last{index}',
+            gender,
+            medical_profile,
+            generator.randint(10, 99),
+            generator.random() < parameters.schakim_ratio,
+        )
+
+    # Each unit gets a random subset of the pool, units not taking part get nothing
+    for unit in draft.unit_to_malshab_ids.keys():
+        draft.unit_to_malshab_ids[unit] = [
+            malshab_id for malshab_id in malshab_ids if generator.random() < parameters.eligibility_ratio
+        ] if unit in units else []
+    draft.eligibility_index.build(draft.unit_to_malshab_ids)
+
+    # Each course prioritizes part of my unit's list, roughly by psych score with some noise
+    table = draft.malshab_table
+    my_unit_rows = table.get_rows(draft.unit_to_malshab_ids[draft.my_unit])
+    for prioritization in draft.course_to_prioritization.values():
+        course_rows = [row for row in my_unit_rows if generator.random() < parameters.prioritization_ratio]
+        course_rows.sort(key=lambda row: table.psych_scores[row] + generator.gauss(0, 15), reverse=True)
+        prioritization.set_priorized_rows(array('I', course_rows))
+
+    # Picking order, in rounds of all the units taking part
+    general_picking_order = []
+    while len(general_picking_order) < parameters.picks_count:
+        round_units = list(units)
+        if parameters.shuffle_rounds:
+            generator.shuffle(round_units)
+        general_picking_order.extend(round_units)
+    draft.set_general_picking_order(PickingOrder.from_units(general_picking_order[:parameters.picks_count]))
+
+    # Internal order, cycling the courses, one for each of my unit's picks
+    my_unit_picks_count = draft.general_picking_order.count(draft.my_unit)
+    draft.internal_picking_order = [INTERNAL_COURSES[index % len(INTERNAL_COURSES)] for index in range(my_unit_picks_count)]
+    draft.remaining_internal_picks_order = list(draft.internal_picking_order)
+
+    return draft
+
+
+def choose_random_available_malshab(
+    draft: Draft,
+    unit: Unit,
+    taken_malshab_ids: set[str],
+    generator: random.Random,
+    attempts: int = 20,
+) -> str | None:
+    """
+    Choose a random Malshab from the unit's list that was not taken yet.
+    Args:
+        draft (Draft): The draft.
+        unit (Unit): The unit picking.
+        taken_malshab_ids (set[str]): The IDs of the Malshabs that were already taken.
+        generator (random.Random): The random generator.
+        attempts (int): The number of random tries before falling back to scanning the list.
+    Returns:
+        str | None: The chosen Malshab ID, or None if the unit has no available Malshabs.
+    """
+    malshab_ids = draft.unit_to_malshab_ids[unit]
+    if not malshab_ids:
+        return None
+    for _ in range(attempts):
+        malshab_id = generator.choice(malshab_ids)
+        if malshab_id not in taken_malshab_ids:
+            return malshab_id
+    available_malshab_ids = [malshab_id for malshab_id in malshab_ids if malshab_id not in taken_malshab_ids]
+    return generator.choice(available_malshab_ids) if available_malshab_ids else None
@@ -0,0 +1,126 @@
+import csv
+import os
+import random
+
+from clutch_libs.miluim.consts import Course, QuotaAttribute, Unit
+from clutch_libs.miluim.draft import MY_UNIT, Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.pick_scheduler import PickScheduler
+from clutch_libs.miluim.synthetic_draft import SyntheticDraftParameters, choose_random_available_malshab, generate_synthetic_draft
+
+COURSE_TO_QUOTA_LIMITS: dict[Course, dict[QuotaAttribute, int]] = {
+    Course.SHEFA: {QuotaAttribute.FEMALE: 2, QuotaAttribute.SCHAKIM: 1},
+    Course.APOLLO: {QuotaAttribute.COMBAT: 4},
+    Course.MIVZAR: {QuotaAttribute.MALE: 5},
+}
+UNIT_TO_QUOTA_LIMITS: dict[Unit, dict[QuotaAttribute, int]] = {
+    MY_UNIT: {QuotaAttribute.SCHAKIM: 3},
+}
+
+
+def create_synthetic_draft(
+    seed: int,
+    pick_scheduler: PickScheduler = None,
+    with_quotas: bool = False,
+    my_unit: Unit = MY_UNIT,
+    malshabs_count: int = 400,
+    picks_count: int = 150,
+) -> Draft:
+    """
+    Create a small synthetic draft, with the combat, gender and schakim quotas if asked to.
+    """
+    draft = Draft(my_unit)
+    if pick_scheduler is not None:
+        draft.pick_scheduler = pick_scheduler
+    parameters = SyntheticDraftParameters(
+        malshabs_count=malshabs_count,
+        units=[Unit.TISHIM, Unit.SHIVIM, Unit.ARBA_TESHA, Unit.SHMONE_EHAD],
+        picks_count=picks_count,
+        seed=seed,
+    )
+    generate_synthetic_draft(parameters, draft)
+    if with_quotas:
+        draft.quota_tracker.set_limits(COURSE_TO_QUOTA_LIMITS, UNIT_TO_QUOTA_LIMITS)
+        draft.quota_tracker.schakim_latest_draft_pick = picks_count // 2
+    for prioritization in draft.course_to_prioritization.values():
+        prioritization.is_quiet = True
+    draft.pick_scheduler.is_quiet = True
+    return draft
+
+
+def play_draft(draft: Draft, seed: int, on_my_unit_pick=None, skip_ratio: float = 0.0, until_draft_pick: int = None):
+    """
+    Play the whole draft: my unit calls its suggestions, the other units call random Malshabs from their lists.
+    Like the interactive draft, my unit's next suggestion is speculated on while other units pick, if the draft speculates.
+    Args:
+        draft (Draft): The draft.
+        seed (int): The seed of the other units' picks.
+        on_my_unit_pick: Called with the draft before each of my unit's suggestions.
+        skip_ratio (float): The chance of every pick (of any unit) to be skipped.
+        until_draft_pick (int): Stop before this draft pick, play to the end if not given.
+    """
+    generator = random.Random(seed)
+    taken_malshab_ids = {draft_result.malshab_id for draft_result in draft.draft_results}
+    last_draft_pick = len(draft.general_picking_order) if until_draft_pick is None else until_draft_pick
+    while draft.is_active and draft.current_draft_pick < last_draft_pick:
+        unit = draft.general_picking_order[draft.current_draft_pick]
+        if generator.random() < skip_ratio:
+            draft.skip_current_pick()
+            continue
+        if unit == draft.my_unit:
+            if on_my_unit_pick is not None:
+                on_my_unit_pick(draft)
+            suggestion, course = draft._get_suggestion_for_internal_pick()
+            if not draft.is_active:
+                break
+            malshab_id = suggestion.id
+        else:
+            if draft.speculative_recommender is not None:
+                draft.speculative_recommender.speculate(draft)
+            course = Course.EXTERNAL
+            malshab_id = choose_random_available_malshab(draft, unit, taken_malshab_ids, generator)
+            if malshab_id is None:
+                draft.skip_current_pick()
+                continue
+        taken_malshab_ids.add(malshab_id)
+        draft.handle_chosen_malshab(malshab_id, unit, course)
+
+
+def _write_single_column_csv(path: str, values: list[str]) -> str:
+    with open(path, 'w', newline='') as file:
+        file.writelines(f'{value}\n' for value in values)
+    return path
+
+
+def write_synthetic_config(draft: Draft, directory: str) -> DraftConfig:
+    """
+    Write the inputs of a synthetic draft to files, with a config loading them.
+    """
+    table = draft.malshab_table
+    course_to_prioritization_path = {}
+    for course, prioritization in draft.course_to_prioritization.items():
+        path = os.path.join(directory, f'{course.value}.csv')
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['id', 'first_name', 'last_name', 'gender', 'medical_profile', 'psych_score', 'is_schakim'])
+            for row in prioritization.priorized_rows:
+                malshab = table.get_malshab(row)
+                writer.writerow([
+                    malshab.id, malshab.first_name, malshab.last_name, malshab.gender.value,
+                    malshab.medical_profile, malshab.psych_score, str(malshab.is_schakim).lower(),
+                ])
+        course_to_prioritization_path[course] = path
+    return DraftConfig(
+        course_to_prioritization_path=course_to_prioritization_path,
+        # Every unit needs a list, even if it never picks
+        unit_to_malshab_ids_path={
+            unit: _write_single_column_csv(os.path.join(directory, f'{unit.value}.csv'), malshab_ids or [table.ids[0]])
+            for unit, malshab_ids in draft.unit_to_malshab_ids.items()
+        },
+        general_picking_order_path=_write_single_column_csv(
+            os.path.join(directory, 'general.csv'), [unit.value for unit in draft.general_picking_order],
+        ),
+        internal_picking_order_path=_write_single_column_csv(
+            os.path.join(directory, 'internal.csv'), [course.value for course in draft.internal_picking_order],
+        ),
+    )
@@ -0,0 +1,132 @@
+import random
+from array import array
+
+from clutch_libs.miluim.consts import Course, Gender
+from clutch_libs.miluim.course_prioritization import CoursePrioritization, ParsedPrioritization
+from clutch_libs.miluim.draft_validation import ValidationReport
+from clutch_libs.miluim.malshab_table import MalshabTable
+
+
+def _create_prioritization(malshabs_count: int) -> CoursePrioritization:
+    table = MalshabTable()
+    for index in range(malshabs_count):
+        table.add_malshab(str(index), f'first{index}', f'last{index}', Gender.MALE, 97, 50, False)
+    prioritization = CoursePrioritization('SHEFA', table)
+    prioritization.is_quiet = True
+    prioritization.set_priorized_rows(array('I', range(malshabs_count)))
+    return prioritization
+
+
+def _get_suggestion_ids(prioritization: CoursePrioritization) -> list[str]:
+    prioritization.reset_suggestions()
+    suggestion_ids = []
+    while (suggestion := prioritization.get_next_suggestion()) is not None:
+        suggestion_ids.append(suggestion.id)
+    return suggestion_ids
+
+
+def test_removals_and_restores_match_the_remaining_malshabs():
+    generator = random.Random(0)
+    prioritization = _create_prioritization(200)
+    remaining_ids = [str(index) for index in range(200)]
+    removals = []
+    for _ in range(500):
+        if removals and generator.random() < 0.3:
+            # Removals are undone in the reverse order they were made
+            malshab_id, position, head_position = removals.pop()
+            prioritization.restore_malshab(position, head_position)
+            remaining_ids.append(malshab_id)
+            remaining_ids.sort(key=int)
+        else:
+            malshab_id = str(generator.randrange(200))
+            head_position = prioritization.head_position
+            position = prioritization.handle_malshab_chosen(malshab_id)
+            assert (position is not None) == (malshab_id in remaining_ids)
+            if position is not None:
+                removals.append((malshab_id, position, head_position))
+                remaining_ids.remove(malshab_id)
+
+        assert _get_suggestion_ids(prioritization) == remaining_ids
+        assert [malshab.id for malshab in prioritization.iter_remaining_malshabs(limit=5)] == remaining_ids[:5]
+        assert prioritization.remaining_count == len(remaining_ids)
+
+
+def test_fork_copies_the_removals():
+    prioritization = _create_prioritization(10)
+    for malshab_id in ('0', '4', '5', '9'):
+        prioritization.handle_malshab_chosen(malshab_id)
+
+    forked_prioritization = prioritization.fork(with_removals=True)
+    forked_prioritization.handle_malshab_chosen('1')
+    assert _get_suggestion_ids(forked_prioritization) == ['2', '3', '6', '7', '8']
+    assert _get_suggestion_ids(prioritization) == ['1', '2', '3', '6', '7', '8']
+    assert _get_suggestion_ids(prioritization.fork()) == [str(index) for index in range(10)]
+
+
+def test_suggestions_skip_removed_malshabs_without_scanning_them():
+    prioritization = _create_prioritization(1000)
+    for index in range(1, 999):
+        prioritization.handle_malshab_chosen(str(index))
+
+    # The suggestion after the first one is found through the link, not by scanning the removed positions
+    prioritization.reset_suggestions()
+    assert prioritization.get_next_suggestion().id == '0'
+    assert prioritization.current_suggestion_index == 999
+    assert prioritization.get_next_suggestion().id == '999'
+
+
+def test_parse_reports_out_of_range_scores(tmp_path):
+    csv_path = tmp_path / 'shefa.csv'
+    csv_path.write_text(
+        'id,first_name,last_name,gender,medical_profile,psych_score,is_schakim\n'
+        '1,a,a,male,97,80,no\n'
+        '2,b,b,male,300,80,no\n'
+        '3,c,c,male,-1,80,no\n'
+        '4,d,d,male,97,99999,no\n'
+        '5,e,e,male,82,x,no\n'
+        '6,f,f,female,21,50,yes\n'
+    )
+    parsed = ParsedPrioritization.parse(str(csv_path))
+    assert parsed.ids == ['1', '6']
+    assert [line for line, _ in parsed.errors] == [3, 4, 5, 6]
+    assert 'medical_profile 300 is not between 0 and 100' in parsed.errors[0][1]
+    assert 'psych_score 99999 is not between 0 and 100' in parsed.errors[2][1]
+
+    # The rows are reported with their file and line, and the rest of the file is loaded
+    report = ValidationReport()
+    prioritization = CoursePrioritization('SHEFA', MalshabTable())
+    prioritization.load_parsed(parsed, report, Course.SHEFA)
+    assert [issue.line for issue in report.errors] == [3, 4, 5, 6]
+    assert all(issue.path == str(csv_path) for issue in report.errors)
+    assert [malshab.id for malshab in prioritization.iter_remaining_malshabs()] == ['1', '6']
+
+
+def test_load_reports_duplicates_with_the_line_of_their_first_row(tmp_path):
+    csv_path = tmp_path / 'shefa.csv'
+    csv_path.write_text(
+        'id,first_name,last_name,gender,medical_profile,psych_score,is_schakim\n'
+        '1,a,a,male,97,80,no\n'
+        '2,b,b,male,97,70,no\n'
+        '1,a,a,male,97,80,no\n'
+        '2,b,b,male,97,60,no\n'
+    )
+    table = MalshabTable()
+    # Another course loaded Malshab 2 with other details than this file
+    table.add_malshab('2', 'b', 'b', Gender.MALE, 97, 50, False)
+    report = ValidationReport()
+    prioritization = CoursePrioritization('SHEFA', table)
+    prioritization.load_parsed(ParsedPrioritization.parse(str(csv_path)), report, Course.SHEFA)
+    assert [(issue.line, issue.message) for issue in report.errors] == [
+        (3, 'Malshab 2 does not match its details in another file'),
+        (4, 'Malshab 1 appears more than once (first on line 2)'),
+        (5, 'Malshab 2 does not match its details in another file'),
+    ]
+
+    report = ValidationReport()
+    prioritization = CoursePrioritization('SHEFA', MalshabTable())
+    prioritization.load_parsed(ParsedPrioritization.parse(str(csv_path)), report, Course.SHEFA)
+    assert [(issue.line, issue.message) for issue in report.errors] == [
+        (4, 'Malshab 1 appears more than once (first on line 2)'),
+        (5, 'Malshab 2 conflicts with its earlier row on line 3 of this file'),
+    ]
+    assert [malshab.id for malshab in prioritization.iter_remaining_malshabs()] == ['1', '2']
@@ -0,0 +1,98 @@
+import contextlib
+import io
+
+import pytest
+
+from clutch_libs.miluim.consts import Unit
+from clutch_libs.miluim.draft import Draft
+from clutch_libs.miluim.draft_journal import DraftJournal
+
+from draft_helpers import create_synthetic_draft, play_draft
+
+
+def _get_state(draft: Draft) -> tuple:
+    return (
+        draft.current_draft_pick,
+        draft.current_internal_pick,
+        list(draft.remaining_internal_picks_order),
+        [(result.malshab_id, result.unit, result.course, result.pick) for result in draft.draft_results],
+        {
+            course: (bytes(prioritization.removed_positions), prioritization.head_position, prioritization.remaining_count,
+                     [malshab.id for malshab in prioritization.iter_remaining_malshabs()])
+            for course, prioritization in draft.course_to_prioritization.items()
+        },
+        repr(draft.quota_tracker.course_to_picked_counts),
+        repr(draft.quota_tracker.unit_to_picked_counts),
+    )
+
+
+def _play_journaled_draft(directory: str, seed: int, until_draft_pick: int) -> dict[int, tuple]:
+    # Returns the state of the draft before every pick
+    draft = create_synthetic_draft(seed, with_quotas=True)
+    journal = DraftJournal(directory, snapshot_every=20)
+    journal.open()
+    draft.journal = journal
+    draft_pick_to_state = {}
+    while draft.current_draft_pick < until_draft_pick:
+        draft_pick_to_state[draft.current_draft_pick] = _get_state(draft)
+        play_draft(draft, seed + draft.current_draft_pick, skip_ratio=0.05, until_draft_pick=draft.current_draft_pick + 1)
+    draft_pick_to_state[draft.current_draft_pick] = _get_state(draft)
+    journal.close()
+    return draft_pick_to_state
+
+
+def _resume(directory: str, seed: int, is_set_up: bool) -> Draft:
+    draft = create_synthetic_draft(seed, with_quotas=True) if is_set_up else Draft()
+    journal = DraftJournal(directory, snapshot_every=20)
+    journal.open()
+    draft.resume_from_journal(journal)
+    draft.journal = None
+    journal.close()
+    return draft
+
+
+@pytest.mark.parametrize('is_set_up', [False, True])
+def test_resumed_draft_can_undo_picks_from_before_its_snapshot(tmp_path, is_set_up: bool):
+    with contextlib.redirect_stdout(io.StringIO()):
+        draft_pick_to_state = _play_journaled_draft(str(tmp_path), 0, 65)
+        draft = _resume(str(tmp_path), 0, is_set_up)
+        assert _get_state(draft) == draft_pick_to_state[65]
+        for draft_pick in (64, 59, 41, 40, 12, 0):
+            draft.rewind_to(draft_pick)
+            assert _get_state(draft) == draft_pick_to_state[draft_pick]
+        draft.rewind_to(65)
+        assert _get_state(draft) == draft_pick_to_state[65]
+
+
+def test_resume_replays_an_undo_of_a_pick_from_before_the_snapshot(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        draft_pick_to_state = _play_journaled_draft(str(tmp_path), 1, 60)
+        # An undo recorded right after the snapshot of pick 60, before the snapshot that follows it was written
+        journal = DraftJournal(str(tmp_path))
+        journal.open()
+        journal.record_undo(59)
+        journal.close()
+        draft = _resume(str(tmp_path), 1, is_set_up=False)
+    assert _get_state(draft) == draft_pick_to_state[59]
+
+
+def test_resume_rejects_an_undo_of_another_pick(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _play_journaled_draft(str(tmp_path), 2, 40)
+        journal = DraftJournal(str(tmp_path))
+        journal.open()
+        journal.record_undo(12)
+        journal.close()
+        with pytest.raises(ValueError, match='not the last pick'):
+            _resume(str(tmp_path), 2, is_set_up=False)
+
+
+def test_resume_rejects_a_snapshot_of_another_unit(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        _play_journaled_draft(str(tmp_path), 3, 40)
+        draft = create_synthetic_draft(3, with_quotas=True, my_unit=Unit.SHIVIM)
+        journal = DraftJournal(str(tmp_path))
+        journal.open()
+        with pytest.raises(ValueError, match='taken for unit TISHIM, not SHIVIM'):
+            draft.resume_from_journal(journal)
+        journal.close()
@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+
+import pytest
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft import Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.draft_journal import DraftJournal
+from clutch_libs.miluim.draft_service import DraftService
+from clutch_libs.miluim.synthetic_draft import choose_random_available_malshab
+
+from draft_helpers import create_synthetic_draft, write_synthetic_config
+
+SESSION_ID_TO_UNIT = {'tishim': Unit.TISHIM, 'shivim': Unit.SHIVIM}
+
+
+async def _create_sessions(journal_directory: str) -> tuple[DraftService, dict]:
+    service = DraftService(workers_count=1)
+    template_draft_future = asyncio.get_running_loop().create_future()
+    template_draft_future.set_result(create_synthetic_draft(0))
+    service.config_path_and_unit_to_template_draft[os.path.abspath('draft.json'), Unit.TISHIM] = template_draft_future
+    request = {'command': 'create_session', 'session_id': 'cohort-a', 'config': 'draft.json', 'journal': journal_directory}
+    with pytest.raises(ValueError, match='not the last pick'):
+        await service.create_session(request)
+    assert 'cohort-a' not in service.sessions
+
+    # The session ID is free again
+    state = await service.create_session({**request, 'journal': None})
+    return service, state
+
+
+def test_session_that_fails_to_resume_is_not_registered(tmp_path):
+    journal = DraftJournal(str(tmp_path))
+    journal.open()
+    journal.record_undo(3)
+    journal.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service, state = asyncio.run(_create_sessions(str(tmp_path)))
+    assert state['session_id'] == 'cohort-a' and state['current_draft_pick'] == 0
+    assert list(service.sessions) == ['cohort-a']
+    service.executor.shutdown()
+
+
+def _write_config_json(directory: str) -> str:
+    draft = create_synthetic_draft(0)
+    # The synthetic prioritizations only rank the Malshabs of TISHIM, so SHIVIM gets the same list to pick for them
+    draft.unit_to_malshab_ids[Unit.SHIVIM] = draft.unit_to_malshab_ids[Unit.TISHIM]
+    config = write_synthetic_config(draft, directory)
+    config_path = os.path.join(directory, 'draft.json')
+    with open(config_path, 'w') as file:
+        json.dump({
+            'course_prioritizations': {course.value: path for course, path in config.course_to_prioritization_path.items()},
+            'unit_malshab_ids': {unit.value: path for unit, path in config.unit_to_malshab_ids_path.items()},
+            'general_picking_order': config.general_picking_order_path,
+            'internal_picking_order': config.internal_picking_order_path,
+        }, file)
+    return config_path
+
+
+async def _play_sessions(service: DraftService, config_path: str, unit_to_standalone_draft: dict[Unit, Draft]) -> dict:
+    for session_id, unit in SESSION_ID_TO_UNIT.items():
+        response = await service.handle_request({
+            'command': 'create_session', 'session_id': session_id, 'config': config_path, 'unit': unit.value,
+        })
+        assert response['ok'] and response['my_unit'] == unit.value
+    # A unit without picks cannot pick for the internal picking order
+    response = await service.handle_request({
+        'command': 'create_session', 'session_id': 'yamal', 'config': config_path, 'unit': Unit.YAMAL_1014.value,
+    })
+    assert not response['ok'] and 'only has 0 picks of unit YAMAL_1014' in response['error']
+
+    generator = random.Random(0)
+    taken_malshab_ids = set()
+    state = await service.handle_request({'command': 'get_state', 'session_id': 'tishim'})
+    while state['is_active']:
+        unit = Unit(state['current_unit'])
+        for session_id, session_unit in SESSION_ID_TO_UNIT.items():
+            response = await service.handle_request({'command': 'get_recommendation', 'session_id': session_id})
+            if session_unit != unit:
+                assert not response['ok'] and 'is not a pick of unit' in response['error']
+                continue
+            # Each session recommends for its own unit, like a standalone draft of the unit
+            standalone_draft = unit_to_standalone_draft[unit]
+            if standalone_draft.remaining_internal_picks_order:
+                suggestion, course = standalone_draft._get_suggestion_for_internal_pick()
+            else:
+                suggestion, course = None, None
+            assert response['ok'] and response['malshab_id'] == (suggestion.id if suggestion is not None else None)
+            assert response['course'] == (course.value if course is not None else None)
+        if unit in unit_to_standalone_draft:
+            malshab_id = suggestion.id if suggestion is not None else None
+        else:
+            malshab_id = choose_random_available_malshab(unit_to_standalone_draft[Unit.TISHIM], unit, taken_malshab_ids, generator)
+
+        if malshab_id is None:
+            for session_id in SESSION_ID_TO_UNIT:
+                state = await service.handle_request({'command': 'skip', 'session_id': session_id})
+            for draft in unit_to_standalone_draft.values():
+                draft.skip_current_pick()
+            continue
+        taken_malshab_ids.add(malshab_id)
+        for session_id in SESSION_ID_TO_UNIT:
+            state = await service.handle_request({'command': 'record_pick', 'session_id': session_id, 'malshab_id': malshab_id})
+            assert state['ok'], state
+        for draft_unit, draft in unit_to_standalone_draft.items():
+            draft.handle_chosen_malshab(malshab_id, unit, course if draft_unit == unit else Course.EXTERNAL)
+
+    session_id_to_results = {
+        session_id: await service.handle_request({'command': 'get_results', 'session_id': session_id})
+        for session_id in SESSION_ID_TO_UNIT
+    }
+    sessions = (await service.handle_request({'command': 'list_sessions'}))['sessions']
+    assert sorted(session['session_id'] for session in sessions) == sorted(SESSION_ID_TO_UNIT)
+    return session_id_to_results
+
+
+def test_sessions_of_different_units_recommend_for_their_own_unit(tmp_path):
+    config_path = _write_config_json(str(tmp_path))
+    service = DraftService(workers_count=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        unit_to_standalone_draft = {}
+        for unit in SESSION_ID_TO_UNIT.values():
+            draft = Draft(unit)
+            draft.setup(DraftConfig.load_from_json(config_path))
+            draft.pick_scheduler.is_quiet = True
+            unit_to_standalone_draft[unit] = draft
+        session_id_to_results = asyncio.run(_play_sessions(service, config_path, unit_to_standalone_draft))
+    service.executor.shutdown()
+
+    for session_id, unit in SESSION_ID_TO_UNIT.items():
+        results = session_id_to_results[session_id]['results']
+        assert any(result['unit'] == unit.value and result['course'] != Course.EXTERNAL.value for result in results)
+        # Each session only knows the courses of its own unit's picks
+        assert [(result['pick'], result['unit'], result['malshab_id']) for result in results] == [
+            (result['pick'], result['unit'], result['malshab_id']) for result in session_id_to_results['tishim']['results']
+        ]
+        assert [
+            (result['malshab_id'], result['course']) for result in results if result['unit'] == unit.value
+        ] == [
+            (result.malshab_id, result.course.value) for result in unit_to_standalone_draft[unit].draft_results if result.unit == unit
+        ]
+
+
+async def _send_requests(service: DraftService, lines: list[bytes]) -> list[dict]:
+    server = await asyncio.start_server(service.handle_connection, host='127.0.0.1', port=0)
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.sockets[0].getsockname()[1])
+        # All the requests are sent before any response is read
+        writer.write(b''.join(lines))
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in lines]
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+def test_connection_answers_every_request_after_an_internal_error():
+    service = DraftService(workers_count=1)
+    responses = asyncio.run(_send_requests(service, [
+        b'{"command": "list_sessions"}\n',
+        b'{"command": "get_state", "session_id": ["cohort-a"]}\n',
+        b'{"command": "get_state", "session_id": "cohort-a"}\n',
+        b'{"command": "list_sessions"}\n',
+    ]))
+    service.executor.shutdown()
+    assert responses[0] == {'ok': True, 'sessions': []}
+    assert not responses[1]['ok'] and responses[1]['error'].startswith('Internal error: TypeError')
+    assert responses[2] == {'ok': False, 'error': 'There is no session cohort-a.'}
+    assert responses[3] == {'ok': True, 'sessions': []}
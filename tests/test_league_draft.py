@@ -0,0 +1,109 @@
+import contextlib
+import io
+import random
+
+import pytest
+
+from clutch_libs.miluim.consts import Course, Unit
+from clutch_libs.miluim.draft import Draft
+from clutch_libs.miluim.draft_config import DraftConfig
+from clutch_libs.miluim.league_draft import LeagueDraft
+from clutch_libs.miluim.pick_scheduler import PICK_SCHEDULERS
+from clutch_libs.miluim.synthetic_draft import choose_random_available_malshab
+
+from draft_helpers import create_synthetic_draft, write_synthetic_config
+
+LEAGUE_UNITS = [Unit.TISHIM, Unit.SHIVIM]
+
+
+def _create_standalone_draft(unit: Unit, config: DraftConfig, scheduler_name: str) -> Draft:
+    draft = Draft(unit)
+    draft.setup(config)
+    draft.pick_scheduler = PICK_SCHEDULERS[scheduler_name]()
+    draft.pick_scheduler.is_quiet = True
+    for prioritization in draft.course_to_prioritization.values():
+        prioritization.is_quiet = True
+    return draft
+
+
+def _get_id(recommendation) -> tuple[str | None, Course | None]:
+    suggestion, course = recommendation
+    return suggestion.id if suggestion is not None else None, course
+
+
+@pytest.mark.parametrize('scheduler_name', sorted(PICK_SCHEDULERS))
+def test_league_recommends_like_standalone_drafts(tmp_path, scheduler_name):
+    # A small pool, so courses run out of Malshabs while the units preview their suggestions
+    config = write_synthetic_config(create_synthetic_draft(0, malshabs_count=120), str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Both units load the same prioritization files, so the league shares them between the perspectives
+        league = LeagueDraft(PICK_SCHEDULERS[scheduler_name]())
+        league.setup({unit: config for unit in LEAGUE_UNITS})
+        unit_to_standalone_draft = {unit: _create_standalone_draft(unit, config, scheduler_name) for unit in LEAGUE_UNITS}
+    assert len(league.prioritizations) == len(Course) - 1
+
+    generator = random.Random(0)
+    taken_malshab_ids = set()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while league.is_active:
+            unit = league.general_picking_order[league.current_draft_pick]
+            # The coordinator sees every unit's recommendation before each pick
+            unit_to_recommendation = league.get_recommendations()
+            standalone_draft = unit_to_standalone_draft.get(unit)
+            course = Course.EXTERNAL
+            if standalone_draft is not None:
+                if standalone_draft.is_active and standalone_draft.remaining_internal_picks_order:
+                    standalone_recommendation = standalone_draft._get_suggestion_for_internal_pick()
+                else:
+                    standalone_recommendation = None, None
+                assert _get_id(unit_to_recommendation[unit]) == _get_id(standalone_recommendation)
+                malshab_id, course = _get_id(unit_to_recommendation[unit])
+            else:
+                malshab_id = choose_random_available_malshab(league.template_draft, unit, taken_malshab_ids, generator)
+
+            if malshab_id is None:
+                league.skip_current_pick()
+                for draft in unit_to_standalone_draft.values():
+                    if draft.is_active:
+                        draft.skip_current_pick()
+                continue
+            taken_malshab_ids.add(malshab_id)
+            league.handle_chosen_malshab(malshab_id, unit, course)
+            for draft_unit, draft in unit_to_standalone_draft.items():
+                draft.handle_chosen_malshab(malshab_id, unit, course if draft_unit == unit else Course.EXTERNAL)
+
+            for draft_unit, draft in unit_to_standalone_draft.items():
+                perspective = league.unit_to_draft[draft_unit]
+                assert perspective.remaining_internal_picks_order == draft.remaining_internal_picks_order
+                assert perspective.current_internal_pick == draft.current_internal_pick
+
+    for unit in LEAGUE_UNITS:
+        league_results = [(result.malshab_id, result.course) for result in league.draft_results if result.unit == unit]
+        standalone_results = [
+            (result.malshab_id, result.course) for result in unit_to_standalone_draft[unit].draft_results if result.unit == unit
+        ]
+        assert league_results == standalone_results
+        assert any(course != Course.EXTERNAL for _, course in league_results)
+
+
+def test_previewing_recommendations_keeps_the_perspectives(tmp_path):
+    config = write_synthetic_config(create_synthetic_draft(1, malshabs_count=120), str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        league = LeagueDraft()
+        league.setup({unit: config for unit in LEAGUE_UNITS})
+    # Skip to a pick of another unit late in the draft, when some courses have run out of Malshabs
+    with contextlib.redirect_stdout(io.StringIO()):
+        while league.general_picking_order[league.current_draft_pick] != Unit.ARBA_TESHA \
+                or league.current_draft_pick < len(league.general_picking_order) // 2:
+            league.skip_current_pick()
+    perspective = league.unit_to_draft[Unit.TISHIM]
+    for prioritization in perspective.course_to_prioritization.values():
+        for row in list(prioritization.priorized_rows):
+            prioritization.handle_row_chosen(row)
+    remaining_internal_picks_order = list(perspective.remaining_internal_picks_order)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert league.get_recommendation(Unit.TISHIM) == (None, None)
+    assert perspective.remaining_internal_picks_order == remaining_internal_picks_order
+    assert perspective.is_active
+    assert not perspective.history.pending_removed_internal_picks
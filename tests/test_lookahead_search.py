@@ -0,0 +1,54 @@
+import time
+
+from clutch_libs.miluim import lookahead_search
+from clutch_libs.miluim.consts import Course
+from clutch_libs.miluim.lookahead_search import LookaheadCandidate, LookaheadProblem, LookaheadSearch, search_branch
+
+from draft_helpers import create_synthetic_draft, play_draft
+
+
+def _create_problem() -> LookaheadProblem:
+    candidates = [
+        LookaheadCandidate(str(index), course, 1 / (1 + index), (), (1.0, 0.8, 0.5))
+        for index, course in enumerate([Course.SHEFA, Course.SHEFA, Course.APOLLO, Course.APOLLO, Course.MIVZAR])
+    ]
+    return LookaheadProblem(
+        candidates=candidates,
+        course_to_slots={Course.SHEFA: 1, Course.APOLLO: 1, Course.MIVZAR: 1},
+        unit_capacity={},
+        course_to_capacity={},
+        depth=3,
+        beam_width=4,
+    )
+
+
+def test_branch_returns_the_depth_it_searched():
+    problem = _create_problem()
+    searched_depth, expected_value, plan = search_branch(problem, 0, time.time() + 60)
+    assert searched_depth == 3 and len(plan) == 3 and plan[0] == 0
+    assert expected_value == 1.0 + 1 / 3 * 0.8 + 1 / 5 * 0.5
+
+    # Past the deadline, only the root is searched
+    assert search_branch(problem, 0, time.time() - 1) == (1, 1.0, (0,))
+
+
+def test_only_the_deepest_branches_are_ranked(monkeypatch):
+    draft = create_synthetic_draft(0)
+    play_draft(draft, 0, until_draft_pick=draft.contested_pick_index.get_next_unit_pick(draft.my_unit, 0))
+    lookahead = LookaheadSearch(depth=3, time_budget_seconds=60)
+    problem = lookahead.build_problem(draft)
+    assert problem is not None and problem.depth == 3
+
+    # The first branch was cut short, with a plan worth more than any complete plan
+    def search_cut_branch(problem: LookaheadProblem, root_index: int, deadline: float):
+        if root_index == 0:
+            return 1, 100.0, (root_index,)
+        return search_branch(problem, root_index, deadline)
+
+    monkeypatch.setattr(lookahead_search, 'search_branch', search_cut_branch)
+    recommendations = lookahead.search(draft)
+    assert recommendations
+    assert problem.candidates[0].malshab_id not in [recommendation.malshab_id for recommendation in recommendations]
+    assert all(len(recommendation.plan) == 3 for recommendation in recommendations)
+    values = [recommendation.expected_value for recommendation in recommendations]
+    assert values == sorted(values, reverse=True)
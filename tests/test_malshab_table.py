@@ -0,0 +1,48 @@
+from clutch_libs.miluim.consts import Gender
+from clutch_libs.miluim.malshab import Malshab, MalshabRow
+from clutch_libs.miluim.malshab_table import MalshabTable
+
+
+def _create_table() -> MalshabTable:
+    table = MalshabTable()
+    table.add_malshab('1', 'a', 'a', Gender.MALE, 97, 80, False)
+    table.add_malshab('2', 'b', 'b', Gender.FEMALE, 97, 40, True)
+    table.add_malshab('3', 'c', 'c', Gender.MALE, 64, 60, False)
+    table.add_malshab('4', 'd', 'd', Gender.FEMALE, 21, 90, False)
+    return table
+
+
+def test_column_queries():
+    table = _create_table()
+    assert table.get_rows_with_gender(Gender.MALE) == [0, 2]
+    assert table.get_rows_with_gender(Gender.FEMALE) == [1, 3]
+    assert table.get_rows_with_min_psych_score(60) == [0, 2, 3]
+    assert table.get_rows_with_min_psych_score(100) == []
+    assert table.get_combat_rows() == [0]
+    assert table.get_schakim_rows() == [1]
+
+
+def test_values_out_of_the_usual_range_are_stored():
+    table = _create_table()
+    row = table.add_malshab('5', 'e', 'e', Gender.MALE, 300, 99999, False)
+    table.add_malshab('6', 'f', 'f', Gender.MALE, -1, -5, False)
+    assert list(table.medical_profiles[row:]) == [300, -1]
+    assert list(table.psych_scores[row:]) == [99999, -5]
+    assert table.get_malshab(row).psych_score == 99999
+
+
+def test_standalone_malshab_is_not_stored_in_a_table():
+    malshab = Malshab('1', 'a', 'a', Gender.MALE, 97, 80, True)
+    assert not hasattr(malshab, '__dict__')
+    assert malshab.row is None
+    assert malshab.is_combat()
+    assert not Malshab('2', 'b', 'b', Gender.FEMALE, 97, 80, False).is_combat()
+
+
+def test_table_rows_are_views():
+    table = _create_table()
+    malshab = table.get_malshab(1)
+    assert isinstance(malshab, MalshabRow)
+    assert (malshab.id, malshab.gender, malshab.medical_profile, malshab.psych_score, malshab.is_schakim, malshab.row) \
+        == ('2', Gender.FEMALE, 97, 40, True, 1)
+    assert not malshab.is_combat()
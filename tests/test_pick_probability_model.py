@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from clutch_libs.miluim.consts import Unit
+from clutch_libs.miluim.draft_journal import DraftJournal
+from clutch_libs.miluim.pick_probability_model import PickProbabilityModel, load_journaled_drafts
+
+from draft_helpers import create_synthetic_draft, play_draft
+
+UNIT_TO_WEIGHTS: dict[Unit, list[float]] = {
+    Unit.SHIVIM: [0.5, 1.0, 4.0, 0.2, 0.3, 0.0],
+    Unit.ARBA_TESHA: [-0.3, 2.0, 1.0, -0.5, 1.0, 0.1],
+}
+
+
+def _get_risky_pick_pick_by_pick(draft, malshab_id: str) -> int:
+    # The chance the Malshab survives, multiplied pick by pick
+    contested_pick_index = draft.contested_pick_index
+    model = draft.pick_probability_model
+    survival_probability = 1.0
+    pick_index = draft.current_draft_pick
+    while True:
+        pick_index = contested_pick_index.get_next_contested_pick(malshab_id, pick_index)
+        if pick_index >= contested_pick_index.total_picks:
+            return pick_index
+        unit = draft.general_picking_order[pick_index]
+        remaining_list_size = model.get_available_count(draft, unit) \
+            - contested_pick_index.count_unit_picks(unit, draft.current_draft_pick, pick_index)
+        survival_probability *= 1 - model.get_pick_probability(draft, unit, malshab_id, remaining_list_size)
+        if 1 - survival_probability > draft.max_pick_risk:
+            return pick_index
+        pick_index += 1
+
+
+@pytest.mark.parametrize('until_draft_pick', [0, 40, 90])
+def test_risky_pick_matches_multiplying_the_survival_pick_by_pick(until_draft_pick: int):
+    draft = create_synthetic_draft(0)
+    play_draft(draft, 0, until_draft_pick=until_draft_pick)
+    draft.pick_probability_model = PickProbabilityModel(UNIT_TO_WEIGHTS)
+    malshab_ids = [
+        malshab.id for prioritization in draft.course_to_prioritization.values() for malshab in prioritization.iter_remaining_malshabs()
+    ]
+    for max_pick_risk in (0.0, 0.05, 0.3, 0.9, 1.0):
+        draft.max_pick_risk = max_pick_risk
+        for malshab_id in malshab_ids:
+            assert draft._get_risky_pick(malshab_id) == _get_risky_pick_pick_by_pick(draft, malshab_id), (max_pick_risk, malshab_id)
+
+
+def test_survival_of_a_certain_pick():
+    assert PickProbabilityModel.get_survival_log_probability(2.0, 10, 9) == float('-inf')
+    assert PickProbabilityModel.get_survival_log_probability(2.0, 10, 8) == pytest.approx(sum(
+        math.log(1 - 2.0 / (10 - picks_count)) for picks_count in range(8)
+    ))
+    # Picks after the list ran out don't take anyone
+    assert PickProbabilityModel.get_survival_log_probability(0.5, 3, 10) == PickProbabilityModel.get_survival_log_probability(0.5, 3, 3)
+
+
+def test_journaled_drafts_are_loaded_for_their_unit(tmp_path):
+    draft = create_synthetic_draft(0, my_unit=Unit.SHIVIM)
+    journal = DraftJournal(str(tmp_path), snapshot_every=20)
+    journal.open()
+    draft.journal = journal
+    journal.write_snapshot(draft)
+    play_draft(draft, 0, until_draft_pick=50)
+    journal.close()
+
+    (loaded_draft,) = load_journaled_drafts([str(tmp_path)])
+    assert loaded_draft.my_unit == Unit.SHIVIM
+    assert [(result.malshab_id, result.unit, result.course) for result in loaded_draft.draft_results] \
+        == [(result.malshab_id, result.unit, result.course) for result in draft.draft_results]
@@ -0,0 +1,67 @@
+import contextlib
+import io
+
+import pytest
+
+from clutch_libs.miluim.draft_benchmark import run_benchmark
+from clutch_libs.miluim.pick_scheduler import DeadlineScheduler, GreedySlotScheduler
+from clutch_libs.miluim.synthetic_draft import SyntheticDraftParameters
+
+from draft_helpers import create_synthetic_draft, play_draft
+
+# The deadline schedule is rebuilt on every suggestion, which must still take milliseconds on pools of 10k+ Malshabs.
+# Typically about 7 ms at the median and 20 ms at p99, the bounds leave room for slower machines.
+MAX_SUGGESTION_P50_SECONDS = 0.025
+MAX_SUGGESTION_P99_SECONDS = 0.1
+
+
+def _get_schedule(scheduler: DeadlineScheduler) -> dict[int, tuple[str, str]]:
+    return {
+        slot: (malshab.id, scheduler.malshab_id_to_course[malshab.id])
+        for slot, malshab in scheduler.slot_to_malshab.items()
+    }
+
+
+@pytest.mark.parametrize('with_quotas', [False, True])
+@pytest.mark.parametrize('seed', range(10))
+def test_deadline_schedule_matches_a_schedule_built_from_scratch(seed: int, with_quotas: bool):
+    draft = create_synthetic_draft(seed, DeadlineScheduler(), with_quotas)
+    compared_picks = []
+
+    def compare_with_new_scheduler(draft):
+        # A draft at the same state, with a new scheduler that builds its schedule from scratch
+        forked_draft = draft.fork_state()
+        forked_draft.pick_scheduler = draft.pick_scheduler.fork()
+        forked_draft.pick_scheduler.is_quiet = True
+        expected_suggestion = forked_draft.pick_scheduler.get_suggestion(forked_draft)
+        suggestion = draft.pick_scheduler.get_suggestion(draft)
+        assert (suggestion[0].id if suggestion[0] else None, suggestion[1]) \
+            == (expected_suggestion[0].id if expected_suggestion[0] else None, expected_suggestion[1]), \
+            f'internal pick {draft.current_internal_pick}'
+        assert _get_schedule(draft.pick_scheduler) == _get_schedule(forked_draft.pick_scheduler), \
+            f'internal pick {draft.current_internal_pick}'
+        assert draft.remaining_internal_picks_order == forked_draft.remaining_internal_picks_order
+        compared_picks.append(draft.current_internal_pick)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        play_draft(draft, seed, compare_with_new_scheduler, skip_ratio=0.03)
+    assert len(compared_picks) > 20
+
+
+@pytest.mark.parametrize('pick_scheduler_type', [GreedySlotScheduler, DeadlineScheduler])
+def test_schedulers_play_a_whole_draft(pick_scheduler_type):
+    draft = create_synthetic_draft(0, pick_scheduler_type(), with_quotas=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        play_draft(draft, 0)
+    my_unit_results = [result for result in draft.draft_results if result.unit == draft.my_unit]
+    assert len(my_unit_results) == draft.current_internal_pick > 0
+    assert len({result.malshab_id for result in draft.draft_results}) == len(draft.draft_results)
+
+
+def test_deadline_scheduler_suggests_within_milliseconds_on_a_large_pool():
+    results = run_benchmark(
+        SyntheticDraftParameters(malshabs_count=12000, picks_count=3000), measure_memory=False, scheduler_name=DeadlineScheduler.name,
+    )
+    assert results['internal_picks_made'] >= 500
+    assert results['suggestion_seconds']['p50'] < MAX_SUGGESTION_P50_SECONDS
+    assert results['suggestion_seconds']['p99'] < MAX_SUGGESTION_P99_SECONDS
@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+import pytest
+
+from clutch_libs.miluim.pick_scheduler import DeadlineScheduler, GreedySlotScheduler
+from clutch_libs.miluim.speculative_recommender import SpeculativeRecommender
+
+from draft_helpers import create_synthetic_draft, play_draft
+
+
+def _play(seed: int, pick_scheduler_type, with_quotas: bool, speculate: bool) -> tuple[list[tuple], SpeculativeRecommender]:
+    # A small pool, so that other units often take the candidates of my unit's courses
+    draft = create_synthetic_draft(seed, pick_scheduler_type(), with_quotas, malshabs_count=200)
+    if speculate:
+        draft.speculative_recommender = SpeculativeRecommender()
+        draft.speculative_recommender.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            play_draft(draft, seed, skip_ratio=0.03)
+    finally:
+        if speculate:
+            draft.speculative_recommender.stop()
+    results = [(result.malshab_id, result.unit, result.course) for result in draft.draft_results]
+    return results, draft.speculative_recommender
+
+
+@pytest.mark.parametrize('with_quotas', [False, True])
+@pytest.mark.parametrize('pick_scheduler_type', [GreedySlotScheduler, DeadlineScheduler])
+@pytest.mark.parametrize('seed', range(10))
+def test_speculation_does_not_change_the_draft(seed: int, pick_scheduler_type, with_quotas: bool):
+    expected_results, _ = _play(seed, pick_scheduler_type, with_quotas, speculate=False)
+    results, speculative_recommender = _play(seed, pick_scheduler_type, with_quotas, speculate=True)
+    assert results == expected_results
+    assert speculative_recommender.hits_count > 0
+
+
+def test_no_speculation_with_a_pick_probability_model():
+    draft = create_synthetic_draft(0)
+    draft.pick_probability_model = object()
+    speculative_recommender = SpeculativeRecommender()
+    speculative_recommender.speculate(draft)
+    assert speculative_recommender.pending_draft is None